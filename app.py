@@ -1,18 +1,16 @@
+import time
+import uuid
 import streamlit as st
-import requests
-import deepl
-from openai import OpenAI
-import json
-from functools import partial
-from datetime import datetime
-import docx
-import io
-
-from prompts import (
-    get_cleaning_messages,
-    get_translation_messages,
-    get_quality_check_messages
-)
+from datetime import date
+from functools import wraps
+
+from prompts import DEFAULT_TARGET, TARGET_LANGUAGES
+from pipeline.artifacts import ARTIFACTS, EDITION_KEYS, edition_key, empty_result, get_file_prefix
+from pipeline.blobs import BlobExpired, get_text, load_result, put_text, store_result
+from pipeline.deadline import DEFAULT_RUN_DEADLINE
+from pipeline.findings import parse_findings, report_markdown
+from pipeline.jobs import get_job, recent_jobs, submit_article_job, submit_batch_job
+from pipeline.stages import analyze_translation, reoptimize_flagged_paragraphs, stream_analyze_translation
 
 # ======================================================================
 # 0) Page Configuration
@@ -23,61 +21,107 @@ st.set_page_config(
     layout="wide"
 )
 
+# Seconds between two looks at a running background job
+JOB_POLL_SECONDS = 1.0
+
+JOB_STATUS_ICONS = {"queued": "⏳", "running": "⚙️", "done": "✅", "error": "❌"}
+
+JOB_STAGE_LABELS = {
+    "extract": "🔍 Extrahiere Text von URL...",
+    "clean_translate": "🧹🔄 Bereinige und übersetze Text...",
+    "clean": "🧹 Bereinige Text...",
+    "translate": "🔄 Übersetze Text...",
+    "read_translate": "📄🔄 Lese und übersetze Datei...",
+    "read": "📄 Lese Datei...",
+    "optimize": "✨ Optimiere Übersetzung...",
+}
+
+BATCH_STAGE_LABELS = {
+    "extract": "🔍 Extrahiere Text...",
+    "clean": "🧹 Bereinige Text...",
+    "translate": "🔄 Übersetze Text...",
+    "optimize": "✨ Optimiere Übersetzung...",
+}
+
 # ======================================================================
-# 1) Helper Functions
+# 1) Session State Initialization
 # ======================================================================
-def get_file_prefix(text: str) -> str:
-    """Extracts first 5 words from the text and adds current date"""
-    try:
-        # Get first line (title)
-        first_line = text.split('\n')[0] if text else "Untitled"
-        # Get first 5 words
-        words = first_line.split()[:5]
-        title_prefix = '_'.join(words)
-        # Clean title (remove special chars)
-        title_prefix = ''.join(c if c.isalnum() or c == '_' else '' for c in title_prefix)
-        # Add date
-        date_str = datetime.now().strftime("%Y_%m_%d")
-        return f"{title_prefix}_{date_str}"
-    except Exception:
-        # Fallback if something goes wrong
-        return f"article_{datetime.now().strftime('%Y_%m_%d')}"
-
-def read_text_file(uploaded_file):
-    """Read content from a text file"""
-    return uploaded_file.getvalue().decode('utf-8')
-
-def read_docx_file(uploaded_file):
-    """Read content from a DOCX file"""
-    doc = docx.Document(uploaded_file)
-    full_text = []
-    for paragraph in doc.paragraphs:
-        full_text.append(paragraph.text)
-    return '\n'.join(full_text)
-
-def read_rtf_file(uploaded_file):
-    """Read content from an RTF file"""
-    # Basic RTF to text conversion - you might want to use a more robust library
-    content = uploaded_file.getvalue().decode('utf-8')
-    # Remove RTF formatting - this is a simple approach
-    text = ' '.join(content.split('\\')[1:])  # Very basic RTF cleaning
-    return text
+# processed_text holds blob references (see pipeline/blobs.py), not the texts themselves
+if 'processed_text' not in st.session_state:
+    st.session_state.processed_text = empty_result()
+
+# Jobs are only listed for the browser session that submitted them; the ID
+# is kept in the URL so a reloaded page still finds its jobs
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+st.query_params["session"] = st.session_state.session_id
+
+if 'batch_job_id' not in st.session_state:
+    st.session_state.batch_job_id = None
+
+if 'run_metrics' not in st.session_state:
+    st.session_state.run_metrics = None
+
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
+
+if 'loaded_job' not in st.session_state:
+    st.session_state.loaded_job = None
+
+# Target languages of the shown result, the first one is the primary edition
+if 'result_targets' not in st.session_state:
+    st.session_state.result_targets = [DEFAULT_TARGET]
+
+
+def result_text(key: str) -> str:
+    """Returns one of the processed texts of this session"""
+    return get_text(st.session_state.processed_text.get(key, ''))
+
+
+def edition_field(key: str, target: str) -> str:
+    """Returns the processed_text key of a per-language text of the shown result"""
+    return edition_key(key, target, st.session_state.result_targets[0])
 
 
 # ======================================================================
-# 2) Session State Initialization
+# Rendering Helpers
 # ======================================================================
-if 'processed_text' not in st.session_state:
-    st.session_state.processed_text = {
-        'original': '',
-        'cleaned': '',
-        'translated': '',
-        'final': '',
-        'analysis': ''  # New field for the analysis report
-    }
+# The results are drawn by fragments: a widget inside a fragment only
+# reruns that fragment, so editing the final text or clicking a download
+# does not rebuild every tab. Payloads are derived from blob references
+# (see pipeline/blobs.py) and memoized, so their cost does not grow with
+# the number of reruns.
+@st.cache_resource(max_entries=64, show_spinner=False)
+def download_payload(ref: str) -> bytes:
+    """Returns the UTF-8 bytes of a stored text for st.download_button.
+
+    cache_resource hands out the same immutable object instead of a copy.
+    """
+    return get_text(ref).encode('utf-8')
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def file_prefix_of(ref: str, day: str) -> str:
+    """Returns get_file_prefix of a stored text; ``day`` renews the date part"""
+    return get_file_prefix(get_text(ref))
+
+
+def timed_fragment(name: str):
+    """Turns a render function into a fragment that can show its render time"""
+    def decorator(func):
+        @st.fragment
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            func(*args, **kwargs)
+            if st.session_state.get('show_render_timings'):
+                st.caption(f"⏱️ {name}: {(time.perf_counter() - started) * 1000:.1f} ms")
+        return wrapper
+    return decorator
+
 
 # ======================================================================
-# 3) Sidebar for API Keys
+# 2) Sidebar for API Keys
 # ======================================================================
 with st.sidebar:
     st.title("API Konfiguration")
@@ -103,91 +147,149 @@ with st.sidebar:
         key="deepl_key"
     )
 
-# ======================================================================
-# 4) Cached Functions
-# ======================================================================
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def extract_text_from_url(url: str, jina_key: str) -> str:
-    """Extracts text from a URL using Jina AI Reader with caching"""
-    jina_url = f'https://r.jina.ai/{url}'
-    headers = {
-        'Authorization': f'Bearer {jina_key}',
-        'X-Return-Format': 'text'
-    }
-    
-    response = requests.get(jina_url, headers=headers)
-    response.raise_for_status()
-    return response.text
-
-@st.cache_data(ttl=3600)
-def clean_text_with_gpt(text: str, openai_key: str) -> str:
-    """Cleans the text using GPT-4o-mini with caching"""
-    client = OpenAI(api_key=openai_key)
-    
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=get_cleaning_messages(text),
-        response_format={"type": "text"},
-        temperature=0,
-        max_completion_tokens=10000,
-        top_p=1,
-        frequency_penalty=0,
-        presence_penalty=0
+    st.title("Einstellungen")
+
+    stream_output = st.toggle(
+        "Live-Ausgabe",
+        value=True,
+        help="Zeigt Optimierung und Qualitätsprüfung bereits während der Generierung an"
     )
-    return response.choices[0].message.content
-
-@st.cache_data(ttl=3600)
-def translate_text(text: str, deepl_key: str) -> str:
-    """Translates text from English to German using DeepL with caching"""
-    translator = deepl.Translator(deepl_key)
-    result = translator.translate_text(
-        text,
-        source_lang="EN",
-        target_lang="DE",
-        formality="more"
+
+    overlap_stages = st.toggle(
+        "Überlappende Verarbeitung",
+        value=True,
+        help="Übersetzt fertige Absätze mit DeepL, während GPT den Text noch bereinigt oder die Datei noch gelesen wird"
     )
-    return result.text
 
-@st.cache_data(ttl=3600)
-def optimize_translation(cleaned_text: str, translated_text: str, openai_key: str) -> str:
-    """Optimizes the translation using OpenAI with caching"""
-    client = OpenAI(api_key=openai_key)
-    
-    response = client.chat.completions.create(
-        model="o3-mini",
-        messages=get_translation_messages(cleaned_text, translated_text),
-        response_format={"type": "text"},
-        reasoning_effort="high"
+    preclean_strength = st.select_slider(
+        "Lokale Vorbereinigung",
+        options=["off", "light", "strong"],
+        value="light",
+        format_func={"off": "Aus", "light": "Leicht", "strong": "Stark"}.get,
+        help="Entfernt Navigation, Cookie-Hinweise, Teilen-Links und Footer vor der GPT-Bereinigung"
     )
-    return response.choices[0].message.content
 
+    skip_llm_clean = st.toggle(
+        "GPT-Bereinigung bei eindeutigem Text überspringen",
+        value=False,
+        disabled=preclean_strength != "strong",
+        help="Nur bei starker Vorbereinigung: Ist der Text danach eindeutig sauber, entfällt der GPT-Aufruf"
+    ) and preclean_strength == "strong"
 
-@st.cache_data(ttl=3600)
-def analyze_translation(cleaned_text: str, final_text: str, openai_key: str) -> str:
-    """Analyzes the translation quality using GPT-4o-mini with caching"""
-    client = OpenAI(api_key=openai_key)
-    
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=get_quality_check_messages(cleaned_text, final_text),
-        response_format={"type": "text"},
-        temperature=0,
-        max_completion_tokens=10000,
-        top_p=1,
-        frequency_penalty=0,
-        presence_penalty=0
+    target_languages = st.multiselect(
+        "Zielsprachen",
+        list(TARGET_LANGUAGES),
+        default=[DEFAULT_TARGET],
+        format_func=lambda code: TARGET_LANGUAGES[code]["language"],
+        help="Extraktion und Bereinigung laufen einmal, Übersetzung und Optimierung je Sprache parallel. "
+             "Die erste Sprache ist die Hauptausgabe"
+    ) or [DEFAULT_TARGET]
+
+    st.toggle(
+        "Renderzeiten anzeigen",
+        key="show_render_timings",
+        help="Zeigt unter jedem Ergebnisbereich, wie lange sein letzter Aufbau gedauert hat"
+    )
+
+    run_deadline = st.number_input(
+        "Zeitbudget pro Artikel (s)",
+        min_value=0,
+        value=int(DEFAULT_RUN_DEADLINE),
+        step=60,
+        help="Wird das Budget überschritten, wird die DeepL-Übersetzung ohne Optimierung übernommen "
+             "und als solche gekennzeichnet. 0 = ohne Zeitbudget"
     )
-    return response.choices[0].message.content
+
+    st.title("Aufträge")
+
+    jobs = recent_jobs(st.session_state.session_id, kinds=("url", "file"))
+    if jobs:
+        job_labels = {
+            job['id']: f"{JOB_STATUS_ICONS[job['status']]} {job['name']}" for job in jobs
+        }
+        selected_job = st.selectbox(
+            "Letzte Aufträge",
+            list(job_labels),
+            format_func=job_labels.get,
+            help="Aufträge dieser Sitzung laufen im Hintergrund weiter und bleiben nach dem Neuladen der Seite erhalten"
+        )
+        if st.button("Auftrag öffnen", use_container_width=True):
+            st.session_state.job_id = selected_job
+            st.session_state.loaded_job = None
+            st.query_params["job"] = selected_job
+            st.rerun()
+
+
+def job_options() -> dict:
+    """Returns the settings of the sidebar as job options"""
+    return {
+        'overlap': overlap_stages,
+        'stream': stream_output,
+        'strength': preclean_strength,
+        'skip_llm': skip_llm_clean,
+        'targets': target_languages,
+        'deadline': run_deadline,
+    }
+
+
+def start_job(**source):
+    """Submits a background job with the current settings and follows it in this session"""
+    job_id = submit_article_job(
+        {'openai': openai_key, 'deepl': deepl_key, 'jina': jina_key},
+        job_options(),
+        session=st.session_state.session_id,
+        **source
+    )
+    # Reset all stored texts including analysis
+    st.session_state.processed_text = empty_result()
+    st.session_state.result_targets = target_languages
+    st.session_state.run_metrics = None
+    st.session_state.job_id = job_id
+    st.session_state.loaded_job = None
+    # The job ID in the URL lets a reloaded page pick the job up again
+    st.query_params["job"] = job_id
+
+
+def show_batch_items(job: dict):
+    """Lists the articles of a batch job with their current state"""
+    items = (job['result'] or {}).get('items', [])
+    if not items:
+        st.write("⏳ Warte auf einen freien Worker...")
+        return
+    finished = sum(1 for item in items if item['status'] in ('fertig', 'fehler'))
+    st.progress(finished / len(items))
+    for item in items:
+        if item['status'] == 'fertig':
+            st.write(
+                f"{'⚠️' if item['fallback'] else '✅'} {item['name']} "
+                f"({item['duration']:.1f} s, ca. ${item['cost_usd']:.4f})"
+            )
+        elif item['status'] == 'fehler':
+            st.write(f"❌ {item['name']}: {item['error']}")
+        else:
+            st.write(f"{BATCH_STAGE_LABELS.get(item['status'], '⏳')} {item['name']}")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_batch_progress(job_id: str):
+    """Shows the progress of a running batch job until it has finished"""
+    job = get_job(job_id, st.session_state.session_id)
+    if job is None or job['status'] not in ('queued', 'running'):
+        # Rerun the page once so the finished batch is shown
+        st.rerun()
+    with st.status(f"Verarbeite {job['name']}...", expanded=True):
+        show_batch_items(job)
+        st.caption("Der Batch läuft im Hintergrund weiter, auch wenn die Seite neu geladen wird.")
 
 # ======================================================================
-# 5) Main App Layout
+# 3) Main App Layout
 # ======================================================================
 st.title("🌐 Artikel Übersetzer (Test-Version nur für internen Gebrauch)")
 
 # Input method selection
 input_method = st.radio(
     "Wählen Sie die Eingabemethode:",
-    ["URL", "Datei-Upload"]
+    ["URL", "Datei-Upload", "Batch"]
 )
 
 if input_method == "URL":
@@ -202,41 +304,69 @@ if input_method == "URL":
         if not all([url, openai_key, jina_key, deepl_key]):
             st.error("Bitte füllen Sie alle erforderlichen Felder aus (URL und API-Keys)")
         else:
-            try:
-                # Reset all stored texts including analysis
-                st.session_state.processed_text = {
-                    'original': '',
-                    'cleaned': '',
-                    'translated': '',
-                    'final': '',
-                    'analysis': ''
-                }
-                
-                with st.status("Verarbeite URL...", expanded=True) as status:
-                    # Extract text
-                    st.write("🔍 Extrahiere Text von URL...")
-                    raw_text = extract_text_from_url(url, jina_key)
-                    st.session_state.processed_text['original'] = raw_text
-                    
-                    # Clean text
-                    st.write("🧹 Bereinige Text...")
-                    cleaned_text = clean_text_with_gpt(raw_text, openai_key)
-                    st.session_state.processed_text['cleaned'] = cleaned_text
-                    
-                    # Translate text
-                    st.write("🔄 Übersetze Text...")
-                    translated_text = translate_text(cleaned_text, deepl_key)
-                    st.session_state.processed_text['translated'] = translated_text
-                    
-                    # Optimize translation
-                    st.write("✨ Optimiere Übersetzung...")
-                    final_text = optimize_translation(cleaned_text, translated_text, openai_key)
-                    st.session_state.processed_text['final'] = final_text
-                    
-                    status.update(label="Verarbeitung abgeschlossen! ✅", state="complete")
-                    
-            except Exception as e:
-                st.error(f"Fehler bei der Verarbeitung: {str(e)}")
+            start_job(url=url)
+
+elif input_method == "Batch":
+    urls_input = st.text_area(
+        "Artikel URLs (eine pro Zeile)",
+        placeholder="https://www.example.com/article-1\nhttps://www.example.com/article-2",
+        height=200
+    )
+    uploaded_files = st.file_uploader(
+        "Oder mehrere Dateien auswählen",
+        type=['txt', 'docx', 'rtf'],
+        accept_multiple_files=True,
+        help="Unterstützte Formate: TXT, DOCX, RTF"
+    )
+
+    if st.button("Batch verarbeiten", type="primary", use_container_width=True):
+        urls = [line.strip() for line in urls_input.splitlines() if line.strip()]
+        if not urls and not uploaded_files:
+            st.error("Bitte geben Sie mindestens eine URL ein oder laden Sie Dateien hoch")
+        elif not all([openai_key, deepl_key]) or (urls and not jina_key):
+            st.error("Bitte füllen Sie alle erforderlichen API-Keys aus")
+        else:
+            items = [{'name': url, 'url': url} for url in urls]
+            items += [{'name': uploaded.name, 'data': uploaded.getvalue()} for uploaded in uploaded_files or []]
+            st.session_state.batch_job_id = submit_batch_job(
+                {'openai': openai_key, 'deepl': deepl_key, 'jina': jina_key},
+                items,
+                job_options(),
+                session=st.session_state.session_id
+            )
+
+    # Batches run in the background worker pool like single articles; show
+    # the one started last in this session
+    batch_job_id = st.session_state.batch_job_id
+    if batch_job_id is None:
+        batch_jobs = recent_jobs(st.session_state.session_id, kinds=("batch",), limit=1)
+        batch_job_id = batch_jobs[0]['id'] if batch_jobs else None
+    batch_job = get_job(batch_job_id, st.session_state.session_id) if batch_job_id else None
+    if batch_job and batch_job['status'] in ('queued', 'running'):
+        render_batch_progress(batch_job_id)
+    elif batch_job:
+        batch_items = (batch_job['result'] or {}).get('items', [])
+        failed = sum(1 for item in batch_items if item['status'] == 'fehler')
+        with st.status(
+            f"Batch abgeschlossen: {len(batch_items) - failed} erfolgreich, {failed} fehlgeschlagen",
+            state="complete" if not failed else "error",
+            expanded=True
+        ):
+            show_batch_items(batch_job)
+        if batch_job['status'] == 'error':
+            st.error(f"Fehler bei der Verarbeitung: {batch_job['error']}")
+
+        # Load one finished batch item into the regular results view
+        finished_results = [item for item in batch_items if item['processed_text']]
+        if finished_results:
+            selected = st.selectbox(
+                "Ergebnis anzeigen",
+                range(len(finished_results)),
+                format_func=lambda i: finished_results[i]['name']
+            )
+            if st.button("Ergebnis laden", use_container_width=True):
+                st.session_state.processed_text = dict(finished_results[selected]['processed_text'])
+                st.session_state.result_targets = finished_results[selected]['targets']
 
 else:  # File Upload
     uploaded_file = st.file_uploader(
@@ -250,48 +380,267 @@ else:  # File Upload
             if not all([deepl_key, openai_key]):  # Note: jina_key not needed for file upload
                 st.error("Bitte füllen Sie alle erforderlichen API-Keys aus")
             else:
-                try:
-                    # Reset all stored texts including analysis
-                    st.session_state.processed_text = {
-                        'original': '',
-                        'cleaned': '',
-                        'translated': '',
-                        'final': '',
-                        'analysis': ''
-                    }
-                    
-                    with st.status("Verarbeite Datei...", expanded=True) as status:
-                        # Read file based on type
-                        file_type = uploaded_file.name.split('.')[-1].lower()
-                        if file_type == 'txt':
-                            text = read_text_file(uploaded_file)
-                        elif file_type == 'docx':
-                            text = read_docx_file(uploaded_file)
-                        elif file_type == 'rtf':
-                            text = read_rtf_file(uploaded_file)
-                        
-                        # Store in session state (original and cleaned are the same for file upload)
-                        st.session_state.processed_text['original'] = text
-                        st.session_state.processed_text['cleaned'] = text
-                        
-                        # Translate text
-                        st.write("🔄 Übersetze Text...")
-                        translated_text = translate_text(text, deepl_key)
-                        st.session_state.processed_text['translated'] = translated_text
-                        
-                        # Optimize translation
-                        st.write("✨ Optimiere Übersetzung...")
-                        final_text = optimize_translation(text, translated_text, openai_key)
-                        st.session_state.processed_text['final'] = final_text
-                        
-                        status.update(label="Verarbeitung abgeschlossen! ✅", state="complete")
-                        
-                except Exception as e:
-                    st.error(f"Fehler bei der Verarbeitung: {str(e)}")
+                start_job(name=uploaded_file.name, data=uploaded_file.getvalue())
+
+# ======================================================================
+# Background Job Progress
+# ======================================================================
+# URL and file runs execute in the background worker pool; this session
+# only polls the job record, so reruns and reloads do not interrupt them.
+# Polling reruns just the progress fragment, not the whole page
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(job_id: str):
+    """Shows the progress of a running job until it has finished"""
+    job = get_job(job_id, st.session_state.session_id)
+    if job is None or job['status'] not in ('queued', 'running'):
+        # Rerun the page once so the result is loaded below
+        st.rerun()
+    with st.status(f"Verarbeite {job['name']}...", expanded=True):
+        st.write(JOB_STAGE_LABELS.get(job['stage'], "⏳ Warte auf einen freien Worker..."))
+        if job['detail']:
+            st.caption(job['detail'])
+        st.caption(f"Auftrag {job_id} läuft im Hintergrund weiter, auch wenn die Seite neu geladen wird.")
+    if job['partial']:
+        # The optimized text streams into the tab it will end up in
+        st.write("---")
+        (final_tab,) = st.tabs(["✨ Finale Version"])
+        with final_tab:
+            st.text_area("Finale Version", job['partial'], height=400, disabled=True)
+
+job_id = st.session_state.job_id or st.query_params.get("job")
+if job_id and input_method != "Batch":
+    job = get_job(job_id, st.session_state.session_id)
+    if job is None:
+        st.warning(f"Auftrag {job_id} wurde nicht gefunden")
+        st.session_state.job_id = None
+        st.query_params.pop("job", None)
+    elif job['status'] in ('queued', 'running'):
+        render_job_progress(job_id)
+    else:
+        if st.session_state.loaded_job != job_id:
+            # Pick up the result once, later edits (e.g. re-optimizations) are kept
+            st.session_state.loaded_job = job_id
+            if job['status'] == 'done':
+                st.session_state.processed_text = store_result({**empty_result(), **job['result']})
+                st.session_state.result_targets = job['options'].get('targets', [DEFAULT_TARGET])
+            st.session_state.run_metrics = job['metrics']
+        if job['status'] == 'error':
+            st.error(f"Fehler bei der Verarbeitung: {job['error']}")
+
+# Per-stage breakdown of the last run
+if st.session_state.run_metrics and input_method != "Batch":
+    run_metrics = st.session_state.run_metrics
+    totals = run_metrics['totals']
+    with st.expander(
+        f"⏱️ Laufzeit & Kosten: {totals['duration']:.1f} s, ca. ${totals['cost_usd']:.4f}"
+    ):
+        st.dataframe(
+            [
+                {
+                    "Stufe": row['stage'],
+                    "Aufrufe": row['calls'],
+                    "Dauer (s)": round(row['duration'], 2),
+                    "Wartezeit (s)": round(row['queue_wait'], 2),
+                    "Cache Treffer/Fehl": f"{row['cache_hits']}/{row['cache_misses']}",
+                    "Geteilt": row['coalesced'],
+                    "Hedges": row['hedged'],
+                    "Unverändert 304/Hash": f"{row['revalidated']}/{row['unchanged']}",
+                    "Tokens ein": row['prompt_tokens'],
+                    "Tokens gespart": row['tokens_saved'],
+                    "Tokens aus": row['completion_tokens'],
+                    "Prognose ein/aus": (
+                        f"{row['predicted_prompt_tokens']}/{row['predicted_completion_tokens']}"
+                    ),
+                    "Reasoning": row['reasoning_tokens'],
+                    "DeepL Zeichen": row['characters'],
+                    "Absätze Cache/TM/gesendet": (
+                        f"{row['segments_cached']}/{row['segments_memory']}/{row['segments_sent']}"
+                    ),
+                    "Kosten ($)": round(row['cost_usd'], 4),
+                }
+                for row in run_metrics['breakdown']
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        for decision in run_metrics.get('decisions', []):
+            if decision['kind'] == "route":
+                st.caption(
+                    f"Optimierung Teil {decision['part']}/{decision['total']}: {decision['model']}"
+                    f"{' (' + decision['reasoning_effort'] + ')' if decision['reasoning_effort'] else ''}"
+                    f" – {decision['reason']}"
+                )
+            elif decision['kind'] == "fallback":
+                st.caption(f"Fallback {decision['stage']} ({decision['target']}): {decision['action']}")
+        st.caption(f"Trace {run_metrics['run_id']} (als JSON im Metrik-Verzeichnis gespeichert)")
 
 # Results Display
+@timed_fragment("Text")
+def render_text(label: str, key: str, editable: bool = False):
+    """One text of the result in a tab"""
+    st.text_area(label, result_text(key), height=400, disabled=not editable)
+
+
+@timed_fragment("Vergleich")
+def render_comparison(edition: str):
+    """Side-by-side view of the source and the final translation"""
+    col_orig, col_final = st.columns(2)
+
+    with col_orig:
+        if input_method != "Datei-Upload":
+            st.markdown("### Original (Bereinigt)")
+            display_text = result_text('cleaned')
+        else:
+            st.markdown("### Original")
+            display_text = result_text('original')
+
+        st.text_area(
+            "",  # Empty label as we use markdown above
+            display_text,
+            height=600,
+            disabled=False,
+            key="compare_original"
+        )
+
+    with col_final:
+        st.markdown("### Finale Übersetzung")
+        st.text_area(
+            "",  # Empty label as we use markdown above
+            result_text(edition_field('final', edition)),
+            height=600,
+            disabled=False,
+            key="compare_final"
+        )
+
+
+@timed_fragment("Qualitätsprüfung")
+def render_quality_check(edition: str):
+    """Quality check, report and targeted re-optimization of one edition"""
+    if st.button("Qualitätsprüfung durchführen", type="primary", use_container_width=True):
+        try:
+            if stream_output:
+                # Render the report while it is being written
+                st.markdown("## Prüfbericht")
+                analysis_result = st.write_stream(
+                    stream_analyze_translation(
+                        result_text('cleaned'),
+                        result_text(edition_field('final', edition)),
+                        openai_key,
+                        edition
+                    )
+                )
+            else:
+                with st.status("Führe Qualitätsprüfung durch...", expanded=True) as status:
+                    analysis_result = analyze_translation(
+                        result_text('cleaned'),
+                        result_text(edition_field('final', edition)),
+                        openai_key,
+                        edition
+                    )
+                    status.update(label="Qualitätsprüfung abgeschlossen! ✅", state="complete")
+            st.session_state.processed_text[edition_field('analysis', edition)] = put_text(analysis_result)
+            # The report download lives outside this fragment
+            st.rerun()
+        except Exception as e:
+            st.error(f"Fehler bei der Qualitätsprüfung: {str(e)}")
+
+    if st.session_state.processed_text.get(edition_field('analysis', edition)):
+        st.markdown("## Prüfbericht")
+        st.markdown(report_markdown(result_text(edition_field('analysis', edition))))
+
+    # Targeted re-optimization of the paragraphs flagged by the quality check
+    if st.session_state.get('reoptimize_notice'):
+        st.success(st.session_state.pop('reoptimize_notice'))
+
+    findings = parse_findings(result_text(edition_field('analysis', edition)))
+    if findings:
+        st.markdown("## Befunde")
+        selected_findings = [
+            finding for number, finding in enumerate(findings)
+            if st.checkbox(
+                f"Absatz {finding['paragraph']} – {finding['category']}: {finding['issue']}",
+                value=True,
+                key=f"finding_{number}"
+            )
+        ]
+        if st.button(
+            "Markierte Absätze nachbessern",
+            use_container_width=True,
+            disabled=not selected_findings
+        ):
+            try:
+                with st.status("Bessere markierte Absätze nach...", expanded=True) as status:
+                    final_text, tasks = reoptimize_flagged_paragraphs(
+                        result_text('cleaned'),
+                        result_text(edition_field('final', edition)),
+                        selected_findings,
+                        openai_key,
+                        edition
+                    )
+                    st.session_state.processed_text[edition_field('final', edition)] = put_text(final_text)
+                    # The findings refer to the old paragraphs, so the report is outdated
+                    st.session_state.processed_text[edition_field('analysis', edition)] = ''
+                    status.update(label="Nachbesserung abgeschlossen! ✅", state="complete")
+                st.session_state.reoptimize_notice = (
+                    f"{len(tasks)} Absätze nachgebessert. "
+                    "Führen Sie die Qualitätsprüfung erneut durch, um das Ergebnis zu prüfen."
+                )
+                st.rerun()
+            except Exception as e:
+                st.error(f"Fehler bei der Nachbesserung: {str(e)}")
+
+
+@timed_fragment("Downloads")
+def render_downloads(edition: str):
+    """Download buttons for all texts of one edition"""
+    refs = st.session_state.processed_text
+    # Get file prefix from cleaned text (which contains the title)
+    file_prefix = file_prefix_of(refs['cleaned'], date.today().isoformat())
+    # Further editions get their language code appended, like the CLI output
+    edition_suffix = '' if edition == st.session_state.result_targets[0] else f"_{edition.lower()}"
+
+    # One button per file of pipeline/artifacts.py; texts that do not exist
+    # yet (e.g. the report before the quality check) are left out
+    for column, (key, suffix, label) in zip(st.columns(len(ARTIFACTS)), ARTIFACTS):
+        ref = refs.get(edition_field(key, edition) if key in EDITION_KEYS else key, '')
+        if not ref:
+            continue
+        file_name = f"{file_prefix}_{suffix}{edition_suffix if key in EDITION_KEYS else ''}.txt"
+        with column:
+            st.download_button(
+                label,
+                download_payload(ref),
+                file_name=file_name,
+                mime="text/plain",
+                use_container_width=True
+            )
+
+
+# Texts are pruned from the blob store after BLOB_TTL_DAYS; a result kept
+# in an old session (or loaded from an old batch) may no longer exist
+if st.session_state.processed_text['original']:
+    try:
+        load_result(st.session_state.processed_text)
+    except BlobExpired:
+        st.session_state.processed_text = empty_result()
+        st.warning("⌛ Dieses Ergebnis ist abgelaufen und wurde gelöscht. Bitte den Artikel erneut verarbeiten.")
+
 if st.session_state.processed_text['original']:
     st.write("---")
+
+    # Deadline fallbacks, e.g. an unoptimized DeepL text published as final version
+    if result_text('fallback'):
+        st.warning("⏱️ Zeitbudget überschritten:\n\n" + result_text('fallback'))
+
+    # Language edition shown in the translation tabs and downloads
+    edition = st.session_state.result_targets[0]
+    if len(st.session_state.result_targets) > 1:
+        edition = st.radio(
+            "Sprachfassung",
+            st.session_state.result_targets,
+            format_func=lambda code: TARGET_LANGUAGES[code]["language"],
+            horizontal=True
+        )
     
     # Create tabs for different versions including Analysis tab
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
@@ -304,145 +653,33 @@ if st.session_state.processed_text['original']:
     ])
     
     with tab1:
-        st.text_area(
-            "Original Text",
-            st.session_state.processed_text['original'],
-            height=400,
-            disabled=True
-        )
+        render_text("Original Text", 'original')
         
     with tab2:
-        if input_method == "URL":
-            st.text_area(
-                "Bereinigter Text",
-                st.session_state.processed_text['cleaned'],
-                height=400,
-                disabled=True
-            )
+        if input_method != "Datei-Upload":
+            render_text("Bereinigter Text", 'cleaned')
         else:
             st.info("Bei Datei-Upload wird keine Bereinigung durchgeführt. Der bereinigte Text entspricht dem Original.")
         
     with tab3:
-        st.text_area(
-            "DeepL Übersetzung",
-            st.session_state.processed_text['translated'],
-            height=400,
-            disabled=True
-        )
+        render_text("DeepL Übersetzung", edition_field('translated', edition))
         
     with tab4:
-        st.text_area(
-            "Finale Version",
-            st.session_state.processed_text['final'],
-            height=400,
-            disabled=False
-        )
+        render_text("Finale Version", edition_field('final', edition), editable=True)
         
     with tab5:
-        # Create a side-by-side comparison view
-        col_orig, col_final = st.columns(2)
-        
-        with col_orig:
-            if input_method == "URL":
-                st.markdown("### Original (Bereinigt)")
-                display_text = st.session_state.processed_text['cleaned']
-            else:
-                st.markdown("### Original")
-                display_text = st.session_state.processed_text['original']
-            
-            st.text_area(
-                "",  # Empty label as we use markdown above
-                display_text,
-                height=600,
-                disabled=False,
-                key="compare_original"
-            )
-            
-        with col_final:
-            st.markdown("### Finale Übersetzung")
-            st.text_area(
-                "",  # Empty label as we use markdown above
-                st.session_state.processed_text['final'],
-                height=600,
-                disabled=False,
-                key="compare_final"
-            )
+        render_comparison(edition)
 
     with tab6:
-        # Quality check button and display
-        if st.button("Qualitätsprüfung durchführen", type="primary", use_container_width=True):
-            try:
-                with st.status("Führe Qualitätsprüfung durch...", expanded=True) as status:
-                    analysis_result = analyze_translation(
-                        st.session_state.processed_text['cleaned'],
-                        st.session_state.processed_text['final'],
-                        openai_key
-                    )
-                    st.session_state.processed_text['analysis'] = analysis_result
-                    status.update(label="Qualitätsprüfung abgeschlossen! ✅", state="complete")
-            except Exception as e:
-                st.error(f"Fehler bei der Qualitätsprüfung: {str(e)}")
-        
-        if st.session_state.processed_text.get('analysis'):
-            st.markdown("## Prüfbericht")
-            st.markdown(st.session_state.processed_text['analysis'])
+        render_quality_check(edition)
 
     # Download buttons for all versions
     st.write("---")
     st.subheader("Downloads")
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    # Get file prefix from cleaned text (which contains the title)
-    file_prefix = get_file_prefix(st.session_state.processed_text['cleaned'])
-    
-    with col1:
-        st.download_button(
-            "Download Original",
-            st.session_state.processed_text['original'],
-            file_name=f"{file_prefix}_original.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
-    
-    with col2:
-        st.download_button(
-            "Download Bereinigt",
-            st.session_state.processed_text['cleaned'],
-            file_name=f"{file_prefix}_bereinigt.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
-    
-    with col3:
-        st.download_button(
-            "Download DeepL",
-            st.session_state.processed_text['translated'],
-            file_name=f"{file_prefix}_deepl.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
-    
-    with col4:
-        st.download_button(
-            "Download Final",
-            st.session_state.processed_text['final'],
-            file_name=f"{file_prefix}_final.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
-    
-    with col5:
-        if st.session_state.processed_text.get('analysis'):
-            st.download_button(
-                "Download Prüfbericht",
-                st.session_state.processed_text['analysis'],
-                file_name=f"{file_prefix}_pruefbericht.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
+    render_downloads(edition)
     
 # ======================================================================
-# 6) Footer
+# 4) Footer
 # ======================================================================
 st.write("---")
 st.markdown("""
@@ -0,0 +1,5 @@
+# ======================================================================
+# Offline Benchmarks
+# ======================================================================
+# Local stand-ins for Jina, DeepL and OpenAI plus a load driver for the
+# pipeline stages. Run with: python -m bench --help
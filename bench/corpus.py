@@ -0,0 +1,53 @@
+import random
+
+# ======================================================================
+# Synthetic Corpus
+# ======================================================================
+# Article sizes in words, roughly a news brief, a regular story and a long read
+ARTICLE_SIZES = {
+    "small": 150,
+    "medium": 900,
+    "large": 4000,
+}
+
+WORDS = (
+    "the government said on monday that officials would review the plan after "
+    "critics warned it could raise costs for families across the country while "
+    "supporters argued the measure was needed to protect local businesses and "
+    "workers who have struggled since the pandemic according to a statement"
+).split()
+
+BOILERPLATE = [
+    "Skip to main content",
+    "Subscribe now | Sign in",
+    "Share this article: Facebook Twitter Email",
+    "Advertisement",
+    "© 2025 The Example Post. All rights reserved.",
+]
+
+
+def make_article(words: int, seed: int) -> str:
+    """Builds a deterministic article with a title, paragraphs and page boilerplate"""
+    rng = random.Random(seed)
+    title = " ".join(rng.choice(WORDS) for _ in range(8)).capitalize()
+    paragraphs = []
+    remaining = words
+    while remaining > 0:
+        size = min(remaining, rng.randint(40, 90))
+        sentence_words = [rng.choice(WORDS) for _ in range(size)]
+        paragraphs.append(" ".join(sentence_words).capitalize() + ".")
+        remaining -= size
+    return "\n\n".join(BOILERPLATE[:2] + [title, "By A. Reporter"] + paragraphs + BOILERPLATE[2:])
+
+
+def make_corpus(articles_per_size: int = 3, sizes: list = None) -> dict:
+    """Returns {path: article} for the mock Jina server, path like 'articles/medium/1'.
+
+    The benchmark requests them as https://news.example.com/<path>.
+    """
+    corpus = {}
+    for size in sizes or list(ARTICLE_SIZES):
+        for number in range(articles_per_size):
+            seed = ARTICLE_SIZES[size] * 1000 + number
+            corpus[f"articles/{size}/{number}"] = make_article(ARTICLE_SIZES[size], seed)
+    return corpus
@@ -0,0 +1,225 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from prompts import TRANSLATION_MEMORY_NOTE
+
+# ======================================================================
+# Mock Configuration
+# ======================================================================
+class MockConfig:
+    """Latency and failure behaviour shared by all mock servers"""
+
+    def __init__(self, jina_latency: float = 0.5, deepl_latency: float = 0.3,
+                 deepl_chars_per_second: float = 50000, openai_latency: float = 0.8,
+                 tokens_per_second: float = 150, error_rate: float = 0.0, seed: int = 42):
+        self.jina_latency = jina_latency
+        self.deepl_latency = deepl_latency
+        self.deepl_chars_per_second = deepl_chars_per_second
+        self.openai_latency = openai_latency          # time to first token
+        self.tokens_per_second = tokens_per_second    # generation speed
+        self.error_rate = error_rate                  # share of requests answered with 429
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"jina": 0, "deepl": 0, "openai": 0, "rejected": 0}
+
+    def count(self, provider: str) -> bool:
+        """Counts a request and returns True if it should be rejected with 429"""
+        with self._lock:
+            self.counts[provider] += 1
+            rejected = self._random.random() < self.error_rate
+            if rejected:
+                self.counts["rejected"] += 1
+            return rejected
+
+
+# ======================================================================
+# Request Handlers
+# ======================================================================
+class MockHandler(BaseHTTPRequestHandler):
+    """Routes requests to the Jina, DeepL or OpenAI imitation"""
+
+    protocol_version = "HTTP/1.1"
+    config = None   # MockConfig, set by start_mock_server
+    corpus = None   # dict of path -> article text
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self) -> None:
+        body = json.dumps({"error": {"message": "Rate limit reached (mock)", "type": "rate_limit"}}).encode()
+        self._send(429, body, "application/json", {"Retry-After": "0.1"})
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    # ------------------------------------------------------------------
+    # Jina Reader: GET /<url>
+    # ------------------------------------------------------------------
+    def do_GET(self):
+        if self.config.count("jina"):
+            return self._reject()
+        time.sleep(self.config.jina_latency)
+        # Jina is called as /<article url>; look the article up by its path
+        target = self.path.lstrip("/")
+        if "://" in target:
+            target = urlparse(target).path.lstrip("/")
+        text = self.corpus.get(target)
+        if text is None:
+            return self._send(404, b"not found", "text/plain")
+        self._send(200, text.encode("utf-8"), "text/plain; charset=utf-8")
+
+    def do_POST(self):
+        if self.path.rstrip("/").endswith("/translate"):
+            return self._deepl()
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            return self._openai()
+        self._send(404, b"not found", "text/plain")
+
+    # ------------------------------------------------------------------
+    # DeepL: POST /v2/translate (form or JSON encoded)
+    # ------------------------------------------------------------------
+    def _deepl(self):
+        body = self._read_body()
+        if self.config.count("deepl"):
+            return self._reject()
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            texts = json.loads(body or b"{}").get("text", [])
+        else:
+            texts = parse_qs(body.decode("utf-8")).get("text", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        characters = sum(len(text) for text in texts)
+        time.sleep(self.config.deepl_latency + characters / self.config.deepl_chars_per_second)
+        payload = {
+            "translations": [
+                {"detected_source_language": "EN", "text": f"[DE] {text}", "billed_characters": len(text)}
+                for text in texts
+            ]
+        }
+        self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+    # ------------------------------------------------------------------
+    # OpenAI: POST /v1/chat/completions (blocking and SSE streaming)
+    # ------------------------------------------------------------------
+    def _openai(self):
+        request = json.loads(self._read_body() or b"{}")
+        if self.config.count("openai"):
+            return self._reject()
+
+        answer = mock_completion(request["messages"])
+        words = answer.split(" ")
+        prompt_tokens = sum(len(json.dumps(message)) for message in request["messages"]) // 4
+        completion_tokens = max(1, len(answer) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "completion_tokens_details": {
+                "reasoning_tokens": completion_tokens // 2 if request.get("reasoning_effort") else 0
+            },
+        }
+        base = {
+            "id": "chatcmpl-mock",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "system_fingerprint": None,
+        }
+        time.sleep(self.config.openai_latency)
+        seconds_per_word = 1.3 / self.config.tokens_per_second
+
+        if not request.get("stream"):
+            time.sleep(len(words) * seconds_per_word)
+            payload = dict(
+                base,
+                object="chat.completion",
+                choices=[{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": answer},
+                }],
+                usage=usage,
+            )
+            return self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data: str) -> None:
+            chunk = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+
+        # Send a few words per event, like the real API
+        for start in range(0, len(words), 5):
+            piece = " ".join(words[start:start + 5]) + (" " if start + 5 < len(words) else "")
+            time.sleep(len(words[start:start + 5]) * seconds_per_word)
+            send_event(json.dumps(dict(
+                base,
+                object="chat.completion.chunk",
+                choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            )))
+        send_event(json.dumps(dict(
+            base,
+            object="chat.completion.chunk",
+            choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        )))
+        if request.get("stream_options", {}).get("include_usage"):
+            send_event(json.dumps(dict(base, object="chat.completion.chunk", choices=[], usage=usage)))
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def _message_text(message: dict) -> str:
+    content = message["content"]
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
+
+
+def mock_completion(messages: list) -> str:
+    """Returns a plausible answer for the prompts built in prompts.py.
+
+    Cleaning echoes the input, optimization returns the DeepL part (without
+    the translation memory hints that may follow it) and the quality check
+    returns a short report, so output sizes are realistic.
+    """
+    user_text = _message_text(messages[-1])
+    if "# DeepL Übersetzung:" in user_text:
+        translation = user_text.split("# DeepL Übersetzung:\n\n", 1)[1]
+        return translation.split(f"\n\n{TRANSLATION_MEMORY_NOTE}", 1)[0]
+    if user_text.startswith("# Englischer Originaltext:"):
+        return (
+            "## Abweichungsanalyse\n\nKeine Abweichungen gefunden (Mock).\n\n"
+            "```json\n{\"findings\": []}\n```"
+        )
+    return user_text
+
+
+# ======================================================================
+# Server Lifecycle
+# ======================================================================
+def start_mock_server(config: MockConfig, corpus: dict):
+    """Starts the mock server on a free local port, returns (server, base_url)"""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": config, "corpus": corpus})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
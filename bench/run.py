@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.corpus import ARTICLE_SIZES, make_corpus
+from bench.mock_servers import MockConfig, start_mock_server
+
+# ======================================================================
+# Benchmark Driver
+# ======================================================================
+# Usage:
+#   python -m bench                                  # default run, prints a JSON report
+#   python -m bench --sessions 8 --speed 0.2         # 8 concurrent editors, 5x faster mocks
+#   python -m bench --save-baseline bench/baseline.json
+#   python -m bench --baseline bench/baseline.json   # exits 1 on regressions
+#
+# The real pipeline stages are used; only the HTTP endpoints are local mocks.
+
+BENCH_KEYS = {"openai": "bench-openai", "deepl": "bench-deepl:fx", "jina": "bench-jina"}
+
+# Report values compared against a baseline, and whether higher is better
+BASELINE_METRICS = {
+    ("cold", "latency_p50"): False,
+    ("cold", "latency_p90"): False,
+    ("warm", "latency_p50"): False,
+    ("cold", "throughput"): True,
+}
+
+
+def configure_environment(base_url: str, work_dir: str) -> None:
+    """Points the pipeline at the mocks and at a fresh cache (before importing it)"""
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["DEEPL_SERVER_URL"] = base_url
+    os.environ["JINA_READER_URL"] = base_url
+    os.environ["STAGE_CACHE_PATH"] = os.path.join(work_dir, "stages.sqlite3")
+    os.environ["TRANSLATION_MEMORY_PATH"] = os.path.join(work_dir, "memory.sqlite3")
+    os.environ["BUDGET_PATH"] = os.path.join(work_dir, "budget.sqlite3")
+    os.environ["EXTRACTION_PATH"] = os.path.join(work_dir, "extractions.sqlite3")
+    # The article hosts of the corpus are not served by the mocks
+    os.environ["EXTRACT_REVALIDATE"] = "0"
+    os.environ["METRICS_DIR"] = ""
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def process_article(url: str, mode: str) -> dict:
+    """Runs one article through the URL flow of the app and returns its measurements"""
+    from pipeline import stages
+    from pipeline.metrics import start_run
+
+    started = time.perf_counter()
+    error = None
+    with start_run(url) as trace:
+        try:
+            raw_text = stages.extract_text_from_url(url, BENCH_KEYS["jina"])
+            if mode == "overlap":
+                cleaned_text, translated_text = stages.clean_and_translate_overlapped(
+                    raw_text, BENCH_KEYS["openai"], BENCH_KEYS["deepl"]
+                )
+            else:
+                cleaned_text = stages.clean_text_with_gpt(raw_text, BENCH_KEYS["openai"])
+                translated_text = stages.translate_text(cleaned_text, BENCH_KEYS["deepl"])
+            ''.join(stages.stream_optimize_translation(cleaned_text, translated_text, BENCH_KEYS["openai"]))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    breakdown = trace.breakdown()
+    return {
+        "url": url,
+        "size": url.split("/")[-2],
+        "latency": time.perf_counter() - started,
+        "cache_hits": sum(row["cache_hits"] for row in breakdown),
+        "cache_misses": sum(row["cache_misses"] for row in breakdown),
+        "segments_cached": sum(row["segments_cached"] for row in breakdown),
+        "segments_memory": sum(row["segments_memory"] for row in breakdown),
+        "segments_sent": sum(row["segments_sent"] for row in breakdown),
+        "error": error,
+    }
+
+
+def run_pass(urls: list, sessions: int, mode: str, config: MockConfig, measure_memory: bool) -> dict:
+    """Runs ``sessions`` concurrent editors, each processing all URLs in its own order"""
+    counts_before = dict(config.counts)
+    if measure_memory:
+        tracemalloc.start()
+
+    def session(number: int) -> list:
+        # Rotate the order so sessions do not all hit the same article at once
+        offset = number % len(urls)
+        return [process_article(url, mode) for url in urls[offset:] + urls[:offset]]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        records = [record for result in executor.map(session, range(sessions)) for record in result]
+    wall_time = time.perf_counter() - started
+
+    peak_memory = 0
+    if measure_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies = [record["latency"] for record in records if not record["error"]]
+    hits = sum(record["cache_hits"] for record in records)
+    lookups = hits + sum(record["cache_misses"] for record in records)
+    return {
+        "articles": len(records),
+        "errors": sum(1 for record in records if record["error"]),
+        "error_samples": sorted({record["error"] for record in records if record["error"]})[:3],
+        "wall_time": round(wall_time, 3),
+        "throughput": round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+        "latency_p50": round(percentile(latencies, 0.50), 3),
+        "latency_p90": round(percentile(latencies, 0.90), 3),
+        "latency_p99": round(percentile(latencies, 0.99), 3),
+        "latency_max": round(max(latencies, default=0.0), 3),
+        "latency_p50_by_size": {
+            size: round(percentile([r["latency"] for r in records if r["size"] == size and not r["error"]], 0.5), 3)
+            for size in sorted({record["size"] for record in records})
+        },
+        "memory_peak_per_session_mb": round(peak_memory / sessions / 1e6, 2),
+        "stage_cache_hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        "segments_cached": sum(record["segments_cached"] for record in records),
+        "segments_memory": sum(record["segments_memory"] for record in records),
+        "segments_sent": sum(record["segments_sent"] for record in records),
+        "mock_requests": {
+            name: config.counts[name] - counts_before[name] for name in config.counts
+        },
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a description of every metric that regressed by more than ``tolerance``"""
+    regressions = []
+    for (pass_name, metric), higher_is_better in BASELINE_METRICS.items():
+        current = report["passes"][pass_name][metric]
+        reference = baseline["passes"][pass_name][metric]
+        if not reference:
+            continue
+        change = (current - reference) / reference
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{pass_name}.{metric}: {reference} -> {current} ({change:+.0%})")
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    """Entry point of ``python -m bench``"""
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline pipeline benchmark")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent editor sessions (default: 4)")
+    parser.add_argument("--articles", type=int, default=2, help="Articles per size class (default: 2)")
+    parser.add_argument("--sizes", default=",".join(ARTICLE_SIZES), help="Size classes, comma separated")
+    parser.add_argument("--mode", choices=["sequential", "overlap"], default="overlap",
+                        help="Clean/translate sequentially or overlapped (default: overlap)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Latency factor for all mocks, e.g. 0.1 for quick runs")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock requests answered with 429")
+    parser.add_argument("--tokens-per-second", type=float, default=150, help="Mock OpenAI generation speed")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (lower overhead)")
+    parser.add_argument("--save-baseline", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Compare against this report and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        jina_latency=0.5 * args.speed,
+        deepl_latency=0.3 * args.speed,
+        deepl_chars_per_second=50000 / args.speed,
+        openai_latency=0.8 * args.speed,
+        tokens_per_second=args.tokens_per_second / args.speed,
+        error_rate=args.error_rate,
+    )
+    corpus = make_corpus(args.articles, args.sizes.split(","))
+    urls = [f"https://news.example.com/{path}" for path in corpus]
+
+    server, base_url = start_mock_server(config, corpus)
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(base_url, work_dir)
+        try:
+            cold = run_pass(urls, args.sessions, args.mode, config, not args.no_memory)
+            warm = run_pass(urls, args.sessions, args.mode, config, not args.no_memory)
+        finally:
+            server.shutdown()
+
+    report = {
+        "config": {
+            "sessions": args.sessions,
+            "articles": len(urls),
+            "sizes": args.sizes,
+            "mode": args.mode,
+            "speed": args.speed,
+            "error_rate": args.error_rate,
+            "tokens_per_second": args.tokens_per_second,
+        },
+        "passes": {"cold": cold, "warm": warm},
+        "cache_speedup_p50": round(cold["latency_p50"] / warm["latency_p50"], 1) if warm["latency_p50"] else None,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,10 @@
+# ======================================================================
+# Headless Translation Pipeline
+# ======================================================================
+# Everything here works without Streamlit, so the stages can be used from
+# app.py as well as from cron jobs and workers (see pipeline/cli.py).
+# openai, deepl and requests are only imported when a stage needs them.
+#
+# Import from the submodules (pipeline.stages, pipeline.jobs, ...); the
+# package itself stays empty so that importing one part of the pipeline
+# does not load the job store, the batch runner and their databases.
@@ -0,0 +1,90 @@
+import hashlib
+import os
+from datetime import datetime
+
+# ======================================================================
+# Result Artifacts
+# ======================================================================
+# (key in the result dict, file name suffix, download button label)
+ARTIFACTS = [
+    ('original', 'original', "Download Original"),
+    ('cleaned', 'bereinigt', "Download Bereinigt"),
+    ('translated', 'deepl', "Download DeepL"),
+    ('final', 'final', "Download Final"),
+    ('analysis', 'pruefbericht', "Download Prüfbericht"),
+]
+
+# Hex digits of the source hash in the names of files written by write_artifacts
+SOURCE_HASH_CHARS = 8
+
+# Texts that exist once per target language. The first (primary) target uses
+# the plain keys above, further editions '<key>_<target>', e.g. 'final_fr'
+EDITION_KEYS = ('translated', 'final', 'analysis')
+
+
+def edition_key(key: str, target: str, primary: str) -> str:
+    """Returns the result key of a per-language text of the given edition"""
+    return key if target == primary else f"{key}_{target.lower()}"
+
+
+def empty_result() -> dict:
+    """Returns the empty text set used for st.session_state.processed_text.
+
+    'fallback' holds the notices of deadline fallbacks (see pipeline/deadline.py),
+    one per line, and stays empty for a complete run.
+    """
+    return {
+        'original': '',
+        'cleaned': '',
+        'translated': '',
+        'final': '',
+        'analysis': '',
+        'fallback': ''
+    }
+
+
+def get_file_prefix(text: str) -> str:
+    """Extracts first 5 words from the text and adds current date"""
+    try:
+        # Get first line (title)
+        first_line = text.split('\n')[0] if text else "Untitled"
+        # Get first 5 words
+        words = first_line.split()[:5]
+        title_prefix = '_'.join(words)
+        # Clean title (remove special chars)
+        title_prefix = ''.join(c if c.isalnum() or c == '_' else '' for c in title_prefix)
+        # Add date
+        date_str = datetime.now().strftime("%Y_%m_%d")
+        return f"{title_prefix}_{date_str}"
+    except Exception:
+        # Fallback if something goes wrong
+        return f"article_{datetime.now().strftime('%Y_%m_%d')}"
+
+
+def write_artifacts(result: dict, directory: str, targets: list = ()) -> list:
+    """Writes the same text files the download buttons offer, returns their paths.
+
+    ``targets`` lists the target languages of a multi-language result; the
+    files of further editions get the language code appended. A short hash
+    of the original text follows the title and date, so two articles with
+    the same title written on the same day do not overwrite each other,
+    while a rerun of the same article replaces its files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    source_hash = hashlib.sha256(result['original'].encode('utf-8')).hexdigest()[:SOURCE_HASH_CHARS]
+    file_prefix = f"{get_file_prefix(result['cleaned'])}_{source_hash}"
+    files = [(key, f"{file_prefix}_{suffix}") for key, suffix, _ in ARTIFACTS]
+    for target in targets[1:]:
+        files += [
+            (edition_key(key, target, targets[0]), f"{file_prefix}_{suffix}_{target.lower()}")
+            for key, suffix, _ in ARTIFACTS if key in EDITION_KEYS
+        ]
+    paths = []
+    for key, name in files:
+        if not result.get(key):
+            continue
+        path = os.path.join(directory, f"{name}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(result[key])
+        paths.append(path)
+    return paths
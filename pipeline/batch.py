@@ -0,0 +1,193 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prompts import DEFAULT_TARGET
+from pipeline.artifacts import edition_key, empty_result
+from pipeline.boilerplate import preclean
+from pipeline.clients import limit_requests
+from pipeline.deadline import (
+    DEFAULT_RUN_DEADLINE,
+    FALLBACK_ANALYZE,
+    FALLBACK_CLEAN,
+    FALLBACK_OPTIMIZE,
+    DeadlineExceeded,
+    degrade,
+    start_deadline
+)
+from pipeline.metrics import start_run, submit_with_context
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# Maximum number of concurrent requests per provider, override with BATCH_LIMIT_<PROVIDER>
+DEFAULT_PROVIDER_LIMITS = {
+    "jina": 8,
+    "openai": 6,
+    "deepl": 4,
+}
+
+
+def get_provider_limits() -> dict:
+    """Returns the concurrency limit per provider, honouring BATCH_LIMIT_<PROVIDER>"""
+    return {
+        provider: int(os.environ.get(f"BATCH_LIMIT_{provider.upper()}", limit))
+        for provider, limit in DEFAULT_PROVIDER_LIMITS.items()
+    }
+
+
+# ======================================================================
+# Batch Runner
+# ======================================================================
+class BatchRunner:
+    """Runs many articles through the pipeline stages concurrently.
+
+    ``stages`` maps stage names to callables with API keys already bound:
+    ``extract(url)``, ``clean(text)``, ``translate(text)`` and
+    ``optimize(cleaned_text, translated_text)``, plus an optional
+    ``analyze(cleaned_text, final_text)`` quality check. Each provider gets its own
+    semaphore, taken by every outgoing request (see limit_requests in
+    pipeline/clients.py), so e.g. DeepL never sees more than its limit of
+    parallel requests - even when a stage sends its chunks in parallel -
+    while Jina and OpenAI calls of other articles keep running.
+
+    Translate, optimize and analyze also receive ``target_lang``. With
+    several ``targets`` every article is cleaned once and the further
+    editions (see pipeline/artifacts.py) run in parallel with the first one.
+
+    Every article gets its own ``deadline`` (seconds, see pipeline/deadline.py),
+    which does not count the time spent waiting for a request slot; a
+    cleaning, optimization or quality check that misses it falls back to the
+    pre-cleaned or DeepL text or is skipped, and the result lists this in 'fallback'.
+    """
+
+    def __init__(self, stages: dict, limits: dict = None, max_workers: int = None,
+                 targets: list = (DEFAULT_TARGET,), deadline: float = DEFAULT_RUN_DEADLINE):
+        self.stages = stages
+        self.targets = list(targets)
+        self.deadline = deadline
+        limits = limits or get_provider_limits()
+        self.semaphores = {
+            provider: threading.BoundedSemaphore(limit)
+            for provider, limit in limits.items()
+        }
+        # Articles mostly wait on the network, so allow enough workers to keep
+        # every provider busy at its limit
+        self.max_workers = max_workers or sum(limits.values())
+        # RunTrace per item index of the last run
+        self.traces = {}
+
+    def _call(self, stage: str, *args, **kwargs):
+        """Calls a stage; its requests take slots of the runner's semaphores"""
+        return self.stages[stage](*args, **kwargs)
+
+    def _clean(self, original_text: str, target: str, fallbacks: list) -> str:
+        """Cleans an extracted text, falling back to the local pre-cleaning at the deadline"""
+        try:
+            return self._call("clean", original_text)
+        except DeadlineExceeded as e:
+            fallbacks.append(degrade("clean", target, e, FALLBACK_CLEAN))
+            return preclean(original_text)[0]
+
+    def _optimize(self, cleaned_text: str, translated_text: str, target: str, fallbacks: list) -> str:
+        """Optimizes one edition, falling back to the DeepL text at the deadline"""
+        try:
+            return self._call("optimize", cleaned_text, translated_text, target_lang=target)
+        except DeadlineExceeded as e:
+            fallbacks.append(degrade("optimize", target, e, FALLBACK_OPTIMIZE))
+            return translated_text
+
+    def _analyze(self, cleaned_text: str, final_text: str, target: str, fallbacks: list) -> str:
+        """Checks one edition, skipping the check at the deadline"""
+        try:
+            return self._call("analyze", cleaned_text, final_text, target_lang=target)
+        except DeadlineExceeded as e:
+            fallbacks.append(degrade("analyze", target, e, FALLBACK_ANALYZE))
+            return ''
+
+    def _edition(self, cleaned_text: str, target: str, fallbacks: list) -> tuple:
+        """Translates, optimizes and optionally checks one further edition"""
+        translated_text = self._call("translate", cleaned_text, target_lang=target)
+        final_text = self._optimize(cleaned_text, translated_text, target, fallbacks)
+        analysis = ''
+        if "analyze" in self.stages:
+            analysis = self._analyze(cleaned_text, final_text, target, fallbacks)
+        return translated_text, final_text, analysis
+
+    def _process(self, index: int, item: dict, events: queue.Queue) -> None:
+        """Processes one item as its own traced run"""
+        with start_run(item['name']) as trace, start_deadline(self.deadline), limit_requests(self.semaphores):
+            self.traces[index] = trace
+            event = self._process_item(index, item, events)
+        # Reported after the run is closed, so its trace is complete
+        events.put(event)
+
+    def _process_item(self, index: int, item: dict, events: queue.Queue) -> tuple:
+        """Processes one item, reports stage progress and returns the final event"""
+        result = empty_result()
+        stage = None
+        fallbacks = []
+        try:
+            if item.get('url'):
+                stage = "extract"
+                events.put(("stage", index, stage))
+                result['original'] = self._call(stage, item['url'])
+
+                stage = "clean"
+                events.put(("stage", index, stage))
+                result['cleaned'] = self._clean(result['original'], self.targets[0], fallbacks)
+            else:
+                # Uploaded files are not cleaned, original and cleaned are the same
+                result['original'] = item['text']
+                result['cleaned'] = item['text']
+
+            # Progress is reported for the primary edition, the others run alongside
+            primary, *others = self.targets
+            with ThreadPoolExecutor(max_workers=max(1, len(others))) as executor:
+                editions = {
+                    target: submit_with_context(executor, self._edition, result['cleaned'], target, fallbacks)
+                    for target in others
+                }
+
+                stage = "translate"
+                events.put(("stage", index, stage))
+                result['translated'] = self._call(stage, result['cleaned'], target_lang=primary)
+
+                stage = "optimize"
+                events.put(("stage", index, stage))
+                result['final'] = self._optimize(result['cleaned'], result['translated'], primary, fallbacks)
+
+                if "analyze" in self.stages:
+                    stage = "analyze"
+                    events.put(("stage", index, stage))
+                    result['analysis'] = self._analyze(result['cleaned'], result['final'], primary, fallbacks)
+
+                for target, future in editions.items():
+                    stage = target
+                    for key, text in zip(("translated", "final", "analysis"), future.result()):
+                        result[edition_key(key, target, primary)] = text
+
+            result['fallback'] = '\n'.join(fallbacks)
+            return ("done", index, result)
+        except Exception as e:
+            return ("error", index, f"{stage}: {e}")
+
+    def run(self, items: list):
+        """Processes all items and yields (event, index, payload) tuples.
+
+        Events are yielded in the calling thread, so Streamlit elements can
+        be updated directly. ``event`` is one of "stage", "done" or "error".
+        """
+        events = queue.Queue()
+        self.traces = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index, item in enumerate(items):
+                executor.submit(self._process, index, item, events)
+
+            pending = len(items)
+            while pending:
+                event = events.get()
+                if event[0] in ("done", "error"):
+                    pending -= 1
+                yield event
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# ======================================================================
+# Configuration
+# ======================================================================
+DEFAULT_BLOB_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "blobs"
+)
+
+# Blobs not written or reused for this long are removed, override with BLOB_TTL_DAYS
+DEFAULT_TTL_DAYS = 7
+
+# Decoded texts kept in memory, shared by all sessions of the process
+MEMORY_ITEMS = 64
+
+
+# ======================================================================
+# Content-Addressed Text Store
+# ======================================================================
+class BlobExpired(LookupError):
+    """Raised for a reference whose text was pruned after the TTL"""
+
+
+class BlobStore:
+    """Stores texts once per content hash, so sessions only keep short references.
+
+    Identical texts (e.g. original and cleaned text of an upload, or the
+    same article opened by several editors) share one file and one cached
+    string in memory. The empty text is always the empty reference.
+    """
+
+    def __init__(self, directory: str = DEFAULT_BLOB_DIR, ttl_days: float = DEFAULT_TTL_DAYS):
+        self.directory = directory
+        self.ttl = ttl_days * 24 * 3600
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.directory, ref[:2], ref)
+
+    def put(self, text: str) -> str:
+        """Stores a text and returns its reference"""
+        if not text:
+            return ''
+        data = text.encode('utf-8')
+        ref = hashlib.sha256(data).hexdigest()
+        path = self._path(ref)
+        if os.path.exists(path):
+            # Refresh the timestamp so pruning keeps texts that are still in use
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see partial blobs
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._remember(ref, text)
+        return ref
+
+    def get(self, ref: str) -> str:
+        """Returns the text of a reference ('' for the empty reference).
+
+        Raises BlobExpired when the text was pruned in the meantime.
+        """
+        if not ref:
+            return ''
+        with self._lock:
+            text = self._memory.get(ref)
+            if text is not None:
+                self._memory.move_to_end(ref)
+                return text
+        try:
+            with open(self._path(ref), 'rb') as f:
+                text = f.read().decode('utf-8')
+        except FileNotFoundError:
+            raise BlobExpired(ref) from None
+        self._remember(ref, text)
+        return text
+
+    def _remember(self, ref: str, text: str) -> None:
+        with self._lock:
+            self._memory[ref] = text
+            self._memory.move_to_end(ref)
+            while len(self._memory) > MEMORY_ITEMS:
+                self._memory.popitem(last=False)
+
+    def prune(self) -> int:
+        """Removes blobs older than the TTL, returns how many were deleted"""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Returns the process-wide blob store, honouring BLOB_DIR and BLOB_TTL_DAYS"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore(
+                os.environ.get("BLOB_DIR", DEFAULT_BLOB_DIR),
+                float(os.environ.get("BLOB_TTL_DAYS", DEFAULT_TTL_DAYS))
+            )
+            _store.prune()
+        return _store
+
+
+def put_text(text: str) -> str:
+    """Stores a text in the shared blob store and returns its reference"""
+    return get_blob_store().put(text)
+
+
+def get_text(ref: str) -> str:
+    """Returns the text of a blob reference, raises BlobExpired once it was pruned"""
+    return get_blob_store().get(ref)
+
+
+def store_result(result: dict) -> dict:
+    """Turns a result dict of texts into a dict of blob references"""
+    return {key: put_text(text or '') for key, text in result.items()}
+
+
+def load_result(refs: dict) -> dict:
+    """Turns a dict of blob references back into texts, raises BlobExpired if one was pruned"""
+    return {key: get_text(ref) for key, ref in refs.items()}
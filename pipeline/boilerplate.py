@@ -0,0 +1,193 @@
+import os
+import re
+from collections import Counter
+from urllib.parse import urlparse
+
+from pipeline.metrics import record
+from pipeline.tokens import estimate_tokens
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# "off" passes the Jina text through unchanged, "light" only drops lines
+# that are boilerplate beyond doubt, "strong" also applies the statistical
+# rules and removes Markdown formatting
+STRENGTHS = ("off", "light", "strong")
+DEFAULT_STRENGTH = os.environ.get("PRECLEAN_STRENGTH", "light")
+
+# A strongly pre-cleaned text at or above this confidence may skip GPT cleaning
+SKIP_LLM_CONFIDENCE = float(os.environ.get("PRECLEAN_SKIP_CONFIDENCE", 0.9))
+
+# Lines with at least this share of link markup are navigation
+LINK_ONLY_DENSITY = 0.9
+LINK_HEAVY_DENSITY = 0.5
+
+# Repeated lines up to this length (in words) are page furniture
+MAX_REPEATED_WORDS = 15
+
+# Footer markers only cut the text in its last part
+FOOTER_START = 0.5
+
+# ======================================================================
+# Patterns
+# ======================================================================
+JINA_HEADER = re.compile(r"^(Title|URL Source|Published Time|Markdown Content|Warning):\s*(.*)$")
+MARKDOWN_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+BARE_URL = re.compile(r"https?://\S+")
+LIST_MARKER = re.compile(r"^([*+-]|\d+\.)\s+")
+
+BOILERPLATE_LINES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"skip to (main )?(content|navigation)",
+    r"((subscribe|subscribe now|sign in|sign up|log in|register|menu|search)\s*\|?\s*)+",
+    r"advertisement|sponsored( content)?|ad feedback",
+    r"share (this )?(article|story|page)?:?.*(facebook|twitter|email|whatsapp|linkedin).*",
+    r"(©|\(c\)|copyright) .*",
+    r".*all rights reserved\.?",
+    r".*\b(accept|reject|manage) (all )?cookies\b.*",
+    r"we use cookies\b.*",
+    r"(read more|continue reading|show more|load more)\W*",
+    r"sign up for (our|the) .*newsletter.*",
+    r"follow us on .*",
+    r"(photo|image|picture|video|illustration)( credit)?:\s.*",
+)]
+
+FOOTER_MARKERS = re.compile(
+    r"(related (articles|stories|content|coverage)|more from .*|recommended( for you)?|"
+    r"most (read|popular|viewed)|read next|you may also like|comments?( \(\d+\))?)\W*",
+    re.IGNORECASE
+)
+
+# Per-site templates, keyed by host without "www."
+SITE_TEMPLATES = {
+    "apnews.com": [r"copyright \d{4} the associated press\..*"],
+    "reuters.com": [r"our standards: the thomson reuters trust principles\.?"],
+    "theguardian.com": [r"explore more on these topics", r"reuse this content"],
+}
+
+
+# ======================================================================
+# Line Rules
+# ======================================================================
+def link_density(line: str) -> float:
+    """Returns the share of a line taken up by Markdown links, images and URLs"""
+    if not line:
+        return 0.0
+    markup = sum(len(match.group(0)) for match in MARKDOWN_LINK.finditer(line))
+    markup += sum(len(match.group(0)) for match in BARE_URL.finditer(MARKDOWN_LINK.sub('', line)))
+    return markup / len(line)
+
+
+def strip_markdown(line: str) -> str:
+    """Removes images, link targets, headings, quotes and emphasis from a line"""
+    line = MARKDOWN_IMAGE.sub('', line)
+    line = MARKDOWN_LINK.sub(r"\1", line)
+    line = re.sub(r"^\s*(#{1,6}|>)\s*", '', line)
+    line = re.sub(r"(\*\*|__|\*|_)(?=\S)(.+?)(?<=\S)\1", r"\2", line)
+    return line.strip()
+
+
+def get_site_patterns(text: str) -> list:
+    """Returns the template patterns of the site named in the Jina 'URL Source' header"""
+    match = re.search(r"^URL Source:\s*(\S+)", text, re.MULTILINE)
+    if not match:
+        return []
+    host = urlparse(match.group(1)).netloc.lower().removeprefix("www.")
+    return [re.compile(pattern, re.IGNORECASE) for pattern in SITE_TEMPLATES.get(host, [])]
+
+
+def is_boilerplate(line: str, patterns: list) -> bool:
+    return any(pattern.fullmatch(line) for pattern in patterns)
+
+
+def is_suspicious(line: str) -> bool:
+    """Lines that look like leftover page elements rather than article prose"""
+    if BARE_URL.search(line) or MARKDOWN_LINK.search(line) or ' | ' in line:
+        return True
+    words = line.split()
+    return len(words) < 8 and not re.search(r"[.!?:\"”')]$", line) and not line.startswith("By ")
+
+
+# ======================================================================
+# Pre-Cleaning
+# ======================================================================
+def strip_boilerplate(text: str, strength: str = DEFAULT_STRENGTH) -> tuple:
+    """Removes mechanically detectable page elements from the raw Jina text.
+
+    Returns (text, confidence), where confidence is the share of remaining
+    lines that look like article prose. Only strongly pre-cleaned text is
+    free of Markdown, so the confidence of other strengths is 0.
+    """
+    if strength not in STRENGTHS:
+        raise ValueError(f"Unbekannte Stärke der Vorbereinigung: {strength}")
+    if strength == "off":
+        return text, 0.0
+
+    patterns = BOILERPLATE_LINES + get_site_patterns(text)
+    lines = text.split('\n')
+    title = None
+    kept = []
+    for line in lines:
+        stripped = line.strip()
+        header = JINA_HEADER.match(stripped)
+        if header:
+            if header.group(1) == "Title":
+                title = header.group(2).strip()
+                kept.append(line)
+            continue
+        if not stripped:
+            kept.append('')
+            continue
+        item = LIST_MARKER.sub('', stripped)
+        if MARKDOWN_IMAGE.sub('', item).strip() == '' or link_density(item) >= LINK_ONLY_DENSITY:
+            continue
+        if is_boilerplate(strip_markdown(stripped), patterns):
+            continue
+        kept.append(line)
+
+    if strength == "strong":
+        kept = _apply_strong_rules(kept, title)
+
+    # Collapse the blank lines left behind by removed elements
+    result = re.sub(r"\n{3,}", '\n\n', '\n'.join(kept)).strip('\n')
+
+    confidence = 0.0
+    if strength == "strong":
+        content = [line for line in result.split('\n') if line.strip()]
+        if content:
+            suspicious = sum(1 for line in content[1:] if is_suspicious(line))
+            confidence = 1 - suspicious / len(content)
+    return result, confidence
+
+
+def _apply_strong_rules(lines: list, title: str) -> list:
+    """Drops repeated and link-heavy lines, cuts the footer and removes Markdown"""
+    normalized = [' '.join(line.lower().split()) for line in lines]
+    counts = Counter(line for line in normalized if line)
+    kept = []
+    for index, (line, key) in enumerate(zip(lines, normalized)):
+        if line.startswith("Title: "):
+            kept.append(line)
+            continue
+        if key and counts[key] > 1 and len(key.split()) <= MAX_REPEATED_WORDS:
+            continue
+        if key and link_density(line.strip()) >= LINK_HEAVY_DENSITY and len(key.split()) < 25:
+            continue
+        plain = strip_markdown(line)
+        if index >= FOOTER_START * len(lines) and FOOTER_MARKERS.fullmatch(plain):
+            break
+        kept.append(plain)
+
+    # The article must start with its title, exactly once
+    body = [line for line in kept if not line.startswith("Title: ")]
+    first = next((line for line in body if line.strip()), None)
+    if title and first != title:
+        body = [title, ''] + body
+    return body
+
+
+def preclean(text: str, strength: str = DEFAULT_STRENGTH) -> tuple:
+    """Runs ``strip_boilerplate`` and records the input tokens it saved"""
+    cleaned, confidence = strip_boilerplate(text, strength)
+    record(tokens_saved=estimate_tokens(text) - estimate_tokens(cleaned))
+    return cleaned, confidence
@@ -0,0 +1,237 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from pipeline.metrics import record
+from pipeline.tokens import estimate_message_tokens, estimate_tokens
+
+# ======================================================================
+# Configuration
+# ======================================================================
+DEFAULT_BUDGET_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "budget.sqlite3"
+)
+
+# Context window, output limit and smallest completion limit per model, in
+# tokens; reasoning models get a generous floor because their hidden
+# reasoning counts against max_completion_tokens
+MODEL_LIMITS = {
+    "gpt-4o-mini": {"context": 128000, "output": 16384, "min_completion": 2048, "reasoning": False},
+    "o3-mini": {"context": 200000, "output": 100000, "min_completion": 16384, "reasoning": True},
+}
+
+# Starting estimates per prompt (see PROMPT_VERSIONS in prompts.py) until
+# real responses have been observed: visible output tokens per estimated
+# token of the text the model rewrites, and reasoning tokens per output token
+PROMPT_PROFILES = {
+    "cleaning": {"output_ratio": 1.0, "reasoning_ratio": 0.0},
+    "translation": {"output_ratio": 1.2, "reasoning_ratio": 2.0},
+    "quality_check": {"output_ratio": 0.5, "reasoning_ratio": 0.0},
+    "reoptimization": {"output_ratio": 1.5, "reasoning_ratio": 3.0},
+}
+
+# Headroom on top of the predicted completion, override with BUDGET_COMPLETION_MARGIN
+COMPLETION_MARGIN = float(os.environ.get("BUDGET_COMPLETION_MARGIN", 1.5))
+
+# Room kept for system prompt and memory hints when sizing chunks
+PROMPT_RESERVE_TOKENS = 4000
+
+# Weight of a new observation in the running averages
+LEARNING_RATE = 0.2
+
+# A truncated response raises the output estimate by this factor
+TRUNCATION_PENALTY = 1.5
+
+
+def get_model_limits(model: str) -> dict:
+    return MODEL_LIMITS.get(model, MODEL_LIMITS["gpt-4o-mini"])
+
+
+# ======================================================================
+# SQLite Store
+# ======================================================================
+class BudgetStore:
+    """Running averages of predicted versus actual usage per model and prompt.
+
+    ``prompt_ratio`` corrects the local prompt estimate towards the real
+    tokenizer, ``output_ratio`` and ``reasoning_ratio`` learn how long the
+    answers of a prompt are.
+    """
+
+    def __init__(self, path: str = DEFAULT_BUDGET_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS calibration (
+                    model TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    samples INTEGER NOT NULL,
+                    prompt_ratio REAL NOT NULL,
+                    output_ratio REAL NOT NULL,
+                    reasoning_ratio REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (model, prompt)
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, model: str, prompt: str) -> dict:
+        """Returns the calibration of a model and prompt, starting from its profile"""
+        row = self._connect().execute(
+            "SELECT samples, prompt_ratio, output_ratio, reasoning_ratio FROM calibration "
+            "WHERE model = ? AND prompt = ?",
+            (model, prompt)
+        ).fetchone()
+        if row is None:
+            return {"samples": 0, "prompt_ratio": 1.0, **PROMPT_PROFILES[prompt]}
+        return dict(zip(("samples", "prompt_ratio", "output_ratio", "reasoning_ratio"), row))
+
+    def observe(self, model: str, prompt: str, prompt_ratio: float, output_ratio: float,
+                reasoning_ratio: float, truncated: bool = False) -> None:
+        """Moves the averages towards one observed response"""
+        with self._connect() as conn:
+            # Read and write in one transaction so concurrent workers do not lose updates
+            conn.execute("BEGIN IMMEDIATE")
+            current = self.get(model, prompt)
+            if current["samples"]:
+                prompt_ratio = _blend(current["prompt_ratio"], prompt_ratio)
+                output_ratio = _blend(current["output_ratio"], output_ratio)
+                reasoning_ratio = _blend(current["reasoning_ratio"], reasoning_ratio)
+            if truncated:
+                # The observed output is only a lower bound
+                output_ratio = max(output_ratio, current["output_ratio"]) * TRUNCATION_PENALTY
+            conn.execute(
+                "INSERT OR REPLACE INTO calibration "
+                "(model, prompt, samples, prompt_ratio, output_ratio, reasoning_ratio, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model, prompt, current["samples"] + 1, prompt_ratio, output_ratio,
+                 reasoning_ratio, time.time())
+            )
+
+
+def _blend(current: float, observed: float) -> float:
+    return current + LEARNING_RATE * (observed - current)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_budget_store() -> BudgetStore:
+    """Returns the process-wide budget store, honouring BUDGET_PATH"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BudgetStore(os.environ.get("BUDGET_PATH", DEFAULT_BUDGET_PATH))
+        return _store
+
+
+# ======================================================================
+# Request Planning
+# ======================================================================
+class RequestBudget:
+    """Predicted size and completion limit of one chat completion"""
+
+    def __init__(self, model: str, prompt: str, estimated_prompt: int, source_tokens: int,
+                 calibration: dict):
+        self.model = model
+        self.prompt = prompt
+        self.estimated_prompt = estimated_prompt
+        self.source_tokens = source_tokens
+        limits = get_model_limits(model)
+        self.prompt_tokens = math.ceil(estimated_prompt * calibration["prompt_ratio"])
+        self.output_tokens = math.ceil(source_tokens * calibration["output_ratio"])
+        reasoning_ratio = calibration["reasoning_ratio"] if limits["reasoning"] else 0.0
+        self.reasoning_tokens = math.ceil(self.output_tokens * reasoning_ratio)
+        wanted = max(
+            limits["min_completion"],
+            math.ceil((self.output_tokens + self.reasoning_tokens) * COMPLETION_MARGIN)
+        )
+        self.max_completion_tokens = max(1, min(
+            wanted, limits["output"], limits["context"] - self.prompt_tokens
+        ))
+
+    @property
+    def completion_tokens(self) -> int:
+        return self.output_tokens + self.reasoning_tokens
+
+    def widen(self) -> None:
+        """Raises the completion limit to what the model allows, for a truncated request"""
+        limits = get_model_limits(self.model)
+        self.max_completion_tokens = max(1, min(limits["output"], limits["context"] - self.prompt_tokens))
+
+    def observe(self, usage, truncated: bool = False) -> None:
+        """Records predicted next to actual usage and updates the calibration"""
+        record(
+            predicted_prompt_tokens=self.prompt_tokens,
+            predicted_completion_tokens=self.completion_tokens
+        )
+        if usage is None:
+            return
+        completion_tokens = usage.completion_tokens or 0
+        details = getattr(usage, "completion_tokens_details", None)
+        reasoning_tokens = getattr(details, "reasoning_tokens", None) or 0
+        output_tokens = max(1, completion_tokens - reasoning_tokens)
+        get_budget_store().observe(
+            self.model,
+            self.prompt,
+            (usage.prompt_tokens or 0) / max(1, self.estimated_prompt),
+            output_tokens / max(1, self.source_tokens),
+            reasoning_tokens / output_tokens,
+            truncated
+        )
+
+
+def plan_request(prompt: str, model: str, messages: list, source: str) -> RequestBudget:
+    """Sizes a chat completion before it is sent.
+
+    ``source`` is the text the model rewrites or reviews, the output is
+    predicted from its length. Raises ValueError when the prompt cannot
+    fit into the context window of the model, so no request is wasted.
+    """
+    budget = RequestBudget(
+        model, prompt, estimate_message_tokens(messages), estimate_tokens(source),
+        get_budget_store().get(model, prompt)
+    )
+    limits = get_model_limits(model)
+    if budget.prompt_tokens + limits["min_completion"] > limits["context"]:
+        raise ValueError(
+            f"Text zu lang für {model}: ca. {budget.prompt_tokens} Tokens Prompt "
+            f"bei einem Kontextfenster von {limits['context']} Tokens"
+        )
+    return budget
+
+
+def plan_chunk_tokens(prompt: str, model: str, configured: int, source_share: float = 1.0) -> int:
+    """Returns the chunk budget (in local estimate units) for a chunked stage.
+
+    The configured budget is lowered when the calibrated completion of a
+    full chunk would exceed the output limit or, together with the prompt,
+    the context window of the model. ``source_share`` is the part of a chunk
+    that the model rewrites (1.0 for cleaning, about half for original plus
+    DeepL text).
+    """
+    calibration = get_budget_store().get(model, prompt)
+    limits = get_model_limits(model)
+    reasoning_ratio = calibration["reasoning_ratio"] if limits["reasoning"] else 0.0
+    completion_per_token = (
+        source_share * calibration["output_ratio"] * (1 + reasoning_ratio) * COMPLETION_MARGIN
+    )
+    by_output = limits["output"] / completion_per_token
+    by_context = (limits["context"] - PROMPT_RESERVE_TOKENS) / (calibration["prompt_ratio"] + completion_per_token)
+    return max(1, min(configured, int(by_output), int(by_context)))
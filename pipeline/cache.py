@@ -0,0 +1,493 @@
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import wraps
+
+from prompts import PROMPT_VERSIONS
+from pipeline.deadline import DeadlineExceeded, check_deadline, time_left
+from pipeline.metrics import activate, close_span, current_stage, open_span, record, stage_span
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# All settings can be overridden through environment variables, e.g.
+# STAGE_CACHE_PATH=/mnt/shared/stages.sqlite3 or STAGE_CACHE_TTL_OPTIMIZE=0
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "stages.sqlite3"
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+# TTL in seconds per stage, 0 means "never expires"
+DEFAULT_STAGE_TTLS = {
+    "extract": 3600,           # Reused without asking; afterwards revalidated, see pipeline/extraction.py
+    "clean": 30 * 24 * 3600,   # Deterministic for the same input and prompt
+    "translate": 30 * 24 * 3600,
+    "translate_segment": 30 * 24 * 3600,
+    "optimize": 30 * 24 * 3600,
+    "analyze": 30 * 24 * 3600,
+}
+
+
+# A replica computing a stage holds a lease on its key, so other replicas
+# wait for the result instead of paying for the same call. Leases expire
+# after STAGE_LEASE_SECONDS in case the holder dies.
+DEFAULT_LEASE_SECONDS = 900
+LEASE_POLL_SECONDS = 0.5
+
+
+def get_stage_ttl(stage: str) -> int:
+    """Returns the TTL for a stage, honouring STAGE_CACHE_TTL_<STAGE>"""
+    env_value = os.environ.get(f"STAGE_CACHE_TTL_{stage.upper()}")
+    if env_value is not None:
+        return int(env_value)
+    return DEFAULT_STAGE_TTLS.get(stage, 3600)
+
+
+def make_cache_key(stage: str, inputs: dict, model: str = None,
+                   prompt_version: str = None, params: dict = None) -> str:
+    """Builds a content-addressed key from stage, inputs, model, prompt version and parameters"""
+    payload = json.dumps(
+        {
+            "stage": stage,
+            "model": model,
+            "prompt_version": prompt_version,
+            "params": params or {},
+            "inputs": inputs,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ======================================================================
+# SQLite Store
+# ======================================================================
+class StageCache:
+    """Disk-backed stage cache with per-stage TTLs and size-bounded LRU eviction.
+
+    The SQLite file can live on a shared volume so that several replicas
+    (and restarts of the same replica) reuse each other's results.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, stage: str):
+        """Returns (hit, value) and refreshes the LRU timestamp on a hit"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, created FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+
+        value, created = row
+        ttl = get_stage_ttl(stage)
+        if ttl and now - created > ttl:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return False, None
+
+        with conn:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return True, json.loads(value)
+
+    def set(self, key: str, stage: str, value) -> None:
+        """Stores a value and evicts least recently used entries above the size limit"""
+        now = time.time()
+        serialized = json.dumps(value, ensure_ascii=False)
+        size = len(serialized.encode("utf-8"))
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, stage, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, serialized, size, now, now)
+            )
+        self._evict()
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the cache fits into max_bytes"""
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        with conn:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+
+    def acquire_lease(self, key: str, owner: str, seconds: float) -> bool:
+        """Takes the lease on a key unless another owner holds an unexpired one"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                (key, owner, now + seconds)
+            ).rowcount
+        return inserted == 1
+
+    def lease_active(self, key: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM leases WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def release_lease(self, key: str, owner: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def clear(self, stage: str = None) -> None:
+        """Removes all entries, or only those of one stage"""
+        conn = self._connect()
+        with conn:
+            if stage is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE stage = ?", (stage,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_stage_cache() -> StageCache:
+    """Returns the process-wide cache instance, configured from the environment"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = StageCache(
+                path=os.environ.get("STAGE_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_bytes=int(os.environ.get("STAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            )
+        return _cache
+
+
+# ======================================================================
+# Single Flight
+# ======================================================================
+# Identical calls that are in flight at the same time share one upstream
+# call: inside a process through a shared Future, across replicas through
+# a lease in the cache database.
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class FlightAborted(Exception):
+    """The leading call stopped without a result (e.g. an abandoned stream or its own deadline)"""
+
+
+def join_flight(key: str):
+    """Returns (future, leader); the leader must call finish_flight when done"""
+    with _flights_lock:
+        future = _flights.get(key)
+        if future is not None:
+            return future, False
+        future = _flights[key] = Future()
+        return future, True
+
+
+def finish_flight(key: str, future: Future, value=None, error: BaseException = None) -> None:
+    with _flights_lock:
+        _flights.pop(key, None)
+    if error is None:
+        future.set_result(value)
+    elif isinstance(error, Exception) and not isinstance(error, DeadlineExceeded):
+        future.set_exception(error)
+    else:
+        # The deadline belongs to the leader's run, followers may still have time
+        future.set_exception(FlightAborted())
+
+
+def wait_for_leader(future: Future):
+    """Returns the leader's result, raising DeadlineExceeded when the caller's own deadline passes first"""
+    left = time_left()
+    try:
+        return future.result(timeout=None if left is None else max(0.0, left))
+    except FutureTimeout:
+        raise DeadlineExceeded(f"Zeitbudget für {current_stage() or 'den Lauf'} erschöpft") from None
+
+
+def get_lease_seconds() -> float:
+    return float(os.environ.get("STAGE_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+
+
+def wait_for_lease(cache: StageCache, key: str, stage: str):
+    """Waits while another replica holds the lease on ``key``.
+
+    Returns (hit, value) from the cache once the lease is gone; a miss means
+    the other replica failed and the caller should compute the value itself.
+    Raises DeadlineExceeded when the caller's deadline passes while waiting.
+    """
+    waited = False
+    while cache.lease_active(key):
+        check_deadline()
+        waited = True
+        left = time_left()
+        time.sleep(LEASE_POLL_SECONDS if left is None else max(0.0, min(LEASE_POLL_SECONDS, left)))
+        hit, value = cache.get(key, stage)
+        if hit:
+            return True, value
+    if not waited:
+        return False, None
+    return cache.get(key, stage)
+
+
+def single_flight(cache: StageCache, key: str, stage: str, compute):
+    """Returns the cached value of ``key`` or computes it exactly once.
+
+    Concurrent callers in this process wait for the leader's Future; the
+    leader takes the cross-replica lease before calling ``compute``.
+    Returns (value, shared) where ``shared`` is True if another call did
+    the work.
+    """
+    while True:
+        future, leader = join_flight(key)
+        if not leader:
+            try:
+                return wait_for_leader(future), True
+            except FlightAborted:
+                continue
+
+        try:
+            value, shared = _compute_with_lease(cache, key, stage, compute)
+        except BaseException as e:
+            finish_flight(key, future, error=e)
+            raise
+        finish_flight(key, future, value)
+        return value, shared
+
+
+def acquire_or_wait(cache: StageCache, key: str, stage: str, owner: str):
+    """Takes the lease on ``key``, or waits for the replica that holds it.
+
+    Returns (hit, value). On a hit the value was produced elsewhere; on a
+    miss the caller holds the lease and must release it when done.
+    """
+    while True:
+        if cache.acquire_lease(key, owner, get_lease_seconds()):
+            # Another replica may have finished between our miss and the lease
+            hit, value = cache.get(key, stage)
+            if hit:
+                cache.release_lease(key, owner)
+            return hit, value
+        hit, value = wait_for_lease(cache, key, stage)
+        if hit:
+            return True, value
+
+
+def _compute_with_lease(cache: StageCache, key: str, stage: str, compute):
+    owner = uuid.uuid4().hex
+    hit, value = acquire_or_wait(cache, key, stage, owner)
+    if hit:
+        return value, True
+    try:
+        value = compute()
+        cache.set(key, stage, value)
+        return value, False
+    finally:
+        cache.release_lease(key, owner)
+
+
+# ======================================================================
+# Decorators
+# ======================================================================
+def _key_builder(func, stage: str, model: str, prompt: str, exclude: tuple, params: dict):
+    """Returns a function that computes the cache key for a call of ``func``"""
+    signature = inspect.signature(func)
+    prompt_version = PROMPT_VERSIONS[prompt] if prompt else None
+
+    def cache_key(*args, **kwargs) -> str:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        inputs = {
+            name: value for name, value in bound.arguments.items()
+            if name not in exclude
+        }
+        return make_cache_key(stage, inputs, model, prompt_version, params)
+
+    return cache_key
+
+
+def cached_stage(stage: str, model: str = None, prompt: str = None,
+                 exclude: tuple = (), **params):
+    """Caches a pipeline stage on disk.
+
+    Concurrent calls with the same key share one upstream call (see
+    ``single_flight``). Arguments named in ``exclude`` (API keys) are
+    never part of the key.
+    ``prompt`` refers to an entry of ``prompts.PROMPT_VERSIONS`` so that
+    editing a prompt invalidates the affected stage automatically.
+    """
+    def decorator(func):
+        cache_key = _key_builder(func, stage, model, prompt, exclude, params)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_span(stage) as span:
+                cache = get_stage_cache()
+                key = cache_key(*args, **kwargs)
+                hit, value = cache.get(key, stage)
+                if hit:
+                    span.cache = "hit"
+                    return value
+                value, shared = single_flight(cache, key, stage, lambda: func(*args, **kwargs))
+                if shared:
+                    # Attached to an identical call of another session or replica
+                    span.cache = "hit"
+                    record(coalesced=1)
+                else:
+                    span.cache = "miss"
+                return value
+
+        wrapper.stage = stage
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
+
+
+def cached_stream(stage: str, model: str = None, prompt: str = None,
+                  exclude: tuple = (), **params):
+    """Caches a streaming stage (a generator of text chunks) on disk.
+
+    Uses the same key as ``cached_stage`` for identical arguments, so the
+    streaming and blocking variant of a stage share their results. A cache
+    hit yields the complete text as one chunk; on a miss the chunks are
+    passed through and the assembled string is stored once the stream has
+    finished. Aborted streams are not cached. Identical streams started
+    while one is running receive its complete text when it finishes.
+    """
+    def decorator(func):
+        cache_key = _key_builder(func, stage, model, prompt, exclude, params)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # The span is only active while the stream is being advanced, so
+            # whatever the consumer does between chunks is not attributed to it
+            span = open_span(stage)
+            cache = get_stage_cache()
+            key = cache_key(*args, **kwargs)
+            with activate(span):
+                hit, value = cache.get(key, stage)
+            if hit:
+                span.cache = "hit"
+                close_span(span)
+                yield value
+                return
+
+            # Identical streams in this process wait for the leading one
+            while True:
+                future, leader = join_flight(key)
+                if leader:
+                    break
+                try:
+                    with activate(span):
+                        value = wait_for_leader(future)
+                except FlightAborted:
+                    continue
+                except BaseException as e:
+                    close_span(span, e)
+                    raise
+                span.cache = "hit"
+                with activate(span):
+                    record(coalesced=1)
+                close_span(span)
+                yield value
+                return
+
+            owner = uuid.uuid4().hex
+            try:
+                with activate(span):
+                    hit, value = acquire_or_wait(cache, key, stage, owner)
+            except BaseException as e:
+                finish_flight(key, future, error=e)
+                close_span(span, e)
+                raise
+            if hit:
+                # Another replica produced the text while we waited
+                finish_flight(key, future, value)
+                span.cache = "hit"
+                with activate(span):
+                    record(coalesced=1)
+                close_span(span)
+                yield value
+                return
+
+            span.cache = "miss"
+            chunks = []
+            iterator = func(*args, **kwargs)
+            try:
+                while True:
+                    with activate(span):
+                        chunk = next(iterator, None)
+                    if chunk is None:
+                        break
+                    chunks.append(chunk)
+                    yield chunk
+            except BaseException as e:
+                iterator.close()
+                cache.release_lease(key, owner)
+                finish_flight(key, future, error=e)
+                close_span(span, e)
+                raise
+            value = ''.join(chunks)
+            cache.set(key, stage, value)
+            cache.release_lease(key, owner)
+            finish_flight(key, future, value)
+            close_span(span)
+
+        wrapper.stage = stage
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
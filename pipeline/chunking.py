@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline.metrics import submit_with_context
+from pipeline.tokens import estimate_tokens
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# Input budget per cleaning request; the cleaned output is never longer than
+# the input, so this keeps every chunk well below max_completion_tokens
+CLEAN_CHUNK_TOKENS = int(os.environ.get("CLEAN_CHUNK_TOKENS", 6000))
+CLEAN_OVERLAP_TOKENS = int(os.environ.get("CLEAN_OVERLAP_TOKENS", 150))
+
+# Budget for original plus DeepL text per optimization request
+OPTIMIZE_CHUNK_TOKENS = int(os.environ.get("OPTIMIZE_CHUNK_TOKENS", 12000))
+
+CHUNK_MAX_WORKERS = int(os.environ.get("CHUNK_MAX_WORKERS", 4))
+
+# How many lines at a chunk border are compared when removing the overlap
+MAX_OVERLAP_LINES = 50
+
+
+# ======================================================================
+# Chunk Planning
+# ======================================================================
+def plan_chunks(lines: list, max_tokens: int, overlap_tokens: int = 0) -> list:
+    """Splits a list of lines into (start, end) ranges of at most ``max_tokens``.
+
+    Chunks end at the last blank line (paragraph boundary) that fits, and
+    only fall back to a plain line break when a single paragraph is too long.
+    A line that alone exceeds the budget becomes a chunk of its own. With
+    ``overlap_tokens`` each chunk repeats the last lines of its predecessor.
+    """
+    line_tokens = [estimate_tokens(line) + 1 for line in lines]
+    ranges = []
+    start = 0
+    while start < len(lines):
+        end = start
+        tokens = 0
+        last_blank = None
+        while end < len(lines) and (end == start or tokens + line_tokens[end] <= max_tokens):
+            tokens += line_tokens[end]
+            if not lines[end].strip():
+                last_blank = end
+            end += 1
+        if end < len(lines) and last_blank is not None and last_blank > start:
+            end = last_blank + 1
+        ranges.append((start, end))
+        if end >= len(lines):
+            break
+
+        # Step back over the overlap, but always make progress
+        next_start = end
+        overlap = 0
+        while next_start - 1 > start and overlap + line_tokens[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            overlap += line_tokens[next_start]
+        start = next_start
+    return ranges
+
+
+def split_into_chunks(text: str, max_tokens: int, overlap_tokens: int = 0) -> list:
+    """Splits text at paragraph boundaries into chunks of at most ``max_tokens``"""
+    lines = text.split('\n')
+    return ['\n'.join(lines[start:end]) for start, end in plan_chunks(lines, max_tokens, overlap_tokens)]
+
+
+def split_aligned_chunks(source: str, target: str, max_tokens: int):
+    """Splits a source text and its line-aligned translation into matching chunks.
+
+    Returns a list of (source_chunk, target_chunk) pairs, or None when the
+    texts do not have the same number of lines (then they cannot be cut at
+    the same places). The budget applies to both texts together.
+    """
+    source_lines = source.split('\n')
+    target_lines = target.split('\n')
+    if len(source_lines) != len(target_lines):
+        return None
+    combined = [s + t for s, t in zip(source_lines, target_lines)]
+    return [
+        ('\n'.join(source_lines[start:end]), '\n'.join(target_lines[start:end]))
+        for start, end in plan_chunks(combined, max_tokens)
+    ]
+
+
+# ======================================================================
+# Stitching
+# ======================================================================
+def chunk_separators(chunks: list) -> list:
+    """Returns the line breaks that followed each chunk but the last in the original text.
+
+    A chunk that ends at a paragraph boundary (a blank line) is followed by
+    a blank line, one cut inside a long run of lines by a single line break.
+    """
+    return ['\n\n' if not chunk.split('\n')[-1].strip() else '\n' for chunk in chunks[:-1]]
+
+
+def _normalize(line: str) -> str:
+    return ' '.join(line.split()).lower()
+
+
+def iter_stitched(outputs, separators: list = ()):
+    """Joins chunk outputs, dropping lines that repeat the end of the previous chunk.
+
+    Overlapping input regions come back (mostly verbatim) at the end of one
+    output and the start of the next; the longest such repetition of
+    non-empty lines is removed from the later chunk. Outputs are joined by
+    the line breaks of the input, see chunk_separators (a blank line where
+    none are given). Yields text pieces as soon as each output is available.
+    """
+    tail = []
+    first = True
+    for part, output in enumerate(outputs):
+        lines = output.strip('\n').split('\n')
+        head = [(index, _normalize(line)) for index, line in enumerate(lines) if line.strip()]
+        head = head[:MAX_OVERLAP_LINES]
+
+        skip = 0
+        for size in range(min(len(tail), len(head)), 0, -1):
+            if tail[-size:] == [line for _, line in head[:size]]:
+                skip = head[size - 1][0] + 1
+                break
+
+        lines = lines[skip:]
+        while lines and not lines[0].strip():
+            lines = lines[1:]
+        if not lines:
+            continue
+
+        separator = separators[part - 1] if 0 < part <= len(separators) else '\n\n'
+        yield ('' if first else separator) + '\n'.join(lines)
+        first = False
+        tail = (tail + [_normalize(line) for line in lines if line.strip()])[-MAX_OVERLAP_LINES:]
+
+
+def stitch_chunks(outputs: list, separators: list = ()) -> str:
+    """Joins chunk outputs into one text, see iter_stitched"""
+    return ''.join(iter_stitched(outputs, separators))
+
+
+def iter_joined(outputs, separators: list):
+    """Joins the outputs of chunks without overlap by the line breaks of the input, see chunk_separators"""
+    for part, output in enumerate(outputs):
+        yield (separators[part - 1] if part else '') + output.strip('\n')
+
+
+# ======================================================================
+# Parallel Processing
+# ======================================================================
+def iter_map_chunks(func, chunks: list, max_workers: int = CHUNK_MAX_WORKERS):
+    """Applies ``func(chunk, part, total)`` to all chunks in parallel.
+
+    Results are yielded in chunk order, each as soon as it and all earlier
+    chunks are done.
+    """
+    total = len(chunks)
+    if total == 1:
+        yield func(chunks[0], 1, 1)
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as executor:
+        futures = [
+            submit_with_context(executor, func, chunk, part, total)
+            for part, chunk in enumerate(chunks, 1)
+        ]
+        for future in futures:
+            yield future.result()
+
+
+def map_chunks(func, chunks: list, max_workers: int = CHUNK_MAX_WORKERS) -> list:
+    """Applies ``func(chunk, part, total)`` to all chunks in parallel, keeping their order"""
+    return list(iter_map_chunks(func, chunks, max_workers))
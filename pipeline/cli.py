@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from prompts import DEFAULT_TARGET, TARGET_LANGUAGES
+from pipeline.artifacts import write_artifacts
+from pipeline.batch import BatchRunner
+from pipeline.boilerplate import DEFAULT_STRENGTH, STRENGTHS
+from pipeline.readers import SUPPORTED_EXTENSIONS, read_path
+from pipeline import stages
+
+# ======================================================================
+# Command Line Interface
+# ======================================================================
+# Usage:
+#   python -m pipeline articles/ --output out/
+#   python -m pipeline --urls urls.txt --output out/ --processes 4 --analyze
+#   python -m pipeline articles/ --targets DE,FR,ES
+#   python -m pipeline --urls urls.txt --deadline 300
+#   python -m pipeline --evaluate-routing output/
+#
+# API keys are read from OPENAI_API_KEY, DEEPL_API_KEY and JINA_API_KEY.
+
+
+def collect_items(paths: list, urls_file: str = None) -> list:
+    """Builds batch items from files, directories and an optional URL list"""
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.split('.')[-1].lower() in SUPPORTED_EXTENSIONS
+            )
+        else:
+            files = [path]
+        for file_path in files:
+            items.append({'name': file_path, 'path': file_path})
+
+    if urls_file:
+        stream = sys.stdin if urls_file == '-' else open(urls_file, encoding='utf-8')
+        with stream:
+            for line in stream:
+                url = line.strip()
+                if url and not url.startswith('#'):
+                    items.append({'name': url, 'url': url})
+    return items
+
+
+def get_api_keys() -> dict:
+    """Reads the API keys from the environment"""
+    return {
+        'openai': os.environ.get('OPENAI_API_KEY', ''),
+        'deepl': os.environ.get('DEEPL_API_KEY', ''),
+        'jina': os.environ.get('JINA_API_KEY', ''),
+    }
+
+
+def run_shard(items: list, keys: dict, output: str, analyze: bool,
+              strength: str = DEFAULT_STRENGTH, skip_llm: bool = False,
+              targets: list = (DEFAULT_TARGET,), deadline: float = None) -> int:
+    """Processes a list of items in one process, returns the number of failures"""
+    stage_functions = {
+        "extract": partial(stages.extract_text_from_url, jina_key=keys['jina']),
+        "clean": partial(stages.clean_text_with_gpt, openai_key=keys['openai'],
+                         strength=strength, skip_llm=skip_llm),
+        "translate": partial(stages.translate_text, deepl_key=keys['deepl']),
+        "optimize": partial(stages.optimize_translation, openai_key=keys['openai']),
+    }
+    if analyze:
+        stage_functions["analyze"] = partial(stages.analyze_translation, openai_key=keys['openai'])
+
+    # Files are read inside the worker process so large uploads are not pickled
+    failures = 0
+    runnable = []
+    for item in items:
+        if 'path' in item:
+            try:
+                item = {'name': item['name'], 'text': read_path(item['path'])}
+            except Exception as e:
+                print(f"FEHLER {item['name']}: read: {e}", file=sys.stderr, flush=True)
+                failures += 1
+                continue
+        runnable.append(item)
+
+    for event, index, payload in BatchRunner(stage_functions, targets=targets, deadline=deadline).run(runnable):
+        name = runnable[index]['name']
+        if event == "stage":
+            print(f"{payload:<9} {name}", file=sys.stderr, flush=True)
+        elif event == "done":
+            paths = write_artifacts(payload, output, targets)
+            print(f"OK        {name} -> {', '.join(paths)}", flush=True)
+            for notice in filter(None, payload['fallback'].split('\n')):
+                print(f"FALLBACK  {name}: {notice}", file=sys.stderr, flush=True)
+        else:
+            print(f"FEHLER    {name}: {payload}", file=sys.stderr, flush=True)
+            failures += 1
+    return failures
+
+
+def main(argv: list = None) -> int:
+    """Entry point of ``python -m pipeline``"""
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline",
+        description="Übersetzt Artikel ohne Streamlit und schreibt dieselben Dateien wie die Download-Buttons."
+    )
+    parser.add_argument("paths", nargs="*", help="TXT/DOCX/RTF-Dateien oder Verzeichnisse")
+    parser.add_argument("--urls", help="Datei mit einer URL pro Zeile ('-' für stdin)")
+    parser.add_argument("-o", "--output", default="output", help="Zielverzeichnis (Standard: output)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Anzahl Prozesse, auf die die Artikel verteilt werden (Standard: 1)")
+    parser.add_argument("--analyze", action="store_true", help="Zusätzlich die Qualitätsprüfung ausführen")
+    parser.add_argument("--preclean", choices=STRENGTHS, default=DEFAULT_STRENGTH,
+                        help=f"Stärke der lokalen Vorbereinigung (Standard: {DEFAULT_STRENGTH})")
+    parser.add_argument("--skip-llm-clean", action="store_true",
+                        help="GPT-Bereinigung überspringen, wenn die starke Vorbereinigung eindeutig ist")
+    parser.add_argument("--targets", default=DEFAULT_TARGET,
+                        help=f"Zielsprachen, kommagetrennt, die erste ist die Hauptausgabe "
+                             f"({', '.join(TARGET_LANGUAGES)}; Standard: {DEFAULT_TARGET})")
+    # Unattended runs wait for every optimization unless a budget is set
+    # explicitly, here or with RUN_DEADLINE_SECONDS
+    parser.add_argument("--deadline", type=float, default=os.environ.get("RUN_DEADLINE_SECONDS"),
+                        help="Zeitbudget pro Artikel in Sekunden; danach wird die DeepL-Übersetzung "
+                             "ohne Optimierung übernommen (Standard: ohne Zeitbudget)")
+    parser.add_argument("--evaluate-routing", action="store_true",
+                        help="Gespeicherte Ergebnisse (*_bereinigt.txt, *_deepl.txt) auf allen Routen "
+                             "optimieren und Dauer, Kosten und Befunde als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    if args.evaluate_routing:
+        from pipeline.routing import evaluate_routes, load_saved_corpus
+        articles = load_saved_corpus(args.paths)
+        if not articles:
+            parser.error("Keine gespeicherten Artikel gefunden")
+        openai_key = get_api_keys()['openai']
+        if not openai_key:
+            parser.error("Fehlende API-Keys: openai")
+        print(json.dumps(evaluate_routes(articles, openai_key), ensure_ascii=False, indent=2))
+        return 0
+
+    targets = list(dict.fromkeys(code.strip().upper() for code in args.targets.split(',') if code.strip()))
+    unknown = [code for code in targets if code not in TARGET_LANGUAGES]
+    if not targets or unknown:
+        parser.error(f"Unbekannte Zielsprachen: {', '.join(unknown) or args.targets}")
+
+    items = collect_items(args.paths, args.urls)
+    if not items:
+        parser.error("Keine Eingaben gefunden")
+
+    keys = get_api_keys()
+    missing = [name for name in ('openai', 'deepl') if not keys[name]]
+    if any('url' in item for item in items) and not keys['jina']:
+        missing.append('jina')
+    if missing:
+        parser.error(f"Fehlende API-Keys: {', '.join(missing)}")
+
+    processes = max(1, min(args.processes, len(items)))
+    if processes == 1:
+        failures = run_shard(
+            items, keys, args.output, args.analyze, args.preclean, args.skip_llm_clean, targets, args.deadline
+        )
+    else:
+        # Round-robin shards; each process runs its own bounded thread pool
+        shards = [items[i::processes] for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            failures = sum(executor.map(
+                run_shard,
+                shards,
+                [keys] * processes,
+                [args.output] * processes,
+                [args.analyze] * processes,
+                [args.preclean] * processes,
+                [args.skip_llm_clean] * processes,
+                [targets] * processes,
+                [args.deadline] * processes
+            ))
+
+    print(f"{len(items) - failures} von {len(items)} Artikeln verarbeitet", file=sys.stderr)
+    return 1 if failures else 0
@@ -0,0 +1,449 @@
+import contextvars
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager
+
+from pipeline.deadline import DeadlineExceeded, check_deadline, pause_deadline, time_left
+from pipeline.metrics import current_stage, record, record_wait
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# Per-provider quotas per minute, override with RATE_LIMIT_<PROVIDER>_RPM and
+# RATE_LIMIT_<PROVIDER>_UPM. "Units" are tokens for OpenAI, characters for
+# DeepL and unused for Jina.
+DEFAULT_RATE_LIMITS = {
+    "openai": {"rpm": 500, "upm": 200000},
+    "deepl": {"rpm": 300, "upm": 1000000},
+    "jina": {"rpm": 200, "upm": 0},
+}
+
+MAX_ATTEMPTS = int(os.environ.get("API_MAX_ATTEMPTS", 5))
+BACKOFF_BASE = 1.0   # seconds
+BACKOFF_CAP = 30.0   # seconds
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Transport errors of requests, httpx/openai and deepl, matched by name so
+# that none of these libraries has to be imported here
+RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectionError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "Timeout",
+    "TooManyRequestsException",
+}
+
+# Connection pool size per client, should cover the batch concurrency limits
+POOL_SIZE = int(os.environ.get("API_POOL_SIZE", 16))
+
+# Request timeouts in seconds; a run deadline (see pipeline/deadline.py)
+# lowers them further. Override with OPENAI_TIMEOUT and JINA_TIMEOUT
+CONNECT_TIMEOUT = 10.0
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 600))
+JINA_TIMEOUT = float(os.environ.get("JINA_TIMEOUT", 60))
+
+# A call still running after this percentile of the recent latencies of its
+# provider and stage gets a duplicate request; the first answer wins.
+# Override with HEDGE_PERCENTILE and HEDGE_STAGES ("" disables hedging).
+# Optimization and translation are not hedged by default: a duplicate o3-mini
+# call is expensive and DeepL bills the characters of every duplicate
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 0.95))
+HEDGE_STAGES = {
+    stage.strip() for stage in os.environ.get("HEDGE_STAGES", "extract,clean,analyze").split(',')
+    if stage.strip()
+}
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+HEDGE_MIN_DELAY = 0.5  # seconds
+
+
+def get_rate_limits(provider: str) -> dict:
+    """Returns the quotas of a provider, honouring the environment overrides"""
+    limits = dict(DEFAULT_RATE_LIMITS[provider])
+    for name in ("rpm", "upm"):
+        env_value = os.environ.get(f"RATE_LIMIT_{provider.upper()}_{name.upper()}")
+        if env_value is not None:
+            limits[name] = int(env_value)
+    return limits
+
+
+def _key_id(api_key: str) -> str:
+    """Returns a hash of the API key so raw keys are never used as registry keys"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+# ======================================================================
+# Token Bucket Rate Limiter
+# ======================================================================
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``per_minute / 60`` per second"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: int) -> float:
+        """Returns how long to wait until ``amount`` is available (0 if it is)"""
+        self._refill()
+        # Requests larger than the whole bucket are let through once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: int) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Request and unit (token/character) quotas of one provider and API key"""
+
+    def __init__(self, rpm: int, upm: int):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.units = TokenBucket(upm) if upm else None
+        self._lock = threading.Lock()
+
+    def acquire(self, units: int = 0) -> float:
+        """Blocks until one request with ``units`` fits into the quota, returns the time waited.
+
+        Raises DeadlineExceeded instead of waiting past the deadline of the current stage.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = max(
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.units.wait_time(units) if self.units and units else 0.0
+                )
+                if delay == 0.0:
+                    if self.requests:
+                        self.requests.take(1)
+                    if self.units and units:
+                        self.units.take(units)
+                    return waited
+            left = time_left()
+            if left is not None and delay >= left:
+                raise DeadlineExceeded(f"Zeitbudget für {current_stage() or 'den Lauf'} erschöpft")
+            time.sleep(delay)
+            waited += delay
+
+
+# ======================================================================
+# Concurrent Request Slots
+# ======================================================================
+# A batch caps the requests in flight per provider (see pipeline/batch.py).
+# The cap applies to every outgoing request, so a stage that fans out into
+# parallel chunk requests still stays within it
+_request_slots = contextvars.ContextVar("request_slots", default=None)
+
+
+@contextmanager
+def limit_requests(semaphores: dict):
+    """Caps the concurrent requests per provider made in this context.
+
+    ``semaphores`` maps provider names to semaphores shared by all runs
+    that count against the same limit. Worker threads started with
+    submit_with_context inherit the limits.
+    """
+    token = _request_slots.set(semaphores)
+    try:
+        yield
+    finally:
+        _request_slots.reset(token)
+
+
+def _get_slot(provider: str):
+    """Returns the semaphore limiting requests to ``provider`` in this context, or None"""
+    semaphores = _request_slots.get()
+    return semaphores.get(provider) if semaphores else None
+
+
+def _wait_for_slot(semaphore) -> None:
+    """Acquires a request slot; the wait does not count against the run deadline"""
+    if semaphore is None:
+        return
+    waiting_since = time.monotonic()
+    with pause_deadline():
+        semaphore.acquire()
+    record_wait(time.monotonic() - waiting_since)
+
+
+def _release_slot(semaphore) -> None:
+    if semaphore is not None:
+        semaphore.release()
+
+
+@contextmanager
+def request_slot(provider: str):
+    """Holds one request slot of ``provider``, e.g. for the whole length of a stream"""
+    semaphore = _get_slot(provider)
+    _wait_for_slot(semaphore)
+    try:
+        yield
+    finally:
+        _release_slot(semaphore)
+
+
+# ======================================================================
+# Client Registry
+# ======================================================================
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(kind: str, api_key: str, factory):
+    """Returns the registered object for (kind, key), creating it once"""
+    registry_key = (kind, _key_id(api_key))
+    with _registry_lock:
+        if registry_key not in _registry:
+            _registry[registry_key] = factory()
+        return _registry[registry_key]
+
+
+def get_rate_limiter(provider: str, api_key: str) -> RateLimiter:
+    """Returns the shared rate limiter of a provider and API key"""
+    limits = get_rate_limits(provider)
+    return _get_or_create(f"limiter:{provider}", api_key, lambda: RateLimiter(limits["rpm"], limits["upm"]))
+
+
+def get_openai_client(api_key: str):
+    """Returns a shared OpenAI client, reusing its HTTP connection pool"""
+    def create():
+        import httpx
+        from openai import OpenAI
+
+        # Retries are handled by call_with_retry, together with the rate limiter
+        return OpenAI(
+            api_key=api_key,
+            max_retries=0,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=CONNECT_TIMEOUT)
+            )
+        )
+    return _get_or_create("openai", api_key, create)
+
+
+def get_deepl_translator(api_key: str):
+    """Returns a shared DeepL translator, which keeps its requests session alive"""
+    def create():
+        import deepl
+
+        # Retries are handled by call_with_retry; the SDK's own backoff ignores
+        # Retry-After, the rate limiter and the deadline (a module-wide setting)
+        deepl.http_client.max_network_retries = 0
+        # DEEPL_SERVER_URL points the client at another endpoint (e.g. the benchmark mocks)
+        return deepl.Translator(api_key, server_url=os.environ.get("DEEPL_SERVER_URL") or None)
+    return _get_or_create("deepl", api_key, create)
+
+
+def get_http_session():
+    """Returns the shared requests session for plain HTTP calls (Jina)"""
+    def create():
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    return _get_or_create("http", "", create)
+
+
+# ======================================================================
+# Hedged Requests
+# ======================================================================
+class LatencyTracker:
+    """Recent latencies of the calls of one provider and stage"""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def hedge_delay(self):
+        """Returns the HEDGE_PERCENTILE latency, or None until enough calls were seen"""
+        with self._lock:
+            samples = sorted(self.samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))
+        return max(HEDGE_MIN_DELAY, samples[index])
+
+
+def get_latency_tracker(provider: str, stage: str) -> LatencyTracker:
+    """Returns the shared latency tracker of a provider and stage"""
+    return _get_or_create(f"latency:{provider}:{stage}", "", LatencyTracker)
+
+
+def _start(func, *args, **kwargs) -> Future:
+    """Runs ``func`` in a daemon thread that records into the caller's run and span.
+
+    Daemon threads let a call that missed its deadline be abandoned without
+    blocking the run or the interpreter exit.
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            future.set_result(context.run(func, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def hedged_call(limiter: RateLimiter, units: int, tracker: LatencyTracker, hedge: bool, slot,
+                func, *args, **kwargs):
+    """Calls ``func`` once, adding a duplicate request when it is slower than usual.
+
+    Every request holds a slot of the ``slot`` semaphore (None for no limit)
+    until it returns; a duplicate is only sent when a slot is free. Without
+    a deadline and hedge delay the call runs in the calling thread.
+    Otherwise the caller waits for the first successful answer and raises
+    DeadlineExceeded when the stage budget runs out first; the requests
+    still running are abandoned.
+    """
+    delay = tracker.hedge_delay() if hedge else None
+    _wait_for_slot(slot)
+    left = time_left()
+    started = time.monotonic()
+    if delay is None and left is None:
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _release_slot(slot)
+        tracker.add(time.monotonic() - started)
+        return result
+
+    def attempt():
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _release_slot(slot)
+        tracker.add(time.monotonic() - started)
+        return result
+
+    def duplicate():
+        try:
+            limiter.acquire(units)
+            return func(*args, **kwargs)
+        finally:
+            _release_slot(slot)
+
+    pending = {_start(attempt)}
+    error = None
+    while pending:
+        # Wake up for the hedge delay or the deadline, whichever comes first
+        wake_ups = [started + seconds for seconds in (delay, left) if seconds is not None]
+        timeout = max(0.0, min(wake_ups) - time.monotonic()) if wake_ups else None
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = error or future.exception()
+        if done:
+            continue
+        # Only one of the timers may have fired, the deadline takes precedence
+        elapsed = time.monotonic() - started
+        if left is not None and elapsed >= left:
+            raise DeadlineExceeded(f"Zeitbudget für {current_stage() or 'den Lauf'} erschöpft")
+        if delay is not None and elapsed >= delay:
+            delay = None
+            # The first request is slower than HEDGE_PERCENTILE of its peers
+            if slot is None or slot.acquire(blocking=False):
+                record(requests=1, hedged=1)
+                pending.add(_start(duplicate))
+    raise error
+
+
+# ======================================================================
+# Retry with Backoff
+# ======================================================================
+def _status_code(error: Exception):
+    """Returns the HTTP status code carried by an exception, if any"""
+    for attribute in ("status_code", "http_status_code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _retry_after(error: Exception):
+    """Returns the Retry-After delay in seconds sent with an error, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Returns True for rate limits, server errors and transport failures"""
+    if _status_code(error) in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given attempt (starting at 0)"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def call_with_retry(provider: str, api_key: str, func, *args, units: int = 0, hedge: bool = True,
+                    slot: bool = True, **kwargs):
+    """Calls ``func`` under the provider's rate limit, retrying transient failures.
+
+    Every attempt first acquires one request and ``units`` tokens/characters
+    from the limiter of this provider and key. 429 and 5xx responses as well
+    as connection errors are retried with jittered exponential backoff,
+    honouring Retry-After when the server sends one. Attempts are hedged
+    (see hedged_call) unless ``hedge`` is False, e.g. for streams, and no
+    attempt or backoff runs past the deadline of the current stage. Each
+    attempt takes a request slot (see limit_requests) unless ``slot`` is
+    False because the caller already holds one.
+    """
+    limiter = get_rate_limiter(provider, api_key)
+    stage = current_stage()
+    tracker = get_latency_tracker(provider, stage)
+    hedge = hedge and stage in HEDGE_STAGES
+    semaphore = _get_slot(provider) if slot else None
+    for attempt in range(MAX_ATTEMPTS):
+        check_deadline()
+        record_wait(limiter.acquire(units))
+        record(requests=1)
+        try:
+            return hedged_call(limiter, units, tracker, hedge, semaphore, func, *args, **kwargs)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS - 1 or not is_retryable(e):
+                raise
+            delay = _retry_after(e)
+            delay = delay if delay is not None else backoff_delay(attempt)
+            left = time_left()
+            if left is not None and delay >= left:
+                raise DeadlineExceeded(f"Zeitbudget für {stage or 'den Lauf'} erschöpft") from e
+            time.sleep(delay)
@@ -0,0 +1,162 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from pipeline.metrics import current_stage, record_decision
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# Latency budget of one run (one article) in seconds, override with
+# RUN_DEADLINE_SECONDS; 0 disables deadlines
+DEFAULT_RUN_DEADLINE = float(os.environ.get("RUN_DEADLINE_SECONDS", 900))
+
+# Share of the run budget per stage, in pipeline order. Each stage must be
+# done by the sum of its own and all earlier shares, so time left over by a
+# fast stage goes to the following ones. Override with DEADLINE_SHARE_<STAGE>
+DEFAULT_STAGE_SHARES = {
+    "extract": 0.1,
+    "clean": 0.25,
+    "translate": 0.15,
+    "optimize": 0.4,
+    "analyze": 0.1,
+}
+
+# Shortest timeout handed to a request, so a nearly exhausted stage still
+# fails with a timeout instead of an invalid (zero or negative) value
+MIN_REQUEST_TIMEOUT = 0.1
+
+
+def get_stage_shares() -> dict:
+    """Returns the stage shares, honouring the environment overrides"""
+    return {
+        stage: float(os.environ.get(f"DEADLINE_SHARE_{stage.upper()}", share))
+        for stage, share in DEFAULT_STAGE_SHARES.items()
+    }
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage has used up its part of the run budget"""
+
+
+# ======================================================================
+# Run Deadlines
+# ======================================================================
+class Deadline:
+    """Latency budget of one run, split into cumulative stage checkpoints.
+
+    The clock stops while the run waits for a free provider slot (see
+    pause_deadline), so queueing behind other articles of a batch does not
+    use up the budget.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        shares = get_stage_shares()
+        total = sum(shares.values()) or 1.0
+        self.checkpoints = {}
+        elapsed_share = 0.0
+        for stage, share in shares.items():
+            elapsed_share += share
+            self.checkpoints[stage] = self.started + seconds * elapsed_share / total
+        # Seconds spent paused, plus the start of the current pause
+        self.paused = 0.0
+        self.paused_since = None
+        self.waiters = 0
+        self._lock = threading.Lock()
+
+    def pause(self) -> None:
+        with self._lock:
+            self.waiters += 1
+            if self.waiters == 1:
+                self.paused_since = time.monotonic()
+
+    def resume(self) -> None:
+        with self._lock:
+            self.waiters -= 1
+            if self.waiters == 0:
+                self.paused += time.monotonic() - self.paused_since
+                self.paused_since = None
+
+    def time_left(self, stage: str = None) -> float:
+        """Seconds until the checkpoint of ``stage`` (or the end of the run)"""
+        until = self.checkpoints.get(stage, self.started + self.seconds)
+        now = time.monotonic()
+        with self._lock:
+            paused = self.paused + (now - self.paused_since if self.paused_since is not None else 0.0)
+        return until + paused - now
+
+
+_current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+
+@contextmanager
+def start_deadline(seconds: float = DEFAULT_RUN_DEADLINE):
+    """Applies a run budget to all API calls made in this context.
+
+    Worker threads started with submit_with_context inherit it. ``seconds``
+    of 0 or None runs without a deadline.
+    """
+    deadline = Deadline(seconds) if seconds else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def pause_deadline():
+    """Stops the clock of the current deadline while waiting, e.g. for a provider slot"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        yield
+        return
+    deadline.pause()
+    try:
+        yield
+    finally:
+        deadline.resume()
+
+
+def time_left(stage: str = None):
+    """Seconds left for ``stage`` (default: the current span), or None without a deadline"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline.time_left(stage or current_stage())
+
+
+def check_deadline(stage: str = None) -> None:
+    """Raises DeadlineExceeded when the stage has no time left"""
+    left = time_left(stage)
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Zeitbudget für {stage or current_stage() or 'den Lauf'} erschöpft")
+
+
+def request_timeout(default: float) -> float:
+    """Returns the timeout for one request: ``default``, capped by the stage budget"""
+    left = time_left()
+    if left is None:
+        return default
+    return max(MIN_REQUEST_TIMEOUT, min(default, left))
+
+
+# ======================================================================
+# Graceful Degradation
+# ======================================================================
+# When a stage runs out of time the locally pre-cleaned text is used, the
+# DeepL text is published unoptimized or the quality check is skipped, and
+# the result carries a notice, so a slow model never holds back a publication
+FALLBACK_CLEAN = "lokal vorbereinigter Text übernommen"
+FALLBACK_OPTIMIZE = "DeepL-Übersetzung ohne Optimierung übernommen"
+FALLBACK_ANALYZE = "Qualitätsprüfung übersprungen"
+
+
+def degrade(stage: str, target_lang: str, error: Exception, action: str) -> str:
+    """Records a fallback in the run trace and returns the notice shown with the result"""
+    record_decision("fallback", stage=stage, target=target_lang, reason=str(error), action=action)
+    return f"{stage} ({target_lang}): {error} – {action}"
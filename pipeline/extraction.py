@@ -0,0 +1,278 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from pipeline.clients import CONNECT_TIMEOUT, get_http_session
+from pipeline.deadline import request_timeout
+from pipeline.metrics import record, submit_with_context
+
+# ======================================================================
+# Configuration
+# ======================================================================
+DEFAULT_EXTRACTION_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "extractions.sqlite3"
+)
+
+# Extractions not fetched or revalidated for this long are removed,
+# override with EXTRACTION_TTL_DAYS
+DEFAULT_TTL_DAYS = 30
+
+# Conditional requests to the article's own server, set EXTRACT_REVALIDATE=0
+# where the origin cannot be reached (e.g. the benchmark mocks)
+REVALIDATE = os.environ.get("EXTRACT_REVALIDATE", "1") != "0"
+
+# Timeout of the conditional HEAD request in seconds
+ORIGIN_TIMEOUT = 10.0
+
+# Query parameters that only track the visitor and never change the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "_ga", "_gl", "cmpid", "ocid", "smid", "sr_share",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "at_")
+
+# Query parameters that request the AMP variant of a page
+AMP_PARAMS = {"amp": None, "outputtype": "amp", "output": "amp"}
+AMP_PATH = re.compile(r"/amp/?$|\.amp(?=\.html?$)")
+# https://<host-with-dashes>.cdn.ampproject.org/c/s/<host>/<path>
+AMP_CACHE = re.compile(r"^/[a-z]/(?:s/)?(?P<rest>.+)$")
+
+# Sites whose amp.<host> serves the same articles under the same paths as
+# <host>; elsewhere amp.<host> may be a different site. Override with
+# AMP_HOSTS (comma-separated)
+DEFAULT_AMP_HOSTS = "theguardian.com"
+AMP_HOSTS = {
+    host.strip().lower()
+    for host in os.environ.get("AMP_HOSTS", DEFAULT_AMP_HOSTS).split(",") if host.strip()
+}
+
+
+# ======================================================================
+# URL Canonicalization
+# ======================================================================
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _is_amp(name: str, value: str) -> bool:
+    name = name.lower()
+    if name not in AMP_PARAMS:
+        return False
+    expected = AMP_PARAMS[name]
+    return expected is None or value.lower() == expected
+
+
+def canonicalize_url(url: str) -> str:
+    """Returns the canonical form of an article URL, used as its cache key.
+
+    Scheme and host are lowercased, default ports, fragments, tracking
+    parameters (utm_* and friends) and AMP variants (amp.<host> only for
+    AMP_HOSTS) are removed and the remaining query parameters are sorted,
+    keeping their original encoding. URLs that cannot be parsed are
+    returned stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = parts.hostname.lower()
+    path = parts.path or "/"
+
+    # Google's AMP cache serves the page under its own host
+    if host.endswith(".cdn.ampproject.org"):
+        match = AMP_CACHE.match(path)
+        if match:
+            return canonicalize_url(f"https://{match.group('rest')}")
+
+    if host.startswith("amp.") and host[len("amp."):] in AMP_HOSTS:
+        host = host[len("amp."):]
+    path = AMP_PATH.sub("", path) or "/"
+
+    netloc = host
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+        netloc = f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+    # Decoded only to classify, re-encoding would change the URL (%20 -> +)
+    query = []
+    for pair in parts.query.split('&'):
+        if not pair:
+            continue
+        name, _, value = pair.partition('=')
+        name, value = unquote_plus(name), unquote_plus(value)
+        if not _is_tracking(name) and not _is_amp(name, value):
+            query.append(pair)
+    return urlunsplit((scheme, netloc, path, '&'.join(sorted(query)), ''))
+
+
+# ======================================================================
+# SQLite Store
+# ======================================================================
+ENTRY_FIELDS = ("text", "content_hash", "etag", "last_modified", "fetched", "validated", "changed")
+
+
+class ExtractionStore:
+    """Last extracted text per canonical URL, with its content hash and HTTP validators.
+
+    ``etag`` and ``last_modified`` come from the article's own server and
+    allow a conditional request to confirm that the page is unchanged
+    without paying for another Jina extraction.
+    """
+
+    def __init__(self, path: str = DEFAULT_EXTRACTION_PATH, ttl_days: float = DEFAULT_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * 24 * 3600
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS extractions (
+                    url TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched REAL NOT NULL,
+                    validated REAL NOT NULL,
+                    changed REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str):
+        """Returns the stored extraction of a canonical URL as a dict, or None"""
+        row = self._connect().execute(
+            f"SELECT {', '.join(ENTRY_FIELDS)} FROM extractions WHERE url = ?", (url,)
+        ).fetchone()
+        return dict(zip(ENTRY_FIELDS, row)) if row is not None else None
+
+    def put(self, url: str, text: str, etag: str = None, last_modified: str = None) -> bool:
+        """Stores a fresh extraction, returns True if the text differs from the stored one"""
+        now = time.time()
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content_hash, changed FROM extractions WHERE url = ?", (url,)
+            ).fetchone()
+            changed = row is None or row[0] != content_hash
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions "
+                "(url, text, content_hash, etag, last_modified, fetched, validated, changed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, text, content_hash, etag, last_modified, now, now, now if changed else row[1])
+            )
+        return changed
+
+    def touch(self, url: str) -> None:
+        """Marks a stored extraction as confirmed unchanged by the origin"""
+        with self._connect() as conn:
+            conn.execute("UPDATE extractions SET validated = ? WHERE url = ?", (time.time(), url))
+
+    def prune(self) -> int:
+        """Removes extractions not validated within the TTL, returns how many were deleted"""
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM extractions WHERE validated < ?", (time.time() - self.ttl,)
+            ).rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_extraction_store() -> ExtractionStore:
+    """Returns the process-wide extraction store, honouring EXTRACTION_PATH and EXTRACTION_TTL_DAYS"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ExtractionStore(
+                os.environ.get("EXTRACTION_PATH", DEFAULT_EXTRACTION_PATH),
+                float(os.environ.get("EXTRACTION_TTL_DAYS", DEFAULT_TTL_DAYS))
+            )
+            _store.prune()
+        return _store
+
+
+# ======================================================================
+# Revalidation
+# ======================================================================
+def probe_origin(url: str, etag: str = None, last_modified: str = None) -> tuple:
+    """Sends a (conditional) HEAD request to the article's server.
+
+    Returns (status_code, etag, last_modified); (None, None, None) when the
+    server cannot be reached, so the caller falls back to a full extraction.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    record(requests=1)
+    try:
+        response = get_http_session().head(
+            url, headers=headers, allow_redirects=True,
+            timeout=(CONNECT_TIMEOUT, request_timeout(ORIGIN_TIMEOUT))
+        )
+    except Exception:
+        return None, None, None
+    return response.status_code, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+
+def extract_with_revalidation(url: str, fetch) -> str:
+    """Returns the text of a canonical URL, calling ``fetch()`` (Jina) only when needed.
+
+    A stored extraction whose validators the origin confirms (304) is
+    reused as is. Otherwise the page is extracted again, the origin's
+    current validators are stored with it and its content hash tells
+    whether the article actually changed.
+    """
+    store = get_extraction_store()
+    entry = store.get(url)
+    if not REVALIDATE:
+        text = fetch()
+        store.put(url, text)
+        return text
+
+    if entry is not None and (entry['etag'] or entry['last_modified']):
+        status, etag, last_modified = probe_origin(url, entry['etag'], entry['last_modified'])
+        if status == 304:
+            store.touch(url)
+            record(revalidated=1)
+            return entry['text']
+        text = fetch()
+    else:
+        # Read the validators while Jina extracts the page
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            probe = submit_with_context(executor, probe_origin, url)
+            text = fetch()
+            status, etag, last_modified = probe.result()
+
+    if status != 200:
+        etag = last_modified = None
+    if not store.put(url, text, etag, last_modified):
+        record(unchanged=1)
+    return text
@@ -0,0 +1,111 @@
+import json
+import re
+
+# ======================================================================
+# Structured Quality Check Findings
+# ======================================================================
+# The quality check ends its markdown report with a ```json block that
+# refers to numbered paragraphs ([O1].. in the original, [Ü1].. in the
+# translation, see prompts.number_paragraphs). Paragraphs are the non-empty
+# lines of a text, the same unit the DeepL segment cache uses.
+FINDINGS_BLOCK = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Neighbouring paragraphs passed to the re-optimization as context
+CONTEXT_PARAGRAPHS = 1
+
+
+def paragraph_positions(text: str) -> list:
+    """Returns the line indices of the paragraphs (non-empty lines) of a text"""
+    return [index for index, line in enumerate(text.split('\n')) if line.strip()]
+
+
+def parse_findings(analysis: str) -> list:
+    """Extracts the findings list from a quality check report.
+
+    Returns an empty list when the report has no (valid) JSON block, so old
+    free-form reports keep working. Invalid entries are skipped.
+    """
+    matches = FINDINGS_BLOCK.findall(analysis or '')
+    if not matches:
+        return []
+    try:
+        data = json.loads(matches[-1])
+    except json.JSONDecodeError:
+        return []
+
+    findings = []
+    for item in data.get("findings", []):
+        try:
+            findings.append({
+                "paragraph": int(item["paragraph"]),
+                "source_paragraphs": [int(number) for number in item.get("source_paragraphs", [])],
+                "category": str(item.get("category", "")),
+                "issue": str(item["issue"]),
+                "suggestion": str(item.get("suggestion", "")),
+            })
+        except (KeyError, TypeError, ValueError):
+            continue
+    return findings
+
+
+def report_markdown(analysis: str) -> str:
+    """Returns the human readable part of a report, without the JSON block"""
+    return FINDINGS_BLOCK.sub('', analysis or '').rstrip()
+
+
+# ======================================================================
+# Targeted Re-Optimization
+# ======================================================================
+def build_reoptimization_tasks(cleaned_text: str, final_text: str, findings: list) -> list:
+    """Groups findings per translated paragraph and collects the context for each.
+
+    Returns one task per flagged paragraph with its line index in the final
+    text, the referenced original paragraphs, the neighbouring German
+    paragraphs and the combined issue description.
+    """
+    original_lines = cleaned_text.split('\n')
+    final_lines = final_text.split('\n')
+    original_positions = paragraph_positions(cleaned_text)
+    final_positions = paragraph_positions(final_text)
+
+    grouped = {}
+    for finding in findings:
+        if 1 <= finding["paragraph"] <= len(final_positions):
+            grouped.setdefault(finding["paragraph"], []).append(finding)
+
+    tasks = []
+    for number, paragraph_findings in sorted(grouped.items()):
+        index = number - 1
+        source_numbers = sorted({
+            source for finding in paragraph_findings for source in finding["source_paragraphs"]
+            if 1 <= source <= len(original_positions)
+        })
+        if not source_numbers:
+            # Without a reference, fall back to the paragraph at the same relative position
+            relative = round(index * len(original_positions) / max(1, len(final_positions)))
+            source_numbers = [min(len(original_positions), relative + 1)] if original_positions else []
+
+        before = final_positions[max(0, index - CONTEXT_PARAGRAPHS):index]
+        after = final_positions[index + 1:index + 1 + CONTEXT_PARAGRAPHS]
+        tasks.append({
+            "paragraph": number,
+            "line": final_positions[index],
+            "source_paragraphs": '\n\n'.join(original_lines[original_positions[n - 1]] for n in source_numbers),
+            "context_before": '\n\n'.join(final_lines[line] for line in before),
+            "paragraph_text": final_lines[final_positions[index]],
+            "context_after": '\n\n'.join(final_lines[line] for line in after),
+            "issues": '\n'.join(
+                f"- {finding['category'] + ': ' if finding['category'] else ''}{finding['issue']}"
+                + (f" (Vorschlag: {finding['suggestion']})" if finding['suggestion'] else '')
+                for finding in paragraph_findings
+            ),
+        })
+    return tasks
+
+
+def splice_paragraphs(final_text: str, replacements: dict) -> str:
+    """Replaces lines of the final text, ``replacements`` maps line index to new text"""
+    lines = final_text.split('\n')
+    for line, text in replacements.items():
+        lines[line] = text.strip('\n')
+    return '\n'.join(lines)
@@ -0,0 +1,461 @@
+import io
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from prompts import DEFAULT_TARGET
+from pipeline.artifacts import edition_key, empty_result
+from pipeline.batch import BatchRunner
+from pipeline.blobs import store_result
+from pipeline.boilerplate import DEFAULT_STRENGTH, preclean
+from pipeline.deadline import (
+    DEFAULT_RUN_DEADLINE,
+    FALLBACK_CLEAN,
+    FALLBACK_OPTIMIZE,
+    DeadlineExceeded,
+    degrade,
+    start_deadline
+)
+from pipeline.metrics import start_run
+from pipeline.readers import iter_uploaded_file, read_uploaded_file
+
+# ======================================================================
+# Configuration
+# ======================================================================
+DEFAULT_JOBS_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "jobs.sqlite3"
+)
+
+# Concurrent pipeline runs per server process, override with JOB_MAX_WORKERS
+DEFAULT_MAX_WORKERS = 4
+
+# Minimum seconds between two progress writes of the same job
+PROGRESS_INTERVAL = 0.5
+
+JOB_STATUSES = ("queued", "running", "done", "error")
+
+# Identifies this server process in the job records
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+DEFAULT_OPTIONS = {
+    "overlap": True,
+    "stream": True,
+    "strength": DEFAULT_STRENGTH,
+    "skip_llm": False,
+    # The first target is the primary edition, see pipeline/artifacts.py
+    "targets": [DEFAULT_TARGET],
+    # Latency budget of the run in seconds, 0 disables it
+    "deadline": DEFAULT_RUN_DEADLINE,
+}
+
+
+# ======================================================================
+# SQLite Store
+# ======================================================================
+class JobStore:
+    """Persistent job records, so results outlive the session that started them.
+
+    Every job belongs to the browser session that submitted it and is only
+    listed there. API keys are never stored; they only live in the worker
+    thread.
+    """
+
+    # Columns holding JSON documents
+    JSON_FIELDS = ("options", "result", "metrics")
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    detail TEXT,
+                    partial TEXT,
+                    options TEXT,
+                    result TEXT,
+                    metrics TEXT,
+                    error TEXT,
+                    owner TEXT NOT NULL,
+                    session TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "session" not in columns:
+                # Job stores written before jobs belonged to a session
+                conn.execute("ALTER TABLE jobs ADD COLUMN session TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs (session, created)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create(self, kind: str, name: str, options: dict, session: str = None) -> str:
+        """Adds a queued job of ``session`` and returns its ID"""
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, name, status, options, owner, session, created, updated) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, name, json.dumps(options), OWNER, session, now, now)
+            )
+        return job_id
+
+    def update(self, job_id: str, **fields) -> None:
+        """Sets columns of a job; dict values are stored as JSON"""
+        fields = {
+            name: json.dumps(value) if name in self.JSON_FIELDS else value
+            for name, value in fields.items()
+        }
+        fields["updated"] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str, session: str = None):
+        """Returns the job as a dict, or None if it does not exist (or belongs to another session)"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (session is not None and row["session"] != session):
+            return None
+        job = dict(row)
+        for name in self.JSON_FIELDS:
+            job[name] = json.loads(job[name]) if job[name] else None
+        return job
+
+    def recent(self, session: str, kinds: tuple = None, limit: int = 20) -> list:
+        """Returns the latest jobs of a session without their texts, newest first"""
+        kinds = kinds or ("url", "file", "batch")
+        rows = self._connect().execute(
+            "SELECT id, kind, name, status, stage, error, created, updated FROM jobs "
+            f"WHERE session = ? AND kind IN ({', '.join('?' * len(kinds))}) "
+            "ORDER BY created DESC LIMIT ?",
+            (session, *kinds, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def fail_orphans(self) -> int:
+        """Marks unfinished jobs of dead processes on this host as failed"""
+        host = OWNER.rsplit(':', 1)[0]
+        rows = self._connect().execute(
+            "SELECT id, owner FROM jobs WHERE status IN ('queued', 'running') AND owner LIKE ?",
+            (f"{host}:%",)
+        ).fetchall()
+        orphans = [row["id"] for row in rows if not _process_alive(int(row["owner"].rsplit(':', 1)[1]))]
+        for job_id in orphans:
+            self.update(job_id, status="error", error="Abgebrochen: Der Server wurde neu gestartet")
+        return len(orphans)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_store = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Returns the process-wide job store, honouring JOBS_PATH"""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = JobStore(os.environ.get("JOBS_PATH", DEFAULT_JOBS_PATH))
+            _store.fail_orphans()
+        return _store
+
+
+def get_job_executor() -> ThreadPoolExecutor:
+    """Returns the process-wide worker pool; it outlives Streamlit sessions and reruns"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("JOB_MAX_WORKERS", DEFAULT_MAX_WORKERS)),
+                thread_name_prefix="job"
+            )
+        return _executor
+
+
+# ======================================================================
+# Progress Reporting
+# ======================================================================
+class JobProgress:
+    """Writes stage changes, progress details and partial output of a running job"""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def stage(self, stage: str, detail: str = '') -> None:
+        self.store.update(self.job_id, stage=stage, detail=detail, partial=None)
+        self._last_write = time.time()
+
+    def detail(self, detail: str) -> None:
+        if self._due():
+            self.store.update(self.job_id, detail=detail)
+
+    def stream(self, chunks):
+        """Passes chunks through while publishing the text received so far"""
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            if self._due():
+                self.store.update(self.job_id, partial=''.join(received))
+            yield chunk
+
+    def _due(self) -> bool:
+        """Returns True (and restarts the interval) when the next write is allowed"""
+        now = time.time()
+        if now - self._last_write < PROGRESS_INTERVAL:
+            return False
+        self._last_write = now
+        return True
+
+
+# ======================================================================
+# Article Jobs
+# ======================================================================
+def run_article(progress: JobProgress, keys: dict, options: dict, url: str = None, document=None) -> dict:
+    """Runs the URL or file flow of the app and returns the processed texts.
+
+    With several ``targets`` extraction and cleaning run once; the further
+    editions are translated and optimized in parallel with the primary one.
+    A cleaning or optimization that misses the run deadline falls back to
+    the pre-cleaned or DeepL text and is listed in ``result['fallback']``.
+    """
+    from pipeline import stages
+
+    primary, *others = options["targets"]
+    fallbacks = []
+
+    def on_segment(done: int, total: int) -> None:
+        progress.detail(f"{done} von {total} Absätzen übersetzt")
+
+    result = empty_result()
+    if url is not None:
+        progress.stage("extract")
+        raw_text = stages.extract_text_from_url(url, keys['jina'])
+        result['original'] = raw_text
+        try:
+            if options["overlap"]:
+                progress.stage("clean_translate")
+                cleaned_text, translated_text = stages.clean_and_translate_overlapped(
+                    raw_text, keys['openai'], keys['deepl'], on_segment=on_segment,
+                    strength=options["strength"], skip_llm=options["skip_llm"], target_lang=primary
+                )
+            else:
+                progress.stage("clean")
+                cleaned_text = stages.clean_text_with_gpt(
+                    raw_text, keys['openai'], strength=options["strength"], skip_llm=options["skip_llm"]
+                )
+                translated_text = None
+        except DeadlineExceeded as e:
+            fallbacks.append(degrade("clean", primary, e, FALLBACK_CLEAN))
+            cleaned_text = preclean(raw_text, options["strength"])[0]
+            translated_text = None
+        if translated_text is None:
+            progress.stage("translate")
+            translated_text = stages.translate_text(cleaned_text, keys['deepl'], primary)
+    else:
+        # Original and cleaned text are the same for file uploads
+        if options["overlap"]:
+            progress.stage("read_translate")
+            cleaned_text, translated_text = stages.translate_paragraphs(
+                iter_uploaded_file(document), keys['deepl'], on_segment=on_segment, target_lang=primary
+            )
+        else:
+            progress.stage("read")
+            cleaned_text = read_uploaded_file(document)
+            progress.stage("translate")
+            translated_text = stages.translate_text(cleaned_text, keys['deepl'], primary)
+        result['original'] = cleaned_text
+    result['cleaned'] = cleaned_text
+    result['translated'] = translated_text
+
+    progress.stage("optimize", f"{len(others) + 1} Sprachfassungen" if others else '')
+    with ThreadPoolExecutor(max_workers=max(1, len(others))) as executor:
+        editions = stages.submit_editions(executor, cleaned_text, keys['deepl'], keys['openai'], others)
+        if options["stream"]:
+            try:
+                result['final'] = ''.join(progress.stream(
+                    stages.stream_optimize_translation(cleaned_text, translated_text, keys['openai'], primary)
+                ))
+            except DeadlineExceeded as e:
+                result['final'] = translated_text
+                fallbacks.append(degrade("optimize", primary, e, FALLBACK_OPTIMIZE))
+        else:
+            result['final'], fallback = stages.optimize_or_fallback(
+                cleaned_text, translated_text, keys['openai'], primary
+            )
+            fallbacks.append(fallback)
+        for target, future in editions.items():
+            (result[edition_key('translated', target, primary)],
+             result[edition_key('final', target, primary)],
+             fallback) = future.result()
+            fallbacks.append(fallback)
+    result['fallback'] = '\n'.join(filter(None, fallbacks))
+    return result
+
+
+def _run_job(job_id: str, name: str, keys: dict, options: dict, url: str, document) -> None:
+    store = get_job_store()
+    store.update(job_id, status="running")
+    result = None
+    error = None
+    with start_run(name) as trace, start_deadline(options.get("deadline", DEFAULT_RUN_DEADLINE)):
+        try:
+            result = run_article(JobProgress(store, job_id), keys, options, url=url, document=document)
+        except Exception as e:
+            error = str(e)
+    # The trace is only complete once its run has been closed
+    if error is None:
+        store.update(job_id, status="done", result=result, metrics=trace.to_dict(), partial=None)
+    else:
+        store.update(job_id, status="error", error=error, metrics=trace.to_dict(), partial=None)
+
+
+def submit_article_job(keys: dict, options: dict = None, url: str = None,
+                       name: str = None, data: bytes = None, session: str = None) -> str:
+    """Queues a URL (``url``) or an uploaded file (``name`` and ``data``) and returns the job ID.
+
+    The run continues in the background worker pool when the submitting
+    Streamlit session reruns, reloads or disconnects. ``session`` identifies
+    the browser session the job is listed for.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    document = None
+    if url is None:
+        document = io.BytesIO(data)
+        document.name = name
+    name = url or name
+    job_id = get_job_store().create("url" if url else "file", name, options, session)
+    get_job_executor().submit(_run_job, job_id, name, keys, options, url, document)
+    return job_id
+
+
+# ======================================================================
+# Batch Jobs
+# ======================================================================
+def batch_stages(keys: dict, options: dict) -> dict:
+    """Returns the stage callables of a BatchRunner, with the API keys bound"""
+    from pipeline import stages
+
+    return {
+        "extract": partial(stages.extract_text_from_url, jina_key=keys['jina']),
+        "clean": partial(
+            stages.clean_text_with_gpt, openai_key=keys['openai'],
+            strength=options["strength"], skip_llm=options["skip_llm"]
+        ),
+        "translate": partial(stages.translate_text, deepl_key=keys['deepl']),
+        "optimize": partial(stages.optimize_translation, openai_key=keys['openai']),
+    }
+
+
+def _read_batch_items(items: list, entries: list) -> list:
+    """Returns BatchRunner items with uploaded files read; unreadable files are marked as failed"""
+    runnable = []
+    for index, (item, entry) in enumerate(zip(items, entries)):
+        if item.get('url'):
+            runnable.append((index, {'name': item['name'], 'url': item['url']}))
+            continue
+        document = io.BytesIO(item['data'])
+        document.name = item['name']
+        try:
+            runnable.append((index, {'name': item['name'], 'text': read_uploaded_file(document)}))
+        except Exception as e:
+            entry.update(status="fehler", error=f"read: {e}")
+    return runnable
+
+
+def _run_batch_job(job_id: str, keys: dict, options: dict, items: list, stages: dict = None) -> None:
+    """Runs a batch and keeps the state of every item in ``result['items']``.
+
+    Finished texts are stored as blob references (see pipeline/blobs.py),
+    so the job record stays small however many articles the batch has.
+    """
+    store = get_job_store()
+    store.update(job_id, status="running", stage="batch")
+    entries = [
+        {'name': item['name'], 'status': "wartend", 'error': '', 'processed_text': None,
+         'targets': options["targets"], 'duration': 0.0, 'cost_usd': 0.0}
+        for item in items
+    ]
+    try:
+        runnable = _read_batch_items(items, entries)
+        runner = BatchRunner(
+            stages or batch_stages(keys, options), targets=options["targets"], deadline=options["deadline"]
+        )
+        finished = len(items) - len(runnable)
+        for event, index, payload in runner.run([item for _, item in runnable]):
+            entry = entries[runnable[index][0]]
+            if event == "stage":
+                entry['status'] = payload
+            elif event == "done":
+                totals = runner.traces[index].totals()
+                entry.update(status="fertig", processed_text=store_result(payload),
+                             fallback=bool(payload['fallback']),
+                             duration=totals['duration'], cost_usd=totals['cost_usd'])
+            else:
+                entry.update(status="fehler", error=payload)
+            if event != "stage":
+                finished += 1
+            store.update(job_id, detail=f"{finished} von {len(items)} Artikeln fertig", result={'items': entries})
+    except Exception as e:
+        store.update(job_id, status="error", error=str(e), result={'items': entries})
+        return
+    store.update(job_id, status="done", result={'items': entries})
+
+
+def submit_batch_job(keys: dict, items: list, options: dict = None, session: str = None) -> str:
+    """Queues a batch and returns the job ID.
+
+    ``items`` are dicts with a 'name' and either a 'url' or the bytes of an
+    uploaded file in 'data'. Like article jobs, the batch keeps running in
+    the worker pool when the submitting session reruns or disconnects.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    job_id = get_job_store().create("batch", f"Batch mit {len(items)} Artikeln", options, session)
+    get_job_executor().submit(_run_batch_job, job_id, keys, options, items)
+    return job_id
+
+
+def get_job(job_id: str, session: str = None):
+    """Returns the current record of a job, or None; with ``session`` only a job of that session"""
+    return get_job_store().get(job_id, session)
+
+
+def recent_jobs(session: str, kinds: tuple = None, limit: int = 20) -> list:
+    """Returns the latest jobs of a session, newest first; ``kinds`` limits them to "url", "file" or "batch" jobs"""
+    return get_job_store().recent(session, kinds, limit)
@@ -0,0 +1,303 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# Traces and stage records are written here; set METRICS_DIR="" to disable
+DEFAULT_METRICS_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "metrics"
+)
+
+# USD per 1M tokens (input, output); reasoning tokens are billed as output
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "o3-mini": (1.10, 4.40),
+}
+# USD per 1M characters (DeepL API Pro usage price)
+DEEPL_PRICE_PER_MILLION_CHARS = 25.00
+
+COUNTERS = (
+    "requests",
+    "prompt_tokens",
+    "predicted_prompt_tokens",
+    "tokens_saved",
+    "completion_tokens",
+    "predicted_completion_tokens",
+    "reasoning_tokens",
+    "characters",
+    "segments_cached",
+    "segments_memory",
+    "segments_sent",
+    "queue_wait",
+    "coalesced",
+    "hedged",
+    "revalidated",
+    "unchanged",
+    "cost_usd",
+)
+
+
+def get_metrics_dir() -> str:
+    """Returns the directory for traces, or '' when metrics export is disabled"""
+    return os.environ.get("METRICS_DIR", DEFAULT_METRICS_DIR)
+
+
+# ======================================================================
+# Traces
+# ======================================================================
+class StageSpan:
+    """Timing, cache outcome and usage counters of one stage call"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = time.time()
+        self.duration = 0.0
+        self.cache = None  # "hit", "miss" or None for uncached work
+        self.error = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "started": self.started,
+            "duration": round(self.duration, 4),
+            "cache": self.cache,
+            "error": self.error,
+            **{name: round(value, 6) for name, value in self.counters.items()},
+        }
+
+
+class RunTrace:
+    """All stage spans of one pipeline run (one article)"""
+
+    def __init__(self, name: str):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started = time.time()
+        self.duration = 0.0
+        self.spans = []
+        # Waits measured outside of a span, by stage
+        self.waits = {}
+        # Policy decisions taken during the run, e.g. model routes
+        self.decisions = []
+        self._lock = threading.Lock()
+
+    def add_span(self, span: StageSpan) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def add_wait(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.waits[stage] = self.waits.get(stage, 0.0) + seconds
+
+    def add_decision(self, decision: dict) -> None:
+        with self._lock:
+            self.decisions.append(decision)
+
+    def breakdown(self) -> list:
+        """Aggregates spans per stage, in order of first appearance"""
+        rows = {}
+        with self._lock:
+            spans = list(self.spans)
+            waits = dict(self.waits)
+        for span in spans:
+            row = rows.setdefault(span.stage, {
+                "stage": span.stage, "calls": 0, "duration": 0.0,
+                "cache_hits": 0, "cache_misses": 0, **dict.fromkeys(COUNTERS, 0)
+            })
+            row["calls"] += 1
+            row["duration"] += span.duration
+            row["cache_hits"] += span.cache == "hit"
+            row["cache_misses"] += span.cache == "miss"
+            for name, value in span.counters.items():
+                row[name] += value
+        for stage, seconds in waits.items():
+            if stage in rows:
+                rows[stage]["queue_wait"] += seconds
+        return list(rows.values())
+
+    def totals(self) -> dict:
+        """Sums the usage counters over all spans"""
+        totals = dict.fromkeys(COUNTERS, 0)
+        for row in self.breakdown():
+            for name in COUNTERS:
+                totals[name] += row[name]
+        totals["duration"] = self.duration
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "name": self.name,
+            "started": self.started,
+            "duration": round(self.duration, 4),
+            "spans": [span.to_dict() for span in self.spans],
+            "breakdown": self.breakdown(),
+            "totals": self.totals(),
+            "decisions": list(self.decisions),
+        }
+
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+def export_trace(trace: RunTrace) -> None:
+    """Writes the run as a JSON trace and appends its spans to stages.jsonl and its decisions to decisions.jsonl"""
+    directory = get_metrics_dir()
+    if not directory:
+        return
+    runs_directory = os.path.join(directory, "runs")
+    os.makedirs(runs_directory, exist_ok=True)
+    timestamp = datetime.fromtimestamp(trace.started).strftime("%Y%m%d_%H%M%S")
+    data = trace.to_dict()
+    with open(os.path.join(runs_directory, f"{timestamp}_{trace.run_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    with _export_lock, open(os.path.join(directory, "stages.jsonl"), "a", encoding="utf-8") as f:
+        for span in data["spans"]:
+            f.write(json.dumps({"run_id": trace.run_id, "run": trace.name, **span}, ensure_ascii=False) + "\n")
+    if data["decisions"]:
+        with _export_lock, open(os.path.join(directory, "decisions.jsonl"), "a", encoding="utf-8") as f:
+            for decision in data["decisions"]:
+                f.write(json.dumps({"run_id": trace.run_id, "run": trace.name, **decision}, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def start_run(name: str):
+    """Collects all stage spans recorded in this context into a RunTrace"""
+    trace = RunTrace(name)
+    token = _current_run.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.duration = time.time() - trace.started
+        _current_run.reset(token)
+        try:
+            export_trace(trace)
+        except OSError:
+            # Metrics must never break a translation run
+            pass
+
+
+def current_run():
+    """Returns the RunTrace of the current context, if any"""
+    return _current_run.get()
+
+
+def current_stage():
+    """Returns the stage of the current span, if any"""
+    span = _current_span.get()
+    return span.stage if span is not None else None
+
+
+# ======================================================================
+# Spans
+# ======================================================================
+@contextmanager
+def activate(span: StageSpan):
+    """Makes ``span`` the target of record_* calls inside the block"""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+def open_span(stage: str) -> StageSpan:
+    """Starts a span and registers it with the current run"""
+    span = StageSpan(stage)
+    trace = _current_run.get()
+    if trace is not None:
+        trace.add_span(span)
+    return span
+
+
+def close_span(span: StageSpan, error: Exception = None) -> None:
+    """Finishes a span opened with open_span"""
+    span.duration = time.time() - span.started
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+
+
+@contextmanager
+def stage_span(stage: str):
+    """Times a stage call and collects its usage"""
+    span = open_span(stage)
+    try:
+        with activate(span):
+            yield span
+    except BaseException as e:
+        close_span(span, e)
+        raise
+    close_span(span)
+
+
+# ======================================================================
+# Recording
+# ======================================================================
+def record(**counters) -> None:
+    """Adds to the counters of the current span"""
+    span = _current_span.get()
+    if span is None:
+        return
+    for name, value in counters.items():
+        span.counters[name] += value
+
+
+def record_usage(model: str, usage) -> None:
+    """Records the token usage of an OpenAI response and its estimated cost"""
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    details = getattr(usage, "completion_tokens_details", None)
+    reasoning_tokens = getattr(details, "reasoning_tokens", None) or 0
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    record(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        reasoning_tokens=reasoning_tokens,
+        cost_usd=(prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+    )
+
+
+def record_decision(kind: str, **details) -> None:
+    """Adds a policy decision (e.g. the model route of a request) to the current run"""
+    trace = _current_run.get()
+    if trace is None:
+        return
+    span = _current_span.get()
+    trace.add_decision({
+        "kind": kind,
+        "stage": span.stage if span is not None else None,
+        "time": time.time(),
+        **details,
+    })
+
+
+def record_characters(characters: int) -> None:
+    """Records DeepL billed characters and their estimated cost"""
+    record(characters=characters, cost_usd=characters * DEEPL_PRICE_PER_MILLION_CHARS / 1e6)
+
+
+def record_wait(seconds: float, stage: str = None) -> None:
+    """Records time spent waiting for a rate limiter or concurrency slot"""
+    if stage is not None:
+        trace = _current_run.get()
+        if trace is not None:
+            trace.add_wait(stage, seconds)
+    else:
+        record(queue_wait=seconds)
+
+
+def submit_with_context(executor, func, *args):
+    """Submits to a thread pool so that the task records into the caller's run and span"""
+    return executor.submit(contextvars.copy_context().run, func, *args)
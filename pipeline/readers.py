@@ -0,0 +1,359 @@
+import codecs
+import re
+import zipfile
+from xml.etree import ElementTree
+
+
+# ======================================================================
+# Document Readers
+# ======================================================================
+# Readers take file-like objects (Streamlit uploads or io.BytesIO) so the UI
+# and the CLI share the same code. Every format has a streaming reader that
+# yields one paragraph at a time; the read_* functions join its output.
+SUPPORTED_EXTENSIONS = ('txt', 'docx', 'rtf')
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+# ======================================================================
+# Plain Text
+# ======================================================================
+def iter_text_file(uploaded_file):
+    """Yields the lines of a UTF-8 text file without decoding it in one piece"""
+    uploaded_file.seek(0)
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    while True:
+        data = uploaded_file.read(READ_CHUNK_BYTES)
+        buffer += decoder.decode(data, final=not data)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line.rstrip('\r')
+        if not data:
+            break
+    yield buffer.rstrip('\r')
+
+
+# ======================================================================
+# DOCX
+# ======================================================================
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Footnote and endnote entries of these types are separators, not notes
+NOTE_SEPARATOR_TYPES = ('separator', 'continuationSeparator', 'continuationNotice')
+
+
+def _iter_docx_part(archive: zipfile.ZipFile, name: str, note_tag: str = None):
+    """Yields the paragraphs of one XML part of a DOCX archive.
+
+    The part is parsed incrementally and every finished paragraph is removed
+    from the tree, so memory use does not grow with the document. Table
+    cells contain regular paragraphs and are yielded cell by cell; text
+    boxes nested in a paragraph are yielded before it.
+    """
+    skip_note = False
+    elements = []
+    paragraphs = []  # text parts of the open (possibly nested) paragraphs
+    with archive.open(name) as stream:
+        for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                elements.append(element)
+                if tag == f'{W}p':
+                    paragraphs.append([])
+                elif note_tag and tag == note_tag:
+                    skip_note = element.get(f'{W}type') in NOTE_SEPARATOR_TYPES
+                continue
+
+            elements.pop()
+            if not paragraphs:
+                continue
+            if tag == f'{W}t':
+                paragraphs[-1].append(element.text or '')
+            elif tag == f'{W}tab':
+                paragraphs[-1].append('\t')
+            elif tag in (f'{W}br', f'{W}cr'):
+                paragraphs[-1].append(' ')
+            elif tag == f'{W}noBreakHyphen':
+                paragraphs[-1].append('-')
+            elif tag == f'{W}p':
+                text = ''.join(paragraphs.pop())
+                if not skip_note:
+                    yield text
+                if elements:
+                    elements[-1].remove(element)
+
+
+def _docx_parts(archive: zipfile.ZipFile, kind: str) -> list:
+    """Returns the archive paths of the parts of one relationship type, in document order"""
+    try:
+        relationships = ElementTree.fromstring(archive.read('word/_rels/document.xml.rels'))
+    except KeyError:
+        return []
+    names = []
+    for relationship in relationships.iter(f'{REL}Relationship'):
+        if relationship.get('Type', '').endswith(f'/{kind}'):
+            target = relationship.get('Target', '').lstrip('/')
+            names.append(target if target.startswith('word/') else f'word/{target}')
+    return [name for name in names if name in archive.namelist()]
+
+
+def iter_docx_file(uploaded_file):
+    """Yields the paragraphs of a DOCX file: body (with tables), footnotes and endnotes.
+
+    Page headers and footers are left out; they repeat on every page and
+    would otherwise be taken for the title of the article.
+    """
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as archive:
+        yield from _iter_docx_part(archive, 'word/document.xml')
+        for name in _docx_parts(archive, 'footnotes'):
+            yield from _iter_docx_part(archive, name, note_tag=f'{W}footnote')
+        for name in _docx_parts(archive, 'endnotes'):
+            yield from _iter_docx_part(archive, name, note_tag=f'{W}endnote')
+
+
+# ======================================================================
+# RTF
+# ======================================================================
+RTF_TOKEN = re.compile(
+    rb"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?"  # control word with optional parameter
+    rb"|\\'([0-9a-fA-F]{2})"               # hex-escaped byte in the current code page
+    rb"|\\([^a-zA-Z'])"                    # control symbol
+    rb"|([{}])"                            # group
+    rb"|[\r\n]+"                           # line breaks carry no meaning in RTF
+    rb"|([^\\{}\r\n]+)",                   # text
+    re.DOTALL
+)
+
+# Longest possible control word: backslash, 32 letters, sign, 10 digits, space
+RTF_MAX_CONTROL_WORD = 45
+
+# Destinations whose content is not part of the document text
+RTF_SKIP_DESTINATIONS = {
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'fldinst',
+    'themedata', 'colorschememapping', 'datastore', 'latentstyles', 'listtable',
+    'listoverridetable', 'rsidtbl', 'generator', 'xmlnstbl', 'mmathPr',
+    'filetbl', 'revtbl', 'userprops', 'nonshppict', 'bkmkstart', 'bkmkend',
+}
+
+RTF_PARAGRAPH_BREAKS = {'par', 'sect', 'page', 'cell', 'row'}
+
+RTF_SYMBOLS = {
+    'line': ' ', 'tab': '\t', 'emdash': '—', 'endash': '–', 'bullet': '•',
+    'lquote': '‘', 'rquote': '’', 'ldblquote': '“', 'rdblquote': '”',
+    'emspace': ' ', 'enspace': ' ', 'qmspace': ' ',
+}
+RTF_CONTROL_SYMBOLS = {'~': '\u00a0', '_': '-', '-': '', '\\': '\\', '{': '{', '}': '}'}
+# A backslash before a line break is the old spelling of \par (written e.g. by TextEdit)
+RTF_PARAGRAPH_SYMBOLS = (b'\n', b'\r')
+
+# \fcharset values and their Windows code pages
+RTF_CHARSET_CODEPAGES = {
+    0: 1252, 77: 10000, 128: 932, 129: 949, 134: 936, 136: 950, 161: 1253,
+    162: 1254, 163: 1258, 177: 1255, 178: 1256, 186: 1257, 204: 1251, 222: 874, 238: 1250,
+}
+
+
+def _codec(codepage: int) -> str:
+    """Returns the Python codec of a Windows code page, falling back to cp1252"""
+    name = 'mac_roman' if codepage == 10000 else f'cp{codepage}'
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return 'cp1252'
+    return name
+
+
+def _iter_rtf_tokens(uploaded_file):
+    """Yields RTF token matches from a file read in chunks.
+
+    A control word close to the end of the buffer may continue in the next
+    chunk, so it is only emitted once more data (or the end) has arrived.
+    """
+    uploaded_file.seek(0)
+    buffer = b''
+    eof = False
+    while not eof:
+        data = uploaded_file.read(READ_CHUNK_BYTES)
+        eof = not data
+        buffer += data
+        position = 0
+        while position < len(buffer):
+            match = RTF_TOKEN.match(buffer, position)
+            if match is None:
+                if not eof:
+                    break  # a lone backslash at the end of the chunk
+                position += 1
+                continue
+            if match.lastindex in (1, 2) and match.end() + RTF_MAX_CONTROL_WORD > len(buffer) and not eof:
+                break  # the control word or its parameter may continue in the next chunk
+            yield match
+            position = match.end()
+        buffer = buffer[position:]
+
+
+def iter_rtf_file(uploaded_file):
+    """Yields the paragraphs of an RTF file.
+
+    A linear tokenizer tracks groups, ignorable destinations, \\uN escapes
+    with their fallback characters, and the document and font code pages
+    used for 8-bit text and \\'hh escapes. Footnotes are collected and
+    yielded after the body instead of interrupting their paragraph.
+    """
+    # 'destination' is "text", "notes", "fonts" (font table) or "skip"
+    state = {'destination': 'text', 'uc': 1, 'codepage': 1252, 'font': None, 'charset': None}
+    stack = []
+    font_codepages = {}
+    default_codepage = 1252
+    paragraph = []
+    note = []
+    notes = []
+    pending_bytes = bytearray()
+    pending_surrogate = None
+    fallback = 0  # characters still to skip after a \uN escape
+
+    def output() -> list:
+        return note if state['destination'] == 'notes' else paragraph
+
+    def flush_bytes():
+        if pending_bytes:
+            output().append(pending_bytes.decode(_codec(state['codepage']), errors='replace'))
+            pending_bytes.clear()
+
+    def remember_font():
+        if state['font'] is not None and state['charset']:
+            font_codepages[state['font']] = state['charset']
+
+    for match in _iter_rtf_tokens(uploaded_file):
+        word, parameter, hex_byte, symbol, brace, text = match.group(1, 2, 3, 4, 5, 6)
+        if symbol in RTF_PARAGRAPH_SYMBOLS:
+            word, symbol = b'par', None
+        if hex_byte is None:
+            flush_bytes()
+        destination = state['destination']
+        visible = destination in ('text', 'notes')
+
+        if brace == b'{':
+            stack.append(dict(state))
+            fallback = 0
+        elif brace == b'}':
+            if destination == 'fonts':
+                remember_font()
+            if stack:
+                state = stack.pop()
+            if destination == 'notes' and state['destination'] != 'notes':
+                notes.append(''.join(note))
+                note = []
+            fallback = 0
+        elif word is not None:
+            word = word.decode('ascii')
+            value = int(parameter) if parameter is not None else None
+            if word == 'u' and value is not None:
+                fallback = state['uc']
+                if not visible:
+                    continue
+                code = value + 65536 if value < 0 else value
+                if 0xD800 <= code < 0xDC00:
+                    pending_surrogate = code
+                    continue
+                if 0xDC00 <= code < 0xE000 and pending_surrogate:
+                    code = 0x10000 + ((pending_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                pending_surrogate = None
+                output().append(chr(code))
+            elif fallback:
+                fallback -= 1
+            elif word == 'fonttbl':
+                state['destination'] = 'fonts'
+            elif word in RTF_SKIP_DESTINATIONS:
+                state['destination'] = 'skip'
+            elif word == 'footnote':
+                state['destination'] = 'notes'
+            elif word == 'uc' and value is not None:
+                state['uc'] = value
+            elif word == 'ansicpg' and value:
+                default_codepage = state['codepage'] = value
+            elif word == 'f' and value is not None:
+                if destination == 'fonts':
+                    remember_font()
+                    state['font'], state['charset'] = value, None
+                else:
+                    state['codepage'] = font_codepages.get(value, default_codepage)
+            elif word == 'fcharset' and value is not None and destination == 'fonts':
+                state['charset'] = RTF_CHARSET_CODEPAGES.get(value, default_codepage)
+            elif word == 'cpg' and value and destination == 'fonts':
+                state['charset'] = value
+            elif not visible:
+                continue
+            elif word in RTF_PARAGRAPH_BREAKS:
+                if destination == 'notes':
+                    notes.append(''.join(note))
+                    note = []
+                else:
+                    yield ''.join(paragraph)
+                    paragraph = []
+            elif word in RTF_SYMBOLS:
+                output().append(RTF_SYMBOLS[word])
+        elif symbol is not None:
+            if fallback:
+                fallback -= 1
+            elif symbol == b'*':
+                state['destination'] = 'skip'
+            elif visible:
+                output().append(RTF_CONTROL_SYMBOLS.get(symbol.decode('latin-1'), ''))
+        elif hex_byte is not None:
+            if fallback:
+                fallback -= 1
+            elif visible:
+                pending_bytes.append(int(hex_byte, 16))
+        elif text is not None:
+            if fallback:
+                skipped = min(fallback, len(text))
+                fallback -= skipped
+                text = text[skipped:]
+            if text and visible:
+                output().append(text.decode(_codec(state['codepage']), errors='replace'))
+
+    flush_bytes()
+    if paragraph:
+        yield ''.join(paragraph)
+    for text in notes:
+        if text.strip():
+            yield text
+
+
+# ======================================================================
+# Dispatch
+# ======================================================================
+def iter_uploaded_file(uploaded_file):
+    """Yields the paragraphs of an uploaded file based on its extension"""
+    file_type = uploaded_file.name.split('.')[-1].lower()
+    if file_type == 'txt':
+        return iter_text_file(uploaded_file)
+    elif file_type == 'docx':
+        return iter_docx_file(uploaded_file)
+    elif file_type == 'rtf':
+        return iter_rtf_file(uploaded_file)
+    raise ValueError(f"Nicht unterstütztes Dateiformat: {file_type}")
+
+def read_text_file(uploaded_file):
+    """Read content from a text file"""
+    return '\n'.join(iter_text_file(uploaded_file))
+
+def read_docx_file(uploaded_file):
+    """Read content from a DOCX file"""
+    return '\n'.join(iter_docx_file(uploaded_file))
+
+def read_rtf_file(uploaded_file):
+    """Read content from an RTF file"""
+    return '\n'.join(iter_rtf_file(uploaded_file))
+
+def read_uploaded_file(uploaded_file):
+    """Read content from an uploaded file based on its extension"""
+    return '\n'.join(iter_uploaded_file(uploaded_file))
+
+def read_path(path: str):
+    """Read content from a file on disk based on its extension"""
+    with open(path, 'rb') as f:
+        return read_uploaded_file(f)
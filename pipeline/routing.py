@@ -0,0 +1,187 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import statistics
+import time
+
+from pipeline.metrics import record_decision, stage_span, start_run
+from pipeline.translation_memory import split_sentences
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# "adaptive" picks a route per article (all its chunks share it, see
+# optimization_chunks), "fixed" always uses the strongest route, override
+# with ROUTING_MODE
+ROUTING_MODE = os.environ.get("ROUTING_MODE", "adaptive")
+
+# From cheapest to strongest
+ROUTES = {
+    "light": {"model": "gpt-4o-mini", "reasoning_effort": None},
+    "medium": {"model": "o3-mini", "reasoning_effort": "low"},
+    "high": {"model": "o3-mini", "reasoning_effort": "high"},
+}
+
+# Upper bounds of the signals for the lighter routes; a request exceeding any
+# bound moves up. Override with ROUTE_<ROUTE>_<SIGNAL>, e.g. ROUTE_LIGHT_WORDS=300
+DEFAULT_THRESHOLDS = {
+    "light": {"words": 250, "sentence_words": 22, "quote_share": 0.15, "numbers": 8},
+    "medium": {"words": 1200, "sentence_words": 28, "quote_share": 0.35, "numbers": 40},
+}
+
+# A DeepL text much shorter or longer than its source (in characters) hints at
+# dropped or garbled passages and always gets the strongest route
+DEFAULT_DEEPL_RATIO = {"min": 0.9, "max": 1.6}
+
+QUOTED = re.compile(r'[“"„«]([^”"“»]{3,})[”"“»]')
+FIGURE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def get_thresholds() -> dict:
+    """Returns the route thresholds, honouring the environment overrides"""
+    thresholds = {route: dict(bounds) for route, bounds in DEFAULT_THRESHOLDS.items()}
+    for route, bounds in thresholds.items():
+        for signal in bounds:
+            env_value = os.environ.get(f"ROUTE_{route.upper()}_{signal.upper()}")
+            if env_value is not None:
+                bounds[signal] = float(env_value)
+    ratio = {
+        bound: float(os.environ.get(f"ROUTE_DEEPL_RATIO_{bound.upper()}", value))
+        for bound, value in DEFAULT_DEEPL_RATIO.items()
+    }
+    return {"routes": thresholds, "deepl_ratio": ratio}
+
+
+def routing_version() -> str:
+    """Identifies mode and thresholds, used in the cache keys of routed stages"""
+    policy = json.dumps({"mode": ROUTING_MODE, "routes": ROUTES, **get_thresholds()}, sort_keys=True)
+    return hashlib.sha256(policy.encode("utf-8")).hexdigest()[:12]
+
+
+# ======================================================================
+# Signals
+# ======================================================================
+def route_signals(source: str, translated: str) -> dict:
+    """Cheap local difficulty signals of a source text and its DeepL translation"""
+    words = len(source.split())
+    sentences = [sentence for line in source.split('\n') for sentence in split_sentences(line)]
+    quoted = sum(len(match.group(1)) for match in QUOTED.finditer(source))
+    return {
+        "words": words,
+        "sentence_words": round(words / max(1, len(sentences)), 2),
+        "quote_share": round(quoted / max(1, len(source)), 3),
+        "numbers": len(FIGURE.findall(source)),
+        "deepl_ratio": round(len(translated) / max(1, len(source)), 3),
+    }
+
+
+def choose_route(signals: dict, thresholds: dict = None) -> tuple:
+    """Returns (route, reason) for a set of signals, see DEFAULT_THRESHOLDS"""
+    thresholds = thresholds or get_thresholds()
+    ratio = thresholds["deepl_ratio"]
+    if not ratio["min"] <= signals["deepl_ratio"] <= ratio["max"]:
+        return "high", f"deepl_ratio {signals['deepl_ratio']} außerhalb {ratio['min']}-{ratio['max']}"
+    reason = None
+    for route, bounds in thresholds["routes"].items():
+        exceeded = [
+            f"{signal} {signals[signal]} > {bound:g}"
+            for signal, bound in bounds.items() if signals[signal] > bound
+        ]
+        if not exceeded:
+            return route, reason or "alle Signale unter den Schwellen"
+        reason = ', '.join(exceeded)
+    return "high", reason
+
+
+def decide_route(source: str, translated: str, part: int = 1, total: int = 1) -> dict:
+    """Chooses model and reasoning effort for an article (or one request) and logs the decision"""
+    signals = route_signals(source, translated)
+    if ROUTING_MODE == "fixed":
+        route, reason = "high", "ROUTING_MODE=fixed"
+    else:
+        route, reason = choose_route(signals)
+    decision = {"route": route, **ROUTES[route], "reason": reason, "part": part, "total": total,
+                "signals": signals}
+    record_decision("route", **decision)
+    return decision
+
+
+# ======================================================================
+# Evaluation
+# ======================================================================
+# Usage:
+#   python -m pipeline --evaluate-routing output/
+#
+# Runs every route on saved articles (the *_bereinigt.txt and *_deepl.txt
+# files written by the CLI or the download buttons) and compares latency,
+# cost and the number of quality check findings per route.
+def load_saved_corpus(paths: list) -> list:
+    """Returns (name, cleaned_text, translated_text) for every saved article in ``paths``"""
+    articles = []
+    for path in paths:
+        pattern = os.path.join(path, "*_bereinigt.txt") if os.path.isdir(path) else path
+        for cleaned_path in sorted(glob.glob(pattern)):
+            translated_path = cleaned_path[:-len("_bereinigt.txt")] + "_deepl.txt"
+            if not os.path.exists(translated_path):
+                continue
+            with open(cleaned_path, encoding='utf-8') as f:
+                cleaned_text = f.read()
+            with open(translated_path, encoding='utf-8') as f:
+                translated_text = f.read()
+            articles.append((os.path.basename(cleaned_path)[:-len("_bereinigt.txt")], cleaned_text, translated_text))
+    return articles
+
+
+def evaluate_routes(articles: list, openai_key: str) -> dict:
+    """Optimizes every article on every route and returns a JSON-ready comparison.
+
+    Optimizations bypass the stage cache so each route is really measured;
+    the findings of the (cached) quality check serve as the quality signal.
+    "adaptive" takes, per article, the measurements of the route the policy
+    would choose, and ``hard_cases`` lists articles where it has more findings
+    than the strongest route.
+    """
+    from pipeline import stages
+    from pipeline.findings import parse_findings
+
+    rows = []
+    for name, cleaned_text, translated_text in articles:
+        row = {"name": name, "signals": route_signals(cleaned_text, translated_text), "routes": {}}
+        row["adaptive"] = choose_route(row["signals"])[0]
+        for route in ROUTES:
+            with start_run(f"{name} [{route}]"):
+                with stage_span("optimize") as span:
+                    started = time.perf_counter()
+                    final_text = stages.chat_completion(
+                        openai_key, **stages.optimization_request(cleaned_text, translated_text, route=route)
+                    )
+                    latency = time.perf_counter() - started
+                findings = parse_findings(stages.analyze_translation(cleaned_text, final_text, openai_key))
+            row["routes"][route] = {
+                "latency": round(latency, 3),
+                "cost_usd": round(span.counters["cost_usd"], 6),
+                "findings": len(findings),
+            }
+        rows.append(row)
+
+    def summary(pick) -> dict:
+        chosen = [row["routes"][pick(row)] for row in rows]
+        return {
+            "latency_p50": round(statistics.median(result["latency"] for result in chosen), 3) if chosen else 0.0,
+            "cost_usd": round(sum(result["cost_usd"] for result in chosen), 6),
+            "findings": sum(result["findings"] for result in chosen),
+        }
+
+    report = {route: summary(lambda row, route=route: route) for route in ROUTES}
+    report["adaptive"] = summary(lambda row: row["adaptive"])
+    return {
+        "thresholds": get_thresholds(),
+        "summary": report,
+        "hard_cases": [
+            row["name"] for row in rows
+            if row["routes"][row["adaptive"]]["findings"] > row["routes"]["high"]["findings"]
+        ],
+        "articles": rows,
+    }
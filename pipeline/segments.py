@@ -0,0 +1,185 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from prompts import DEFAULT_TARGET
+from pipeline.cache import get_stage_cache, make_cache_key
+from pipeline.metrics import record, submit_with_context
+from pipeline.translation_memory import translate_from_memory
+
+# ======================================================================
+# Configuration
+# ======================================================================
+# DeepL accepts up to 50 texts and 128 KiB per request, stay below both
+MAX_SEGMENTS_PER_REQUEST = 50
+MAX_CHARS_PER_REQUEST = 30000
+
+# Streaming mode sends small batches so DeepL can start before cleaning is done
+STREAM_BATCH_SEGMENTS = 8
+STREAM_MAX_WORKERS = 2
+
+
+# ======================================================================
+# Segmentation
+# ======================================================================
+def split_segments(text: str) -> list:
+    """Splits text into line-based paragraph segments.
+
+    Joining the result with '\\n' gives back the original text, blank lines
+    included, so translated segments can be spliced back in place.
+    """
+    return text.split('\n')
+
+
+def iter_segments(chunks):
+    """Turns a stream of text deltas into complete segments.
+
+    Yields the same segments as ``split_segments`` on the joined text, each
+    as soon as its line break has arrived.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split('\n')
+        yield from complete
+    yield buffer
+
+
+def is_translatable(segment: str) -> bool:
+    """Returns True for segments that contain actual text"""
+    return bool(segment.strip())
+
+
+def make_batches(segments: list) -> list:
+    """Groups segments into request-sized batches"""
+    batches = []
+    current = []
+    current_chars = 0
+    for segment in segments:
+        if current and (len(current) >= MAX_SEGMENTS_PER_REQUEST
+                        or current_chars + len(segment) > MAX_CHARS_PER_REQUEST):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(segment)
+        current_chars += len(segment)
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ======================================================================
+# Incremental Translation
+# ======================================================================
+def segment_key(segment: str, model: str, params: dict) -> str:
+    """Returns the cache key of one translated segment"""
+    return make_cache_key("translate_segment", {"text": segment}, model=model, params=params)
+
+
+def translate_segments(text: str, translate_batch, model: str = "deepl", **params) -> str:
+    """Translates text paragraph by paragraph, sending only uncached segments.
+
+    ``translate_batch`` takes a list of strings and returns the list of
+    translations in the same order. Each translated segment is stored in the
+    stage cache under its own content hash, so a re-run after a small edit
+    only pays for the paragraphs that actually changed. Paragraphs whose
+    sentences are all known to the translation memory are assembled locally.
+    """
+    cache = get_stage_cache()
+    segments = split_segments(text)
+    translations = {}
+    missing = {}
+    from_memory = 0
+
+    for segment in segments:
+        if not is_translatable(segment) or segment in translations or segment in missing:
+            continue
+        key = segment_key(segment, model, params)
+        hit, value = cache.get(key, "translate_segment")
+        if hit:
+            translations[segment] = value
+            continue
+        remembered = translate_from_memory(segment, params.get("target_lang", DEFAULT_TARGET))
+        if remembered is not None:
+            translations[segment] = remembered
+            from_memory += 1
+        else:
+            missing[segment] = key
+
+    record(segments_cached=len(translations) - from_memory, segments_memory=from_memory,
+           segments_sent=len(missing))
+    for batch in make_batches(list(missing)):
+        for segment, translated in zip(batch, translate_batch(batch)):
+            translations[segment] = translated
+            cache.set(missing[segment], "translate_segment", translated)
+
+    return '\n'.join(
+        translations[segment] if is_translatable(segment) else segment
+        for segment in segments
+    )
+
+
+def translate_stream(segments, translate_batch, model: str = "deepl",
+                     batch_size: int = STREAM_BATCH_SEGMENTS,
+                     max_workers: int = STREAM_MAX_WORKERS, **params):
+    """Translates segments while they are still being produced.
+
+    ``segments`` is any iterable, typically ``iter_segments`` over a streamed
+    GPT response. Uncached segments are collected into small batches that are
+    translated in background threads, so DeepL runs concurrently with the
+    producer. Translations are yielded in input order as soon as they (and
+    all segments before them) are available. Uses the same segment cache and
+    translation memory as ``translate_segments``.
+    """
+    cache = get_stage_cache()
+
+    def run_batch(batch: list) -> list:
+        keys = [segment_key(segment, model, params) for segment in batch]
+        translations = translate_batch(batch)
+        for key, translated in zip(keys, translations):
+            cache.set(key, "translate_segment", translated)
+        return translations
+
+    # Entries are (batch, position) for pending translations or (None, text);
+    # a batch is {"segments": [...], "future": None} until it is submitted
+    pending = deque()
+    batch = {"segments": [], "future": None}
+
+    def flush():
+        nonlocal batch
+        if batch["segments"]:
+            record(segments_sent=len(batch["segments"]))
+            batch["future"] = submit_with_context(executor, run_batch, batch["segments"])
+            batch = {"segments": [], "future": None}
+
+    def is_ready(entry) -> bool:
+        holder = entry[0]
+        return holder is None or (holder["future"] is not None and holder["future"].done())
+
+    def resolve(entry) -> str:
+        holder, value = entry
+        return value if holder is None else holder["future"].result()[value]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for segment in segments:
+            if not is_translatable(segment):
+                pending.append((None, segment))
+                continue
+            hit, value = cache.get(segment_key(segment, model, params), "translate_segment")
+            remembered = None if hit else translate_from_memory(segment, params.get("target_lang", DEFAULT_TARGET))
+            if hit:
+                record(segments_cached=1)
+                pending.append((None, value))
+            elif remembered is not None:
+                record(segments_memory=1)
+                pending.append((None, remembered))
+            else:
+                pending.append((batch, len(batch["segments"])))
+                batch["segments"].append(segment)
+                if len(batch["segments"]) >= batch_size:
+                    flush()
+            while pending and is_ready(pending[0]):
+                yield resolve(pending.popleft())
+
+        flush()
+        while pending:
+            yield resolve(pending.popleft())
@@ -0,0 +1,607 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from prompts import (
+    DEFAULT_TARGET,
+    get_cleaning_messages,
+    get_translation_messages,
+    get_quality_check_messages,
+    get_reoptimization_messages
+)
+from pipeline.boilerplate import DEFAULT_STRENGTH, SKIP_LLM_CONFIDENCE, preclean
+from pipeline.budget import plan_chunk_tokens, plan_request
+from pipeline.cache import cached_stage, cached_stream
+from pipeline.chunking import (
+    CLEAN_CHUNK_TOKENS,
+    CLEAN_OVERLAP_TOKENS,
+    OPTIMIZE_CHUNK_TOKENS,
+    chunk_separators,
+    iter_joined,
+    iter_map_chunks,
+    iter_stitched,
+    map_chunks,
+    split_aligned_chunks,
+    split_into_chunks,
+    stitch_chunks
+)
+from pipeline.clients import (
+    CONNECT_TIMEOUT,
+    JINA_TIMEOUT,
+    OPENAI_TIMEOUT,
+    call_with_retry,
+    get_deepl_translator,
+    get_http_session,
+    get_openai_client,
+    request_slot
+)
+from pipeline.deadline import (
+    FALLBACK_OPTIMIZE,
+    DeadlineExceeded,
+    check_deadline,
+    degrade,
+    request_timeout
+)
+from pipeline.extraction import canonicalize_url, extract_with_revalidation
+from pipeline.findings import build_reoptimization_tasks, splice_paragraphs
+from pipeline.metrics import record_characters, record_usage, stage_span, submit_with_context
+from pipeline.routing import ROUTES, decide_route, routing_version
+from pipeline.segments import iter_segments, translate_segments, translate_stream
+from pipeline.translation_memory import (
+    find_hints,
+    has_placeholders,
+    mask_served_paragraphs,
+    only_placeholders,
+    remember_translation,
+    restore_served_paragraphs
+)
+from pipeline.tokens import estimate_message_tokens
+
+# openai, deepl and requests are imported by pipeline/clients.py when the
+# first client is created, so importing this module (e.g. for the CLI) stays cheap
+
+# Endpoints can be redirected for testing; OpenAI honours OPENAI_BASE_URL and
+# DeepL DEEPL_SERVER_URL (see pipeline/clients.py)
+JINA_READER_URL = os.environ.get("JINA_READER_URL", "https://r.jina.ai").rstrip('/')
+
+# ======================================================================
+# API Calls
+# ======================================================================
+# All calls go through shared, pooled clients and call_with_retry, which
+# applies the per-key rate limiter and retries 429/5xx with backoff. Requests
+# carry a RequestBudget (see pipeline/budget.py) that sets their completion
+# limit and learns from the usage of the response. Timeouts follow the
+# deadline of the current run (see pipeline/deadline.py).
+def request_units(kwargs: dict, budget) -> int:
+    """Returns the tokens a request reserves in the rate limiter"""
+    if budget is None:
+        return estimate_message_tokens(kwargs["messages"]) + kwargs.get("max_completion_tokens", 0)
+    return budget.prompt_tokens + kwargs["max_completion_tokens"]
+
+def chat_completion(openai_key: str, budget=None, **kwargs) -> str:
+    """Runs a chat completion and returns the message content.
+
+    A response cut off at the planned completion limit is requested once
+    more with the largest limit the model allows.
+    """
+    client = get_openai_client(openai_key)
+
+    def create(**kwargs):
+        return client.chat.completions.create(timeout=request_timeout(OPENAI_TIMEOUT), **kwargs)
+
+    response = call_with_retry(
+        "openai",
+        openai_key,
+        create,
+        units=request_units(kwargs, budget),
+        **kwargs
+    )
+    record_usage(kwargs["model"], response.usage)
+    if budget is not None:
+        truncated = response.choices[0].finish_reason == "length"
+        budget.observe(response.usage, truncated)
+        if truncated:
+            budget.widen()
+            kwargs["max_completion_tokens"] = budget.max_completion_tokens
+            response = call_with_retry(
+                "openai",
+                openai_key,
+                create,
+                units=request_units(kwargs, budget),
+                **kwargs
+            )
+            record_usage(kwargs["model"], response.usage)
+    return response.choices[0].message.content
+
+def stream_chat_completion(openai_key: str, budget=None, **kwargs):
+    """Yields the text deltas of a streamed chat completion.
+
+    A stream cut off at the planned completion limit raises ValueError
+    after its last delta, so the incomplete text is not cached. A stream
+    still running at the stage deadline raises DeadlineExceeded. The stream
+    holds its request slot until it ends.
+    """
+    client = get_openai_client(openai_key)
+    truncated = False
+    with request_slot("openai"):
+        stream = call_with_retry(
+            "openai",
+            openai_key,
+            client.chat.completions.create,
+            units=request_units(kwargs, budget),
+            hedge=False,
+            slot=False,
+            timeout=request_timeout(OPENAI_TIMEOUT),
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        for chunk in stream:
+            check_deadline()
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.choices and chunk.choices[0].finish_reason == "length":
+                truncated = True
+            # The final chunk carries the usage of the whole stream
+            if chunk.usage:
+                record_usage(kwargs["model"], chunk.usage)
+                if budget is not None:
+                    budget.observe(chunk.usage, truncated)
+    if truncated:
+        raise ValueError(
+            f"Antwort von {kwargs['model']} nach {kwargs.get('max_completion_tokens')} Tokens "
+            "abgeschnitten, bitte erneut ausführen"
+        )
+
+# ======================================================================
+# Request Parameters
+# ======================================================================
+# Shared by the blocking, streaming and chunked variants of each stage
+def cleaning_request(text: str, part: int = 1, total: int = 1) -> dict:
+    """Returns the chat completion parameters for cleaning (a part of) a text"""
+    messages = get_cleaning_messages(text, part, total)
+    budget = plan_request("cleaning", "gpt-4o-mini", messages, text)
+    return dict(
+        model="gpt-4o-mini",
+        messages=messages,
+        response_format={"type": "text"},
+        temperature=0,
+        max_completion_tokens=budget.max_completion_tokens,
+        top_p=1,
+        frequency_penalty=0,
+        presence_penalty=0,
+        budget=budget
+    )
+
+def optimization_request(cleaned_text: str, translated_text: str, part: int = 1, total: int = 1,
+                         target_lang: str = DEFAULT_TARGET, route: str = None) -> dict:
+    """Returns the chat completion parameters for optimizing (a part of) a translation.
+
+    Model and reasoning effort are chosen per request by the routing policy
+    (see pipeline/routing.py) unless ``route`` forces one. Similar sentences
+    from the translation memory are added as terminology hints; paragraphs
+    it already served are [TM-n] placeholders (see mask_served_paragraphs).
+    """
+    if route is None:
+        route = decide_route(cleaned_text, translated_text, part, total)["route"]
+    model = ROUTES[route]["model"]
+    hints = find_hints(cleaned_text, target_lang)
+    messages = get_translation_messages(
+        cleaned_text, translated_text, part, total, hints, target_lang, has_placeholders(cleaned_text)
+    )
+    budget = plan_request("translation", model, messages, translated_text)
+    request = dict(
+        model=model,
+        messages=messages,
+        response_format={"type": "text"},
+        max_completion_tokens=budget.max_completion_tokens,
+        budget=budget
+    )
+    if ROUTES[route]["reasoning_effort"]:
+        request["reasoning_effort"] = ROUTES[route]["reasoning_effort"]
+    else:
+        request["temperature"] = 0
+    return request
+
+def quality_check_request(cleaned_text: str, final_text: str, target_lang: str = DEFAULT_TARGET) -> dict:
+    """Returns the chat completion parameters for the quality check of a translation"""
+    messages = get_quality_check_messages(cleaned_text, final_text, target_lang)
+    budget = plan_request("quality_check", "gpt-4o-mini", messages, final_text)
+    return dict(
+        model="gpt-4o-mini",
+        messages=messages,
+        response_format={"type": "text"},
+        temperature=0,
+        max_completion_tokens=budget.max_completion_tokens,
+        top_p=1,
+        frequency_penalty=0,
+        presence_penalty=0,
+        budget=budget
+    )
+
+def clean_chunk_tokens() -> int:
+    """Returns the input budget per cleaning request, see plan_chunk_tokens"""
+    return plan_chunk_tokens("cleaning", "gpt-4o-mini", CLEAN_CHUNK_TOKENS)
+
+def optimization_chunks(cleaned_text: str, translated_text: str) -> tuple:
+    """Returns (route, pairs) of an article.
+
+    The route is decided for the whole article first, so its chunks are
+    sized for the model they are sent to. ``pairs`` are the (original,
+    DeepL) chunk pairs of a long article, or None for a single request.
+    """
+    route = decide_route(cleaned_text, translated_text)["route"]
+    # The model rewrites the DeepL half of each chunk
+    chunk_tokens = plan_chunk_tokens(
+        "translation", ROUTES[route]["model"], OPTIMIZE_CHUNK_TOKENS, source_share=0.5
+    )
+    pairs = split_aligned_chunks(cleaned_text, translated_text, chunk_tokens)
+    if pairs is None or len(pairs) < 2:
+        return route, None
+    return route, pairs
+
+# ======================================================================
+# Cached Stages
+# ======================================================================
+# Results are stored in the persistent stage cache (see pipeline/cache.py),
+# keyed on content, model, prompt version and parameters - never on API keys
+def extract_text_from_url(url: str, jina_key: str) -> str:
+    """Extracts text from a URL using Jina AI Reader with caching.
+
+    The URL is canonicalized first (see pipeline/extraction.py), so links
+    that only differ in tracking parameters, fragments or AMP variants share
+    one cache entry.
+    """
+    return extract_canonical_url(canonicalize_url(url), jina_key)
+
+@cached_stage("extract", exclude=("jina_key",), return_format="text")
+def extract_canonical_url(url: str, jina_key: str) -> str:
+    """Extracts the text of a canonical URL, see extract_text_from_url.
+
+    Within the stage cache TTL the text is reused as is; afterwards the
+    extraction store revalidates it with the article's server and only
+    calls Jina again when the page may have changed.
+    """
+    jina_url = f'{JINA_READER_URL}/{url}'
+    headers = {
+        'Authorization': f'Bearer {jina_key}',
+        'X-Return-Format': 'text'
+    }
+
+    def fetch():
+        response = get_http_session().get(
+            jina_url, headers=headers, timeout=(CONNECT_TIMEOUT, request_timeout(JINA_TIMEOUT))
+        )
+        response.raise_for_status()
+        return response.text
+
+    return extract_with_revalidation(url, lambda: call_with_retry("jina", jina_key, fetch))
+
+@cached_stage("clean", model="gpt-4o-mini", prompt="cleaning", exclude=("openai_key",),
+              temperature=0, max_completion_tokens="planned",
+              chunk_tokens=CLEAN_CHUNK_TOKENS, overlap_tokens=CLEAN_OVERLAP_TOKENS,
+              skip_confidence=SKIP_LLM_CONFIDENCE)
+def clean_text_with_gpt(text: str, openai_key: str, strength: str = DEFAULT_STRENGTH,
+                        skip_llm: bool = False) -> str:
+    """Cleans the text using GPT-4o-mini with caching.
+
+    Mechanically detectable boilerplate is removed locally first (see
+    pipeline/boilerplate.py); with ``skip_llm`` a confidently pre-cleaned
+    text is returned without calling GPT. Long texts are split at paragraph
+    boundaries into overlapping chunks that are cleaned in parallel and
+    stitched back together.
+    """
+    text, confidence = preclean(text, strength)
+    if skip_llm and confidence >= SKIP_LLM_CONFIDENCE:
+        return text
+    chunks = split_into_chunks(text, clean_chunk_tokens(), CLEAN_OVERLAP_TOKENS)
+    if len(chunks) == 1:
+        return chat_completion(openai_key, **cleaning_request(text))
+    return stitch_chunks(map_chunks(
+        lambda chunk, part, total: chat_completion(openai_key, **cleaning_request(chunk, part, total)),
+        chunks
+    ), chunk_separators(chunks))
+
+def deepl_translate_batch(batch: list, deepl_key: str, target_lang: str = DEFAULT_TARGET) -> list:
+    """Translates a list of English paragraphs into the target language in one DeepL request"""
+    translator = get_deepl_translator(deepl_key)
+    results = call_with_retry(
+        "deepl",
+        deepl_key,
+        translator.translate_text,
+        batch,
+        units=sum(len(text) for text in batch),
+        source_lang="EN",
+        target_lang=target_lang,
+        formality="more"
+    )
+    # Newer DeepL clients report billed characters; fall back to the input length
+    record_characters(sum(
+        getattr(result, "billed_characters", None) or len(text)
+        for text, result in zip(batch, results)
+    ))
+    return [result.text for result in results]
+
+@cached_stage("translate", model="deepl", exclude=("deepl_key",),
+              source_lang="EN", formality="more")
+def translate_text(text: str, deepl_key: str, target_lang: str = DEFAULT_TARGET) -> str:
+    """Translates text from English into the target language using DeepL with caching.
+
+    Paragraphs are translated in batches and cached individually, so only
+    new or changed paragraphs are sent to DeepL.
+    """
+    return translate_segments(
+        text,
+        partial(deepl_translate_batch, deepl_key=deepl_key, target_lang=target_lang),
+        source_lang="EN",
+        target_lang=target_lang,
+        formality="more"
+    )
+
+@cached_stage("optimize", model="routed", prompt="translation", exclude=("openai_key",),
+              routing=routing_version(), chunk_tokens=OPTIMIZE_CHUNK_TOKENS)
+def optimize_translation(cleaned_text: str, translated_text: str, openai_key: str,
+                         target_lang: str = DEFAULT_TARGET) -> str:
+    """Optimizes the translation using OpenAI with caching.
+
+    Long articles are optimized in parallel parts, cut at the same paragraph
+    boundaries in the original and the (line-aligned) DeepL translation.
+    Paragraphs the translation memory served are not sent to the model but
+    spliced back into its output. The result is added to the translation memory.
+    """
+    masked_cleaned, masked_translated, served = mask_served_paragraphs(cleaned_text, translated_text, target_lang)
+    if served and only_placeholders(masked_translated):
+        final_text = translated_text
+    else:
+        route, pairs = optimization_chunks(masked_cleaned, masked_translated)
+        if pairs is None:
+            output = chat_completion(
+                openai_key,
+                **optimization_request(masked_cleaned, masked_translated, target_lang=target_lang, route=route)
+            )
+        else:
+            output = ''.join(iter_joined(map_chunks(
+                lambda pair, part, total: chat_completion(
+                    openai_key, **optimization_request(*pair, part, total, target_lang, route)
+                ),
+                pairs
+            ), chunk_separators([source for source, _ in pairs])))
+        final_text = '\n'.join(restore_served_paragraphs(output.split('\n'), served))
+    remember_translation(cleaned_text, translated_text, final_text, target_lang)
+    return final_text
+
+
+@cached_stage("analyze", model="gpt-4o-mini", prompt="quality_check", exclude=("openai_key",),
+              temperature=0, max_completion_tokens="planned")
+def analyze_translation(cleaned_text: str, final_text: str, openai_key: str,
+                        target_lang: str = DEFAULT_TARGET) -> str:
+    """Analyzes the translation quality using GPT-4o-mini with caching"""
+    return chat_completion(openai_key, **quality_check_request(cleaned_text, final_text, target_lang))
+
+@cached_stage("reoptimize", model="o3-mini", prompt="reoptimization", exclude=("openai_key",),
+              reasoning_effort="high")
+def reoptimize_paragraph(source_paragraphs: str, context_before: str, paragraph: str,
+                         context_after: str, issues: str, openai_key: str,
+                         target_lang: str = DEFAULT_TARGET) -> str:
+    """Re-optimizes a single flagged paragraph using OpenAI with caching"""
+    messages = get_reoptimization_messages(
+        source_paragraphs, context_before, paragraph, context_after, issues, target_lang
+    )
+    budget = plan_request("reoptimization", "o3-mini", messages, paragraph)
+    return chat_completion(
+        openai_key,
+        model="o3-mini",
+        messages=messages,
+        response_format={"type": "text"},
+        reasoning_effort="high",
+        max_completion_tokens=budget.max_completion_tokens,
+        budget=budget
+    )
+
+def reoptimize_flagged_paragraphs(cleaned_text: str, final_text: str, findings: list, openai_key: str,
+                                  target_lang: str = DEFAULT_TARGET):
+    """Re-optimizes only the paragraphs named in the quality check findings.
+
+    The flagged paragraphs are sent in parallel, each with its original
+    paragraphs, neighbouring German paragraphs and issues, and the results
+    are spliced back into the final text. Returns (new_final_text, tasks).
+    """
+    tasks = build_reoptimization_tasks(cleaned_text, final_text, findings)
+    if not tasks:
+        return final_text, tasks
+    outputs = map_chunks(
+        lambda task, part, total: reoptimize_paragraph(
+            task["source_paragraphs"],
+            task["context_before"],
+            task["paragraph_text"],
+            task["context_after"],
+            task["issues"],
+            openai_key,
+            target_lang
+        ),
+        tasks
+    )
+    replacements = {task["line"]: output for task, output in zip(tasks, outputs)}
+    return splice_paragraphs(final_text, replacements), tasks
+
+# ======================================================================
+# Streaming Variants
+# ======================================================================
+# Same cache entries as the blocking functions above; the text is yielded
+# chunk by chunk so the UI can render it while the model is still writing
+@cached_stream("clean", model="gpt-4o-mini", prompt="cleaning", exclude=("openai_key",),
+               temperature=0, max_completion_tokens="planned",
+               chunk_tokens=CLEAN_CHUNK_TOKENS, overlap_tokens=CLEAN_OVERLAP_TOKENS,
+               skip_confidence=SKIP_LLM_CONFIDENCE)
+def stream_clean_text_with_gpt(text: str, openai_key: str, strength: str = DEFAULT_STRENGTH,
+                               skip_llm: bool = False):
+    """Streams the cleaned text, see clean_text_with_gpt.
+
+    Chunked texts are yielded part by part as the parallel requests finish.
+    """
+    text, confidence = preclean(text, strength)
+    if skip_llm and confidence >= SKIP_LLM_CONFIDENCE:
+        yield text
+        return
+    chunks = split_into_chunks(text, clean_chunk_tokens(), CLEAN_OVERLAP_TOKENS)
+    if len(chunks) == 1:
+        yield from stream_chat_completion(openai_key, **cleaning_request(text))
+        return
+    yield from iter_stitched(iter_map_chunks(
+        lambda chunk, part, total: chat_completion(openai_key, **cleaning_request(chunk, part, total)),
+        chunks
+    ), chunk_separators(chunks))
+
+def clean_and_translate_overlapped(raw_text: str, openai_key: str, deepl_key: str, on_segment=None,
+                                   strength: str = DEFAULT_STRENGTH, skip_llm: bool = False,
+                                   target_lang: str = DEFAULT_TARGET):
+    """Cleans and translates in one overlapped pass.
+
+    Complete paragraphs of the streamed GPT cleaning are sent to DeepL in
+    small batches while GPT is still writing, hiding most of the DeepL
+    latency behind the cleaning call. Returns (cleaned_text, translated_text).
+    """
+    cleaned_segments = []
+
+    def collect(segments):
+        for segment in segments:
+            cleaned_segments.append(segment)
+            yield segment
+
+    translated_segments = []
+    # DeepL work is recorded in a translate span; the cleaning stream records
+    # into its own span whenever it is advanced
+    with stage_span("translate"):
+        for translated in translate_stream(
+            collect(iter_segments(stream_clean_text_with_gpt(raw_text, openai_key, strength, skip_llm))),
+            partial(deepl_translate_batch, deepl_key=deepl_key, target_lang=target_lang),
+            source_lang="EN",
+            target_lang=target_lang,
+            formality="more"
+        ):
+            translated_segments.append(translated)
+            if on_segment:
+                on_segment(len(translated_segments), len(cleaned_segments))
+
+    return '\n'.join(cleaned_segments), '\n'.join(translated_segments)
+
+def translate_paragraphs(paragraphs, deepl_key: str, on_segment=None, target_lang: str = DEFAULT_TARGET):
+    """Translates paragraphs while they are still being read.
+
+    ``paragraphs`` is typically a streaming document reader (see
+    pipeline/readers.py), so DeepL batches start before a large upload has
+    been parsed completely. Returns (text, translated_text).
+    """
+    source_segments = []
+
+    def collect(segments):
+        for segment in segments:
+            source_segments.append(segment)
+            yield segment
+
+    translated_segments = []
+    with stage_span("translate"):
+        for translated in translate_stream(
+            collect(paragraphs),
+            partial(deepl_translate_batch, deepl_key=deepl_key, target_lang=target_lang),
+            source_lang="EN",
+            target_lang=target_lang,
+            formality="more"
+        ):
+            translated_segments.append(translated)
+            if on_segment:
+                on_segment(len(translated_segments), len(source_segments))
+
+    return '\n'.join(source_segments), '\n'.join(translated_segments)
+
+@cached_stream("optimize", model="routed", prompt="translation", exclude=("openai_key",),
+               routing=routing_version(), chunk_tokens=OPTIMIZE_CHUNK_TOKENS)
+def stream_optimize_translation(cleaned_text: str, translated_text: str, openai_key: str,
+                                target_lang: str = DEFAULT_TARGET):
+    """Streams the optimized translation, see optimize_translation.
+
+    Chunked articles are yielded part by part as the parallel requests
+    finish. With paragraphs served from memory the text is yielded line by
+    line, with the placeholders already replaced.
+    """
+    masked_cleaned, masked_translated, served = mask_served_paragraphs(cleaned_text, translated_text, target_lang)
+    if served and only_placeholders(masked_translated):
+        deltas = iter([translated_text])
+    else:
+        route, pairs = optimization_chunks(masked_cleaned, masked_translated)
+        if pairs is None:
+            deltas = stream_chat_completion(
+                openai_key,
+                **optimization_request(masked_cleaned, masked_translated, target_lang=target_lang, route=route)
+            )
+        else:
+            deltas = iter_joined(iter_map_chunks(
+                lambda pair, part, total: chat_completion(
+                    openai_key, **optimization_request(*pair, part, total, target_lang, route)
+                ),
+                pairs
+            ), chunk_separators([source for source, _ in pairs]))
+        if served:
+            deltas = (
+                ('\n' if number else '') + line
+                for number, line in enumerate(restore_served_paragraphs(iter_segments(deltas), served))
+            )
+    output = []
+    for delta in deltas:
+        output.append(delta)
+        yield delta
+    remember_translation(cleaned_text, translated_text, ''.join(output), target_lang)
+
+@cached_stream("analyze", model="gpt-4o-mini", prompt="quality_check", exclude=("openai_key",),
+               temperature=0, max_completion_tokens="planned")
+def stream_analyze_translation(cleaned_text: str, final_text: str, openai_key: str,
+                               target_lang: str = DEFAULT_TARGET):
+    """Streams the quality check report, see analyze_translation"""
+    yield from stream_chat_completion(openai_key, **quality_check_request(cleaned_text, final_text, target_lang))
+
+# ======================================================================
+# Deadline Fallbacks
+# ======================================================================
+def optimize_or_fallback(cleaned_text: str, translated_text: str, openai_key: str,
+                         target_lang: str = DEFAULT_TARGET) -> tuple:
+    """Runs optimize_translation, returns (final_text, fallback).
+
+    ``fallback`` is '' or the notice of a deadline fallback to the DeepL text.
+    """
+    try:
+        return optimize_translation(cleaned_text, translated_text, openai_key, target_lang), ''
+    except DeadlineExceeded as e:
+        return translated_text, degrade("optimize", target_lang, e, FALLBACK_OPTIMIZE)
+
+# ======================================================================
+# Multiple Target Languages
+# ======================================================================
+# Extraction and cleaning run once per article; each further edition only
+# adds its own DeepL translation and optimization, running concurrently
+def translate_edition(cleaned_text: str, deepl_key: str, openai_key: str,
+                      target_lang: str, translated_text: str = None) -> tuple:
+    """Translates and optimizes a cleaned text for one target language.
+
+    ``translated_text`` skips DeepL when the translation is already known.
+    Returns (translated_text, final_text, fallback), see optimize_or_fallback.
+    """
+    if translated_text is None:
+        translated_text = translate_text(cleaned_text, deepl_key, target_lang)
+    return (translated_text, *optimize_or_fallback(cleaned_text, translated_text, openai_key, target_lang))
+
+def submit_editions(executor, cleaned_text: str, deepl_key: str, openai_key: str, targets) -> dict:
+    """Starts translate_edition for every target in ``executor``, returns {target: future}"""
+    return {
+        target: submit_with_context(executor, translate_edition, cleaned_text, deepl_key, openai_key, target)
+        for target in targets
+    }
+
+def translate_editions(cleaned_text: str, deepl_key: str, openai_key: str, targets: list) -> dict:
+    """Produces all editions of a cleaned text in parallel, see translate_edition.
+
+    The wall-clock time is about that of the slowest single edition.
+    Returns {target: (translated_text, final_text, fallback)}.
+    """
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        futures = submit_editions(executor, cleaned_text, deepl_key, openai_key, targets)
+        return {target: future.result() for target, future in futures.items()}
@@ -0,0 +1,23 @@
+# ======================================================================
+# Local Token Estimates
+# ======================================================================
+# Rough, dependency-free estimates used for rate limiting and request
+# sizing. English and German prose average about 4 characters per token.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens of a text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(messages: list) -> int:
+    """Estimates the prompt tokens of a message list built in prompts.py"""
+    total = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, list):
+            content = ''.join(part.get("text", '') for part in content)
+        total += estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    return total
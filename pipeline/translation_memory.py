@@ -0,0 +1,384 @@
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from prompts import DEFAULT_TARGET
+
+# ======================================================================
+# Configuration
+# ======================================================================
+DEFAULT_MEMORY_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "deepl-o1-translate", "memory.sqlite3"
+)
+# Each target language has its own memory; the default target uses the path
+# as is, others get the language code inserted (memory.fr.sqlite3)
+
+# Only sentences known verbatim (up to case and whitespace) are translated
+# from memory; a near match may differ in a name or a negation, so pairs at
+# or above this similarity (Jaccard of character shingles) are only passed
+# to the optimizer as terminology hints
+HINT_THRESHOLD = float(os.environ.get("TM_HINT_THRESHOLD", 0.6))
+MAX_HINTS = int(os.environ.get("TM_MAX_HINTS", 30))
+
+# MinHash LSH parameters: 16 bands of 4 rows find most pairs above the hint threshold
+# and at most MAX_CANDIDATES of them are compared exactly per lookup
+SHINGLE_SIZE = 4
+BANDS = 16
+ROWS = 4
+MAX_CANDIDATES = 20
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+# Paragraphs of source and final text are paired when their words overlap this much
+ALIGNMENT_THRESHOLD = 0.3
+ALIGNMENT_WINDOW = 3
+
+MIN_SENTENCE_CHARS = 12
+
+# Tokens that end with a period without ending a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "st", "sen", "rep", "gov", "gen", "lt", "col",
+    "jan", "feb", "mar", "apr", "aug", "sept", "sep", "oct", "nov", "dec",
+    "u.s", "u.k", "u.n", "no", "vs", "etc", "inc", "corp", "co", "jr", "sr",
+    "z.b", "bzw", "ca", "nr", "d.h", "u.a", "usw", "vgl", "mio", "mrd", "tsd",
+}
+
+SENTENCE_BOUNDARY = re.compile(
+    r'(?:(?<=[.!?])|(?<=[.!?]["”’»«]))\s+(?=[A-ZÄÖÜÀÂÇÉÈÊÎÔÛÁÍÑÓÚ0-9"“„‚»«(\[¿¡])'
+)
+
+
+# ======================================================================
+# Text Helpers
+# ======================================================================
+def split_sentences(text: str) -> list:
+    """Splits a paragraph into sentences, keeping common abbreviations intact"""
+    pieces = [piece for piece in SENTENCE_BOUNDARY.split(text.strip()) if piece]
+    sentences = []
+    for piece in pieces:
+        if sentences:
+            last_word = sentences[-1].rsplit(None, 1)[-1].rstrip('.').lower()
+            if last_word in ABBREVIATIONS or re.fullmatch(r"[a-z]", last_word):
+                sentences[-1] += ' ' + piece
+                continue
+        sentences.append(piece)
+    return sentences
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def numbers(text: str) -> list:
+    """Returns the digits of each number, ignoring English vs. German separators"""
+    return [re.sub(r"\D", "", number) for number in re.findall(r"\d+(?:[.,]\d+)*", text)]
+
+
+def shingles(text: str) -> set:
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def band_keys(shingle_set: set) -> list:
+    """Returns the LSH band keys of a MinHash signature"""
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set]
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    return [
+        f"{band}:{zlib.crc32(repr(signature[band * ROWS:(band + 1) * ROWS]).encode())}"
+        for band in range(BANDS)
+    ]
+
+
+# ======================================================================
+# SQLite Store
+# ======================================================================
+class TranslationMemory:
+    """Persistent source sentence -> final sentence pairs of one target language with a MinHash LSH index"""
+
+    def __init__(self, path: str = DEFAULT_MEMORY_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS units (
+                    id INTEGER PRIMARY KEY,
+                    source_norm TEXT UNIQUE NOT NULL,
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    uses INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands (band TEXT NOT NULL, unit_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_band ON bands (band)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, source: str, target: str) -> None:
+        """Stores (or updates) the translation of a source sentence.
+
+        A sentence stored again comes from a later article, so this is also
+        where its ``uses`` are counted; lookups stay read-only.
+        """
+        source_norm = normalize(source)
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT id FROM units WHERE source_norm = ?", (source_norm,)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE units SET target = ?, created = ?, uses = uses + 1 WHERE id = ?",
+                    (target, time.time(), row[0])
+                )
+                return
+            unit_id = conn.execute(
+                "INSERT INTO units (source_norm, source, target, created) VALUES (?, ?, ?, ?)",
+                (source_norm, source, target, time.time())
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO bands (band, unit_id) VALUES (?, ?)",
+                [(key, unit_id) for key in band_keys(shingles(source))]
+            )
+
+    def search(self, source: str, threshold: float, limit: int = 1) -> list:
+        """Returns up to ``limit`` (source, target, score) matches at or above ``threshold``"""
+        conn = self._connect()
+        exact = conn.execute(
+            "SELECT source, target FROM units WHERE source_norm = ?", (normalize(source),)
+        ).fetchone()
+        if exact is not None:
+            return [(exact[0], exact[1], 1.0)]
+
+        query = shingles(source)
+        keys = band_keys(query)
+        # Only the candidates sharing the most bands are compared exactly
+        rows = conn.execute(
+            f"SELECT units.source, units.target FROM bands "
+            f"JOIN units ON units.id = bands.unit_id "
+            f"WHERE bands.band IN ({','.join('?' * len(keys))}) "
+            f"GROUP BY units.id ORDER BY COUNT(*) DESC LIMIT ?",
+            (*keys, MAX_CANDIDATES)
+        ).fetchall()
+        matches = []
+        for candidate, target in rows:
+            score = jaccard(query, shingles(candidate))
+            if score >= threshold:
+                matches.append((candidate, target, score))
+        matches.sort(key=lambda match: match[2], reverse=True)
+        return matches[:limit]
+
+    def lookup(self, source: str):
+        """Returns the stored translation of exactly this sentence, or None"""
+        row = self._connect().execute(
+            "SELECT target FROM units WHERE source_norm = ?", (normalize(source),)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+
+_memories = {}
+_memory_lock = threading.Lock()
+
+
+def get_memory_path(target_lang: str = DEFAULT_TARGET) -> str:
+    """Returns the memory file of a target language, honouring TRANSLATION_MEMORY_PATH"""
+    path = os.environ.get("TRANSLATION_MEMORY_PATH", DEFAULT_MEMORY_PATH)
+    if target_lang == DEFAULT_TARGET:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{target_lang.lower()}{extension}"
+
+
+def get_translation_memory(target_lang: str = DEFAULT_TARGET) -> TranslationMemory:
+    """Returns the process-wide translation memory of a target language"""
+    with _memory_lock:
+        if target_lang not in _memories:
+            _memories[target_lang] = TranslationMemory(get_memory_path(target_lang))
+        return _memories[target_lang]
+
+
+def memory_enabled() -> bool:
+    """The translation memory can be switched off with TRANSLATION_MEMORY=0"""
+    return os.environ.get("TRANSLATION_MEMORY", "1") != "0"
+
+
+# ======================================================================
+# Pipeline Integration
+# ======================================================================
+def translate_from_memory(paragraph: str, target_lang: str = DEFAULT_TARGET):
+    """Returns the paragraph assembled from memory if every sentence is known verbatim, else None.
+
+    Partly known paragraphs still go to DeepL as a whole, because
+    translating sentences out of their paragraph loses context.
+    """
+    if not memory_enabled():
+        return None
+    memory = get_translation_memory(target_lang)
+    targets = []
+    for sentence in split_sentences(paragraph):
+        target = memory.lookup(sentence)
+        if target is None:
+            return None
+        targets.append(target)
+    return ' '.join(targets) if targets else None
+
+
+def find_hints(text: str, target_lang: str = DEFAULT_TARGET, limit: int = MAX_HINTS) -> list:
+    """Returns (source, target) pairs from memory that resemble sentences of ``text``"""
+    if not memory_enabled():
+        return []
+    memory = get_translation_memory(target_lang)
+    hints = {}
+    for line in text.split('\n'):
+        for sentence in split_sentences(line):
+            if len(sentence) < MIN_SENTENCE_CHARS:
+                continue
+            for source, target, _ in memory.search(sentence, HINT_THRESHOLD):
+                hints[source] = target
+            if len(hints) >= limit:
+                return list(hints.items())
+    return list(hints.items())
+
+
+def _word_set(text: str) -> set:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def align_sentences(cleaned_text: str, translated_text: str, final_text: str) -> list:
+    """Pairs source sentences with sentences of the final text.
+
+    The line-aligned DeepL translation is used as a bridge: each source
+    paragraph is matched to the nearby final paragraph that shares the most
+    words with its DeepL version. Sentences are only paired 1:1 when both
+    paragraphs have the same number of sentences, so restructured
+    paragraphs are skipped rather than mismatched.
+    """
+    source_lines = cleaned_text.split('\n')
+    deepl_lines = translated_text.split('\n')
+    if len(source_lines) != len(deepl_lines):
+        return []
+    final_paragraphs = [line for line in final_text.split('\n') if line.strip()]
+
+    pairs = []
+    position = 0
+    for source, deepl_paragraph in zip(source_lines, deepl_lines):
+        if not source.strip() or position >= len(final_paragraphs):
+            continue
+        deepl_words = _word_set(deepl_paragraph)
+        best, best_score = None, 0.0
+        for candidate in range(position, min(len(final_paragraphs), position + ALIGNMENT_WINDOW)):
+            score = jaccard(deepl_words, _word_set(final_paragraphs[candidate]))
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < ALIGNMENT_THRESHOLD:
+            continue
+        position = best + 1
+
+        source_sentences = split_sentences(source)
+        final_sentences = split_sentences(final_paragraphs[best])
+        if len(source_sentences) == len(final_sentences):
+            pairs.extend(zip(source_sentences, final_sentences))
+    return pairs
+
+
+def remember_translation(cleaned_text: str, translated_text: str, final_text: str,
+                         target_lang: str = DEFAULT_TARGET) -> int:
+    """Adds the aligned sentence pairs of a finished article, returns how many were stored"""
+    if not memory_enabled():
+        return 0
+    memory = get_translation_memory(target_lang)
+    stored = 0
+    for source, target in align_sentences(cleaned_text, translated_text, final_text):
+        if len(source) >= MIN_SENTENCE_CHARS and numbers(source) == numbers(target):
+            memory.add(source, target)
+            stored += 1
+    return stored
+
+
+# ======================================================================
+# Optimizer Input
+# ======================================================================
+# Paragraphs assembled from memory are already edited text. The optimizer
+# only sees a placeholder line in their place, in the original and the
+# DeepL text alike so both stay line-aligned, and they are spliced back
+# into its output afterwards
+PLACEHOLDER = "[TM-{number}]"
+PLACEHOLDER_LINE = re.compile(r"^\s*\[TM-(\d+)\]\s*$")
+
+
+def mask_served_paragraphs(cleaned_text: str, translated_text: str,
+                           target_lang: str = DEFAULT_TARGET) -> tuple:
+    """Replaces the paragraphs whose translation came from memory by placeholders.
+
+    Returns (cleaned_text, translated_text, served); placeholder n stands
+    for ``served[n - 1]``, the remembered translation of that paragraph.
+    """
+    source_lines = cleaned_text.split('\n')
+    deepl_lines = translated_text.split('\n')
+    if not memory_enabled() or len(source_lines) != len(deepl_lines):
+        return cleaned_text, translated_text, []
+    served = []
+    for index, (source, deepl_paragraph) in enumerate(zip(source_lines, deepl_lines)):
+        if source.strip() and translate_from_memory(source, target_lang) == deepl_paragraph:
+            served.append(deepl_paragraph)
+            source_lines[index] = deepl_lines[index] = PLACEHOLDER.format(number=len(served))
+    return '\n'.join(source_lines), '\n'.join(deepl_lines), served
+
+
+def has_placeholders(text: str) -> bool:
+    return any(PLACEHOLDER_LINE.match(line) for line in text.split('\n'))
+
+
+def only_placeholders(text: str) -> bool:
+    """Returns True when every paragraph of a masked text was served from memory"""
+    return all(PLACEHOLDER_LINE.match(line) or not line.strip() for line in text.split('\n'))
+
+
+def restore_served_paragraphs(lines, served: list):
+    """Yields the lines of the optimizer output with the placeholders replaced.
+
+    A placeholder the model dropped is restored before the next one that
+    appears and the remaining ones at the end, so no paragraph gets lost;
+    repeated placeholders are removed.
+    """
+    restored = 0
+    for line in lines:
+        match = PLACEHOLDER_LINE.match(line)
+        number = int(match.group(1)) if match else 0
+        if not 0 < number <= len(served):
+            yield line
+            continue
+        while restored < number - 1:
+            yield served[restored]
+            yield ''
+            restored += 1
+        if number > restored:
+            yield served[number - 1]
+            restored = number
+    for paragraph in served[restored:]:
+        yield ''
+        yield paragraph
@@ -1,3 +1,35 @@
+import hashlib
+
+# ======================================================================
+# Target Languages
+# ======================================================================
+# DeepL target code -> the words the prompt templates below are filled with.
+# The instructions stay German (the language of the editorial team).
+TARGET_LANGUAGES = {
+    "DE": {
+        "language": "Deutsch",
+        "adjective": "deutsche",
+        "adjective_dative": "deutschen",
+        "noun_dative": "Deutschen",
+        "readers": "deutsche Leser",
+    },
+    "FR": {
+        "language": "Französisch",
+        "adjective": "französische",
+        "adjective_dative": "französischen",
+        "noun_dative": "Französischen",
+        "readers": "französischsprachige Leser",
+    },
+    "ES": {
+        "language": "Spanisch",
+        "adjective": "spanische",
+        "adjective_dative": "spanischen",
+        "noun_dative": "Spanischen",
+        "readers": "spanischsprachige Leser",
+    },
+}
+DEFAULT_TARGET = "DE"
+
 # ======================================================================
 # System Prompts
 # ======================================================================
@@ -11,7 +43,7 @@ CLEANING_SYSTEM_PROMPT = """Du bist ein Experte für die Bereinigung von Nachric
 6. Gib den Text ohne zusätzliche Anmerkungen oder Erklärungen zurück"""
 
 QUALITY_CHECK_SYSTEM_PROMPT = """## Aufgabe
-Führe eine systematische Analyse zwischen dem englischen Originaltext und der deutschen Übersetzung durch.
+Führe eine systematische Analyse zwischen dem englischen Originaltext und der {adjective_dative} Übersetzung durch.
 ## Prüfkategorien
 ### 1. FAKTENCHECK
 * Vergleiche alle Zahlen, Daten, Maßeinheiten
@@ -44,14 +76,20 @@ Führe eine systematische Analyse zwischen dem englischen Originaltext und der d
 * Achte besonders auf fachliche Korrektheit
 * Berücksichtige die Zielgruppe der Übersetzung"""
 
+QUALITY_CHECK_FINDINGS_PROMPT = """## Strukturierte Befunde
+Die Absätze sind nummeriert: [O1], [O2], ... im Original und [Ü1], [Ü2], ... in der Übersetzung.
+Beende den Bericht mit genau einem JSON-Block (```json ... ```) in diesem Format:
+{"findings": [{"paragraph": <Nummer des Übersetzungsabsatzes>, "source_paragraphs": [<Nummern der zugehörigen Originalabsätze>], "category": "Faktencheck" | "Vollständigkeit" | "Struktur & Kontext", "issue": "<konkretes Problem>", "suggestion": "<Korrekturvorschlag>"}]}
+Nimm nur Fehler auf, die eine Korrektur des Absatzes erfordern. Gibt es keine, gib {"findings": []} aus."""
+
 # ======================================================================
 # Developer Prompts
 # ======================================================================
 
-TRANSLATION_DEVELOPER_PROMPT = """Erstelle einen verbesserten, aber inhaltlich korrekten Artikel. Der Artikel ist für eine deutsche Nachrichtenseite. Es folgt der Original-Artikel von der Washington Post, der dann mit Deepl Pro automatisch übersetzt wurde. Diese Übersetzungen sind inhaltlich meistens zwar korrekt, aber sprachlich oft nicht gut (zu verschachtelte Sätze, Formulierungen die im Deutschen nicht verwendet werden oder missverständlich sind, Grammatik die eins-zu-eins aus dem Englische übernommen ist und im Deutschen nicht stimmt, teilweise werden Zitate nicht sauber übersetzt und zu stark verkürzt.) Gehe Satz- und Absatzweise vor und stelle sicher, dass wirklich alle Elemente des Originals in der finalen Übersetzung vorhanden sind. 
+TRANSLATION_DEVELOPER_PROMPT = """Erstelle einen verbesserten, aber inhaltlich korrekten Artikel. Der Artikel ist für eine {adjective} Nachrichtenseite. Es folgt der Original-Artikel von der Washington Post, der dann mit Deepl Pro automatisch übersetzt wurde. Diese Übersetzungen sind inhaltlich meistens zwar korrekt, aber sprachlich oft nicht gut (zu verschachtelte Sätze, Formulierungen die im {noun_dative} nicht verwendet werden oder missverständlich sind, Grammatik die eins-zu-eins aus dem Englische übernommen ist und im {noun_dative} nicht stimmt, teilweise werden Zitate nicht sauber übersetzt und zu stark verkürzt.) Gehe Satz- und Absatzweise vor und stelle sicher, dass wirklich alle Elemente des Originals in der finalen Übersetzung vorhanden sind. 
 
 Achte darauf, dass die Präzision der Übersetzung nicht zu Lasten der Lesbarkeit geht. Kürze und verständliche Sätze sind wichtig. Nur bei direkten Zitaten (üblicherweise durch Anführungszeichen erkenntlich) sollten im Ganzen übersetzt werden und nicht aufgeteilt werden.
-Die englischen Originale verwenden oft viele Kommas, Neben- und Schachtelsätze oder andere komplizierte Strukturen. Daher sollte die finale Version diese Strukturen aufbrechen und für deutsche Leser besser aufbereiten - ohne die Aussagen und Fakten zu verfälschen.
+Die englischen Originale verwenden oft viele Kommas, Neben- und Schachtelsätze oder andere komplizierte Strukturen. Daher sollte die finale Version diese Strukturen aufbrechen und für {readers} besser aufbereiten - ohne die Aussagen und Fakten zu verfälschen.
 
 Der erste Satz im Artikel darf kein Schachtelsatz (Hauptsatz mit meheren Nebensätzen). Dieser muss so umgeschrieben werden, dass ein einfacher und verständlicher Einstieg in den Artikel möglich ist.
 Die Fakten und Aussagen aus dem Original-Artikel müssen aber erhalten bleiben - es ist aber akzeptabel wenn das dann auf zwei oder sogar drei Sätze aufgeteilt wird.
@@ -70,6 +108,8 @@ Die Fakten und Aussagen aus dem Original-Artikel müssen aber erhalten bleiben -
 
 Wichtig: Ein Analyse-System wird am Ende den Original-Artikel sowie die finale von Dir erstelle Überabeitung überprüfen. Stelle sicher, dass das Analyse-System keine Fehler und Abweichungen findet!
 
+Schreibe die finale Version auf {language}.
+
 *Ausgabe-Format:*
 Überschrift (Headline)
 
@@ -79,19 +119,82 @@ Artikel-Text (Body) mit Zwischenüberschriften
 Nach jeder Zwischenüberschrift eine Zeile Abstand einfügen
 """
 
+REOPTIMIZATION_DEVELOPER_PROMPT = """Du überarbeitest einzelne Absätze einer {adjective_dative} Übersetzung eines englischen Nachrichtenartikels, in denen eine Qualitätsprüfung Fehler gefunden hat. Du erhältst die zugehörigen Absätze des englischen Originals, den aktuellen {adjective_dative} Absatz mit seinen Nachbarabsätzen als Kontext und die gefundenen Probleme.
+
+Korrigiere ausschließlich die genannten Probleme im aktuellen Absatz. Behalte Stil, Satzbau und Formulierungen bei, wo sie korrekt sind. Zitate müssen vollständig und präzise übersetzt sein.
+
+Gib nur den korrigierten Absatz zurück - ohne Nachbarabsätze, Nummerierung, Anmerkungen oder Erklärungen."""
+
+# ======================================================================
+# Chunk Notes
+# ======================================================================
+# Appended to the prompts when a long article is processed in several parts
+
+CLEANING_CHUNK_NOTE = """Hinweis: Dies ist Teil {part} von {total} eines längeren Textes, der in mehreren Teilen bereinigt wird. Bereinige nur diesen Teil und gib nur diesen Teil zurück. Ergänze keine Überschrift, wenn der Teil nicht mit dem Titel beginnt, und fasse nichts zusammen."""
+
+TRANSLATION_CHUNK_NOTE = """Hinweis: Der Artikel ist zu lang für eine einzige Bearbeitung und wird in {total} Teilen optimiert. Dies ist Teil {part}. Bearbeite nur diesen Teil und gib nur diesen Teil zurück."""
+
+TRANSLATION_CHUNK_CONTINUATION_NOTE = """Überschrift und Ortsmarke stehen bereits im ersten Teil. Beginne direkt mit dem Artikeltext dieses Teils."""
+
+# ======================================================================
+# Translation Memory
+# ======================================================================
+# Introduces sentence pairs from earlier, already edited articles
+
+TRANSLATION_MEMORY_NOTE = """# Übersetzungsspeicher:
+
+Die folgenden Sätze stammen aus bereits redaktionell bearbeiteten Artikeln. Wenn ein Satz des Originals inhaltlich übereinstimmt, übernimm die dort verwendeten Formulierungen und Fachbegriffe, damit wiederkehrende Passagen einheitlich übersetzt werden. Weiche ab, wo sich der Inhalt unterscheidet."""
+
+TRANSLATION_MEMORY_PLACEHOLDER_NOTE = """Zeilen der Form [TM-<Nummer>] stehen für Absätze, die bereits redaktionell übersetzt sind. Gib jede dieser Zeilen unverändert als eigene Zeile an derselben Stelle aus und bearbeite nur den übrigen Text."""
+
+# ======================================================================
+# Prompt Versions
+# ======================================================================
+# Bump when the message templates below change in a way that affects output
+TEMPLATE_REVISION = "1"
+
+def _prompt_version(prompt: str) -> str:
+    """Returns a short hash identifying a prompt revision"""
+    return hashlib.sha256(f"{TEMPLATE_REVISION}:{prompt}".encode("utf-8")).hexdigest()[:12]
+
+# Used as part of the stage cache keys, so editing a prompt invalidates its cached results
+# (the target language itself is part of the stage arguments, and thereby of the keys)
+_LANGUAGE_TABLE = repr(sorted(TARGET_LANGUAGES.items()))
+
+PROMPT_VERSIONS = {
+    "cleaning": _prompt_version(CLEANING_SYSTEM_PROMPT + CLEANING_CHUNK_NOTE),
+    "translation": _prompt_version(
+        TRANSLATION_DEVELOPER_PROMPT + TRANSLATION_CHUNK_NOTE + TRANSLATION_CHUNK_CONTINUATION_NOTE
+        + TRANSLATION_MEMORY_NOTE + TRANSLATION_MEMORY_PLACEHOLDER_NOTE + _LANGUAGE_TABLE
+    ),
+    "quality_check": _prompt_version(
+        QUALITY_CHECK_SYSTEM_PROMPT + QUALITY_CHECK_FINDINGS_PROMPT + _LANGUAGE_TABLE
+    ),
+    "reoptimization": _prompt_version(REOPTIMIZATION_DEVELOPER_PROMPT + _LANGUAGE_TABLE),
+}
+
+def get_language(target_lang: str) -> dict:
+    """Returns the template words of a target language"""
+    if target_lang not in TARGET_LANGUAGES:
+        raise ValueError(f"Nicht unterstützte Zielsprache: {target_lang}")
+    return TARGET_LANGUAGES[target_lang]
+
 # ======================================================================
 # Message Templates
 # ======================================================================
 
-def get_cleaning_messages(text: str) -> list:
+def get_cleaning_messages(text: str, part: int = 1, total: int = 1) -> list:
     """Returns the messages for the cleaning API call"""
+    system_prompt = CLEANING_SYSTEM_PROMPT
+    if total > 1:
+        system_prompt += "\n\n" + CLEANING_CHUNK_NOTE.format(part=part, total=total)
     return [
         {
             "role": "system",
             "content": [
                 {
                     "type": "text",
-                    "text": CLEANING_SYSTEM_PROMPT
+                    "text": system_prompt
                 }
             ]
         },
@@ -101,15 +204,32 @@ def get_cleaning_messages(text: str) -> list:
         }
     ]
 
-def get_translation_messages(cleaned_text: str, translated_text: str) -> list:
-    """Returns the messages for the translation optimization API call"""
+def get_translation_messages(cleaned_text: str, translated_text: str,
+                             part: int = 1, total: int = 1, hints: list = (),
+                             target_lang: str = DEFAULT_TARGET, placeholders: bool = False) -> list:
+    """Returns the messages for the translation optimization API call.
+
+    ``hints`` are (English, target language) sentence pairs from the translation memory.
+    With ``placeholders`` the texts contain [TM-n] lines for paragraphs served from memory.
+    """
+    developer_prompt = TRANSLATION_DEVELOPER_PROMPT.format(**get_language(target_lang))
+    if total > 1:
+        developer_prompt += "\n\n" + TRANSLATION_CHUNK_NOTE.format(part=part, total=total)
+        if part > 1:
+            developer_prompt += " " + TRANSLATION_CHUNK_CONTINUATION_NOTE
+    if placeholders:
+        developer_prompt += "\n\n" + TRANSLATION_MEMORY_PLACEHOLDER_NOTE
+    user_text = f"# Original Englisch:\n\n{cleaned_text}\n\n# DeepL Übersetzung:\n\n{translated_text}"
+    if hints:
+        pairs = '\n'.join(f"- {source}\n  → {target}" for source, target in hints)
+        user_text += f"\n\n{TRANSLATION_MEMORY_NOTE}\n\n{pairs}"
     return [
         {
             "role": "developer",
             "content": [
                 {
                     "type": "text",
-                    "text": TRANSLATION_DEVELOPER_PROMPT
+                    "text": developer_prompt
                 }
             ]
         },
@@ -118,21 +238,69 @@ def get_translation_messages(cleaned_text: str, translated_text: str) -> list:
             "content": [
                 {
                     "type": "text",
-                    "text": f"# Original Englisch:\n\n{cleaned_text}\n\n# DeepL Übersetzung:\n\n{translated_text}"
+                    "text": user_text
                 }
             ]
         }
     ]
 
-def get_quality_check_messages(cleaned_text: str, final_text: str) -> list:
+def number_paragraphs(text: str, prefix: str) -> str:
+    """Prefixes every non-empty line with [<prefix><n>] so findings can refer to it"""
+    lines = []
+    number = 0
+    for line in text.split('\n'):
+        if line.strip():
+            number += 1
+            line = f"[{prefix}{number}] {line}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+def get_quality_check_messages(cleaned_text: str, final_text: str,
+                               target_lang: str = DEFAULT_TARGET) -> list:
     """Returns the messages for the quality check API call"""
+    language = get_language(target_lang)
+    system_prompt = QUALITY_CHECK_SYSTEM_PROMPT.format(**language)
+    heading = language["adjective"].capitalize()
+    original = number_paragraphs(cleaned_text, "O")
+    translation = number_paragraphs(final_text, "Ü")
     return [
         {
             "role": "system",
-            "content": QUALITY_CHECK_SYSTEM_PROMPT
+            "content": f"{system_prompt}\n{QUALITY_CHECK_FINDINGS_PROMPT}"
+        },
+        {
+            "role": "user",
+            "content": f"# Englischer Originaltext:\n\n{original}\n\n# {heading} Übersetzung:\n\n{translation}"
+        }
+    ]
+
+def get_reoptimization_messages(source_paragraphs: str, context_before: str, paragraph: str,
+                                context_after: str, issues: str,
+                                target_lang: str = DEFAULT_TARGET) -> list:
+    """Returns the messages for re-optimizing one flagged paragraph"""
+    return [
+        {
+            "role": "developer",
+            "content": [
+                {
+                    "type": "text",
+                    "text": REOPTIMIZATION_DEVELOPER_PROMPT.format(**get_language(target_lang))
+                }
+            ]
         },
         {
             "role": "user",
-            "content": f"# Englischer Originaltext:\n\n{cleaned_text}\n\n# Deutsche Übersetzung:\n\n{final_text}"
+            "content": [
+                {
+                    "type": "text",
+                    "text": (
+                        f"# Original Englisch:\n\n{source_paragraphs}\n\n"
+                        f"# Kontext davor:\n\n{context_before}\n\n"
+                        f"# Aktueller Absatz:\n\n{paragraph}\n\n"
+                        f"# Kontext danach:\n\n{context_after}\n\n"
+                        f"# Gefundene Probleme:\n\n{issues}"
+                    )
+                }
+            ]
         }
     ]
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# Keep the caches and metrics of the test run away from the user's
+# (set before the pipeline reads its configuration)
+_work_dir = tempfile.mkdtemp(prefix="pipeline-tests-")
+os.environ["STAGE_CACHE_PATH"] = os.path.join(_work_dir, "stages.sqlite3")
+os.environ["TRANSLATION_MEMORY_PATH"] = os.path.join(_work_dir, "memory.sqlite3")
+os.environ["BUDGET_PATH"] = os.path.join(_work_dir, "budget.sqlite3")
+os.environ["EXTRACTION_PATH"] = os.path.join(_work_dir, "extractions.sqlite3")
+os.environ["METRICS_DIR"] = ""
+os.environ["JOBS_PATH"] = os.path.join(_work_dir, "jobs.sqlite3")
+os.environ["BLOB_DIR"] = os.path.join(_work_dir, "blobs")
+os.environ["ROUTING_MODE"] = "adaptive"
@@ -0,0 +1,26 @@
+import os
+
+from pipeline.artifacts import edition_key, empty_result, write_artifacts
+
+
+def result(original: str, final: str) -> dict:
+    return {**empty_result(), 'original': original, 'cleaned': original, 'final': final}
+
+
+def test_articles_with_the_same_title_do_not_overwrite_each_other(tmp_path):
+    first = write_artifacts(result("Wahl in Berlin\nErster Text.", "Erste Fassung"), tmp_path)
+    second = write_artifacts(result("Wahl in Berlin\nZweiter Text.", "Zweite Fassung"), tmp_path)
+    assert len(set(first + second)) == 6
+    assert os.path.basename(first[0]).startswith("Wahl_in_Berlin_")
+
+
+def test_a_rerun_replaces_its_own_files(tmp_path):
+    article = result("Wahl in Berlin\nErster Text.", "Erste Fassung")
+    assert write_artifacts(article, tmp_path) == write_artifacts(article, tmp_path)
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_further_editions_get_the_language_code(tmp_path):
+    article = {**result("Titel\nText.", "Fassung"), edition_key('final', 'FR', 'DE'): "Version"}
+    paths = write_artifacts(article, tmp_path, ['DE', 'FR'])
+    assert any(path.endswith("_final_fr.txt") for path in paths)
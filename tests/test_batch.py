@@ -0,0 +1,97 @@
+import threading
+import time
+
+from pipeline.batch import BatchRunner
+from pipeline.clients import request_slot
+from pipeline.deadline import DeadlineExceeded
+
+
+class Provider:
+    """Counts the requests a fake stage has in flight at the same time"""
+
+    def __init__(self, name: str, seconds: float = 0.05):
+        self.name = name
+        self.seconds = seconds
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def request(self):
+        with request_slot(self.name):
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(self.seconds)
+            with self._lock:
+                self.active -= 1
+
+
+def make_stages(jina: Provider, openai: Provider, deepl: Provider) -> dict:
+    def extract(url):
+        jina.request()
+        return f"Text von {url}"
+
+    def clean(text):
+        openai.request()
+        return text
+
+    def translate(text, target_lang):
+        deepl.request()
+        return f"[{target_lang}] {text}"
+
+    def optimize(cleaned_text, translated_text, target_lang):
+        openai.request()
+        return translated_text + " (optimiert)"
+
+    return {"extract": extract, "clean": clean, "translate": translate, "optimize": optimize}
+
+
+def run(runner: BatchRunner, items: list) -> dict:
+    """Returns the final event of every item by index"""
+    return {index: (event, payload) for event, index, payload in runner.run(items) if event != "stage"}
+
+
+def test_requests_stay_within_the_provider_limits():
+    jina, openai, deepl = Provider("jina"), Provider("openai"), Provider("deepl")
+    runner = BatchRunner(make_stages(jina, openai, deepl), limits={"jina": 4, "openai": 2, "deepl": 1})
+    items = [{'name': f"a{index}", 'url': f"https://example.com/{index}"} for index in range(6)]
+    results = run(runner, items)
+    assert all(event == "done" for event, _ in results.values())
+    assert results[3][1]['final'] == "[DE] Text von https://example.com/3 (optimiert)"
+    assert deepl.peak == 1 and openai.peak <= 2
+    # Providers with free slots keep working while DeepL is the bottleneck
+    assert jina.peak > 1
+
+
+def test_stage_progress_and_errors_are_reported_per_item():
+    stages = make_stages(Provider("jina", 0), Provider("openai", 0), Provider("deepl", 0))
+
+    def extract(url):
+        if url.endswith("kaputt"):
+            raise ValueError("404")
+        return "Text"
+
+    stages["extract"] = extract
+    items = [{'name': "gut", 'url': "https://example.com/gut"},
+             {'name': "kaputt", 'url': "https://example.com/kaputt"},
+             {'name': "datei.txt", 'text': "Hochgeladen"}]
+    events = list(BatchRunner(stages).run(items))
+    assert [payload for event, index, payload in events if event == "stage" and index == 0] == [
+        "extract", "clean", "translate", "optimize"
+    ]
+    finals = {index: (event, payload) for event, index, payload in events if event != "stage"}
+    assert finals[1] == ("error", "extract: 404")
+    assert finals[2][0] == "done" and finals[2][1]['cleaned'] == "Hochgeladen"
+
+
+def test_optimization_past_the_deadline_falls_back_to_deepl():
+    stages = make_stages(Provider("jina", 0), Provider("openai", 0), Provider("deepl", 0))
+
+    def optimize(cleaned_text, translated_text, target_lang):
+        raise DeadlineExceeded("Zeitbudget für optimize erschöpft")
+
+    stages["optimize"] = optimize
+    (event, result), = run(BatchRunner(stages, targets=["DE", "FR"]), [{'name': "a", 'text': "Text"}]).values()
+    assert event == "done"
+    assert result['final'] == "[DE] Text" and result['final_fr'] == "[FR] Text"
+    assert result['fallback'].count("DeepL-Übersetzung ohne Optimierung übernommen") == 2
@@ -0,0 +1,34 @@
+import os
+import time
+
+import pytest
+
+from pipeline.blobs import BlobExpired, BlobStore, load_result, store_result
+
+
+def test_identical_texts_share_one_reference(tmp_path):
+    store = BlobStore(str(tmp_path))
+    assert store.put("Artikel") == store.put("Artikel")
+    assert store.get(store.put("Artikel")) == "Artikel"
+
+
+def test_empty_text_is_the_empty_reference(tmp_path):
+    store = BlobStore(str(tmp_path))
+    assert store.put("") == ""
+    assert store.get("") == ""
+
+
+def test_pruned_blob_raises(tmp_path):
+    writer = BlobStore(str(tmp_path), ttl_days=1)
+    ref = writer.put("Alter Artikel")
+    old = time.time() - 2 * 24 * 3600
+    os.utime(writer._path(ref), (old, old))
+    assert writer.prune() == 1
+    with pytest.raises(BlobExpired):
+        # A fresh store, as in another process, has nothing in memory
+        BlobStore(str(tmp_path)).get(ref)
+
+
+def test_results_round_trip():
+    result = {'original': "Text", 'cleaned': "Text", 'final': "", 'fallback': None}
+    assert load_result(store_result(result)) == {**result, 'fallback': ""}
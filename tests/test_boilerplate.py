@@ -0,0 +1,67 @@
+import pytest
+
+from pipeline.boilerplate import SKIP_LLM_CONFIDENCE, link_density, strip_boilerplate
+
+JINA_TEXT = """Title: Rain expected across the region
+
+URL Source: https://apnews.com/article/rain-123
+
+Markdown Content:
+Skip to main content
+[Home](https://apnews.com/) [World](https://apnews.com/world)
+
+# Rain expected across the region
+
+Forecasters said on Monday that heavy rain would reach the coast by the evening.
+
+Residents were asked to stay at home and to avoid driving where possible.
+
+Advertisement
+
+Officials said shelters would open in three towns before the weekend.
+
+Related Stories
+
+[Storm closes schools](https://apnews.com/article/storm-456)
+
+Copyright 2026 The Associated Press. All rights reserved."""
+
+
+def test_off_returns_the_text_unchanged():
+    assert strip_boilerplate(JINA_TEXT, "off") == (JINA_TEXT, 0.0)
+
+
+def test_unknown_strength_is_rejected():
+    with pytest.raises(ValueError):
+        strip_boilerplate(JINA_TEXT, "medium")
+
+
+def test_light_drops_only_clear_boilerplate():
+    text, confidence = strip_boilerplate(JINA_TEXT, "light")
+    assert "Skip to main content" not in text
+    assert "[Home]" not in text
+    assert "Advertisement" not in text
+    assert "Copyright 2026" not in text
+    # Headings and footer sections are left to GPT cleaning
+    assert "# Rain expected across the region" in text
+    assert "Related Stories" in text
+    assert confidence == 0.0
+
+
+def test_strong_cuts_the_footer_and_removes_markdown():
+    text, confidence = strip_boilerplate(JINA_TEXT, "strong")
+    assert text.split('\n') == [
+        "Rain expected across the region",
+        "",
+        "Forecasters said on Monday that heavy rain would reach the coast by the evening.",
+        "",
+        "Residents were asked to stay at home and to avoid driving where possible.",
+        "",
+        "Officials said shelters would open in three towns before the weekend.",
+    ]
+    assert confidence >= SKIP_LLM_CONFIDENCE
+
+
+def test_link_density():
+    assert link_density("[Home](https://example.com/)") == 1.0
+    assert link_density("Plain prose without links.") == 0.0
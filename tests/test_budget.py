@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from pipeline.budget import (
+    COMPLETION_MARGIN,
+    LEARNING_RATE,
+    MODEL_LIMITS,
+    PROMPT_PROFILES,
+    TRUNCATION_PENALTY,
+    BudgetStore,
+    plan_chunk_tokens,
+    plan_request
+)
+from pipeline.tokens import estimate_tokens
+
+
+def messages(text: str) -> list:
+    return [{"role": "system", "content": "Bereinige den Text."}, {"role": "user", "content": text}]
+
+
+def test_short_text_gets_the_models_minimum():
+    budget = plan_request("cleaning", "gpt-4o-mini", messages("Kurz."), "Kurz.")
+    assert budget.max_completion_tokens == MODEL_LIMITS["gpt-4o-mini"]["min_completion"]
+    assert budget.reasoning_tokens == 0
+
+
+def test_reasoning_models_reserve_room_for_reasoning():
+    source = "Ein Satz mit einigen Wörtern. " * 2000
+    budget = plan_request("translation", "o3-mini", messages(source), source)
+    profile = PROMPT_PROFILES["translation"]
+    assert budget.output_tokens >= int(estimate_tokens(source) * profile["output_ratio"])
+    assert budget.reasoning_tokens == pytest.approx(budget.output_tokens * profile["reasoning_ratio"], abs=1)
+    assert budget.max_completion_tokens >= budget.completion_tokens * COMPLETION_MARGIN - 1
+
+
+def test_completion_limit_is_capped_by_the_model_output():
+    source = "Ein Satz mit einigen Wörtern. " * 5000
+    budget = plan_request("cleaning", "gpt-4o-mini", messages(source), source)
+    assert budget.max_completion_tokens == MODEL_LIMITS["gpt-4o-mini"]["output"]
+
+
+def test_prompt_too_long_for_the_context_window_is_rejected():
+    source = "Wort " * 200000
+    with pytest.raises(ValueError):
+        plan_request("cleaning", "gpt-4o-mini", messages(source), source)
+
+
+def test_chunks_are_sized_below_the_output_limit():
+    limit = MODEL_LIMITS["gpt-4o-mini"]["output"]
+    expected = int(limit / (PROMPT_PROFILES["cleaning"]["output_ratio"] * COMPLETION_MARGIN))
+    assert plan_chunk_tokens("cleaning", "gpt-4o-mini", 100000) == expected
+    assert plan_chunk_tokens("cleaning", "gpt-4o-mini", 1000) == 1000
+
+
+def test_observations_move_the_calibration(tmp_path):
+    store = BudgetStore(os.path.join(tmp_path, "budget.sqlite3"))
+    store.observe("gpt-4o-mini", "cleaning", 1.0, 2.0, 0.0)
+    assert store.get("gpt-4o-mini", "cleaning")["output_ratio"] == 2.0
+    store.observe("gpt-4o-mini", "cleaning", 1.0, 1.0, 0.0)
+    assert store.get("gpt-4o-mini", "cleaning")["output_ratio"] == pytest.approx(2.0 - LEARNING_RATE)
+    store.observe("gpt-4o-mini", "cleaning", 1.0, 1.0, 0.0, truncated=True)
+    calibration = store.get("gpt-4o-mini", "cleaning")
+    assert calibration["output_ratio"] == pytest.approx((2.0 - LEARNING_RATE) * TRUNCATION_PENALTY)
+    assert calibration["samples"] == 3
@@ -0,0 +1,66 @@
+from pipeline.chunking import (
+    chunk_separators,
+    iter_joined,
+    iter_stitched,
+    split_aligned_chunks,
+    split_into_chunks,
+    stitch_chunks,
+)
+
+
+def test_overlap_is_removed_from_the_later_chunk():
+    outputs = [
+        "Erster Absatz.\n\nZweiter Absatz.\n\nDritter Absatz.",
+        "Zweiter Absatz.\n\nDritter  absatz.\n\nVierter Absatz.",
+    ]
+    assert stitch_chunks(outputs) == (
+        "Erster Absatz.\n\nZweiter Absatz.\n\nDritter Absatz.\n\nVierter Absatz."
+    )
+
+
+def test_chunks_without_overlap_are_joined_by_a_blank_line():
+    assert stitch_chunks(["Eins.", "Zwei."]) == "Eins.\n\nZwei."
+
+
+def test_chunk_repeating_only_the_overlap_is_dropped():
+    assert stitch_chunks(["Eins.\n\nZwei.", "Zwei.\n", "Drei."]) == "Eins.\n\nZwei.\n\nDrei."
+
+
+def test_pieces_are_yielded_as_outputs_arrive():
+    received = []
+
+    def outputs():
+        for output in ("Eins.\n\nZwei.", "Zwei.\n\nDrei."):
+            received.append(output)
+            yield output
+
+    pieces = iter_stitched(outputs())
+    assert next(pieces) == "Eins.\n\nZwei."
+    assert len(received) == 1
+    assert next(pieces) == "\n\nDrei."
+
+
+def test_separators_follow_the_split_points():
+    assert chunk_separators(["Eins.\n", "Zwei.", "Drei."]) == ["\n\n", "\n"]
+
+
+def test_stitching_keeps_single_line_breaks_of_the_source():
+    text = "\n".join(f"Zeile {n} mit ein paar Wörtern." for n in range(40))
+    chunks = split_into_chunks(text, max_tokens=60)
+    assert len(chunks) > 1
+    assert stitch_chunks(chunks, chunk_separators(chunks)) == text
+
+
+def test_stitching_keeps_paragraph_breaks_of_the_source():
+    text = "\n\n".join(f"Absatz {n} mit ein paar Wörtern." for n in range(40))
+    chunks = split_into_chunks(text, max_tokens=60, overlap_tokens=10)
+    assert len(chunks) > 1
+    assert stitch_chunks(chunks, chunk_separators(chunks)) == text
+
+
+def test_aligned_chunks_are_joined_by_the_source_line_breaks():
+    source = "\n".join(f"Zeile {n} mit ein paar Wörtern." for n in range(40))
+    pairs = split_aligned_chunks(source, source.upper(), max_tokens=60)
+    assert len(pairs) > 1
+    separators = chunk_separators([chunk for chunk, _ in pairs])
+    assert ''.join(iter_joined([target for _, target in pairs], separators)) == source.upper()
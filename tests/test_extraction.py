@@ -0,0 +1,29 @@
+from pipeline.extraction import canonicalize_url
+
+
+def test_tracking_parameters_and_fragments_are_removed():
+    assert canonicalize_url(
+        "HTTPS://Example.com:443/artikel?utm_source=x&id=7&fbclid=abc#kommentare"
+    ) == "https://example.com/artikel?id=7"
+
+
+def test_query_keeps_its_original_encoding():
+    assert canonicalize_url("https://example.com/suche?q=a%20b&a=%C3%A4") == (
+        "https://example.com/suche?a=%C3%A4&q=a%20b"
+    )
+
+
+def test_amp_variants_share_the_canonical_url():
+    canonical = "https://example.com/politik/artikel"
+    assert canonicalize_url("https://example.com/politik/artikel/amp") == canonical
+    assert canonicalize_url("https://example.com/politik/artikel?outputType=amp") == canonical
+    assert canonicalize_url("https://example-com.cdn.ampproject.org/c/s/example.com/politik/artikel") == canonical
+
+
+def test_amp_host_prefix_is_only_removed_for_configured_hosts():
+    assert canonicalize_url("https://amp.theguardian.com/world/artikel") == "https://theguardian.com/world/artikel"
+    assert canonicalize_url("https://amp.example.com/artikel") == "https://amp.example.com/artikel"
+
+
+def test_unparsable_urls_are_returned_stripped():
+    assert canonicalize_url("  kein-link  ") == "kein-link"
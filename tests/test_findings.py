@@ -0,0 +1,56 @@
+from pipeline.findings import build_reoptimization_tasks, parse_findings, report_markdown, splice_paragraphs
+
+CLEANED = "Title\n\nFirst paragraph.\n\nSecond paragraph.\n\nThird paragraph."
+FINAL = "Titel\n\nErster Absatz.\n\nZweiter Absatz.\n\nDritter Absatz."
+
+REPORT = """## Abweichungsanalyse
+
+Absatz 3 lässt eine Angabe weg.
+
+```json
+{"findings": [
+  {"paragraph": 3, "source_paragraphs": [3], "category": "Auslassung", "issue": "Angabe fehlt", "suggestion": "ergänzen"},
+  {"paragraph": "x", "issue": "ungültig"},
+  {"paragraph": 9, "issue": "gibt es nicht"}
+]}
+```"""
+
+
+def test_findings_are_parsed_and_invalid_entries_skipped():
+    findings = parse_findings(REPORT)
+    assert [finding["paragraph"] for finding in findings] == [3, 9]
+    assert findings[0]["source_paragraphs"] == [3]
+    assert findings[0]["category"] == "Auslassung"
+
+
+def test_reports_without_json_have_no_findings():
+    assert parse_findings("## Abweichungsanalyse\n\nKeine Abweichungen.") == []
+    assert parse_findings("```json\n{kaputt}\n```") == []
+
+
+def test_report_markdown_hides_the_json_block():
+    assert report_markdown(REPORT) == "## Abweichungsanalyse\n\nAbsatz 3 lässt eine Angabe weg."
+
+
+def test_tasks_carry_source_context_and_issues():
+    (task,) = build_reoptimization_tasks(CLEANED, FINAL, parse_findings(REPORT))
+    assert task["paragraph"] == 3
+    assert task["line"] == 4
+    assert task["paragraph_text"] == "Zweiter Absatz."
+    assert task["source_paragraphs"] == "Second paragraph."
+    assert task["context_before"] == "Erster Absatz."
+    assert task["context_after"] == "Dritter Absatz."
+    assert task["issues"] == "- Auslassung: Angabe fehlt (Vorschlag: ergänzen)"
+
+
+def test_finding_without_source_uses_the_paragraph_at_the_same_position():
+    findings = [{"paragraph": 2, "source_paragraphs": [], "category": "", "issue": "holprig", "suggestion": ""}]
+    (task,) = build_reoptimization_tasks(CLEANED, FINAL, findings)
+    assert task["source_paragraphs"] == "First paragraph."
+    assert task["issues"] == "- holprig"
+
+
+def test_splice_replaces_only_the_given_lines():
+    assert splice_paragraphs(FINAL, {4: "Neuer Absatz.\n"}) == (
+        "Titel\n\nErster Absatz.\n\nNeuer Absatz.\n\nDritter Absatz."
+    )
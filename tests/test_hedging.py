@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from pipeline.clients import HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES, LatencyTracker, RateLimiter, hedged_call
+from pipeline.deadline import DeadlineExceeded, start_deadline
+
+
+def make_tracker(latency: float = 0.1) -> LatencyTracker:
+    """A tracker that has seen enough calls to hedge after HEDGE_MIN_DELAY"""
+    tracker = LatencyTracker()
+    for _ in range(HEDGE_MIN_SAMPLES):
+        tracker.add(latency)
+    return tracker
+
+
+class SlowFirstCall:
+    """Sleeps ``first`` seconds on the first call and ``then`` on later ones"""
+
+    def __init__(self, first: float, then: float = 0.0):
+        self.first = first
+        self.then = then
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.first if call == 1 else self.then)
+        return call
+
+
+def test_slow_call_is_hedged_after_the_delay():
+    func = SlowFirstCall(first=2.0)
+    started = time.monotonic()
+    result = hedged_call(RateLimiter(0, 0), 0, make_tracker(), True, None, func)
+    assert result == 2
+    assert HEDGE_MIN_DELAY <= time.monotonic() - started < 1.5
+
+
+def test_deadline_before_hedge_delay_sends_no_duplicate():
+    func = SlowFirstCall(first=1.0)
+    started = time.monotonic()
+    with start_deadline(0.2), pytest.raises(DeadlineExceeded):
+        hedged_call(RateLimiter(0, 0), 0, make_tracker(), True, None, func)
+    assert time.monotonic() - started < HEDGE_MIN_DELAY
+    time.sleep(HEDGE_MIN_DELAY)
+    assert func.calls == 1
+
+
+def test_no_duplicate_without_a_free_slot():
+    slot = threading.Semaphore(1)
+    func = SlowFirstCall(first=0.8)
+    assert hedged_call(RateLimiter(0, 0), 0, make_tracker(), True, slot, func) == 1
+    assert func.calls == 1
+    # The slot is given back once the request has returned
+    assert slot.acquire(blocking=False)
+
+
+def test_duplicate_holds_a_slot_of_its_own():
+    slot = threading.Semaphore(2)
+    func = SlowFirstCall(first=1.0, then=0.2)
+    assert hedged_call(RateLimiter(0, 0), 0, make_tracker(), True, slot, func) == 2
+    time.sleep(1.0)
+    assert slot.acquire(blocking=False) and slot.acquire(blocking=False)
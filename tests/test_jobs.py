@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from pipeline.blobs import load_result
+from pipeline.jobs import DEFAULT_OPTIONS, JobStore, _run_batch_job, get_job, get_job_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+
+
+def test_jobs_are_listed_for_their_session_only(store):
+    mine = store.create("url", "https://example.com/a", {}, session="mine")
+    store.create("url", "https://example.com/b", {}, session="theirs")
+    store.create("batch", "Batch mit 2 Artikeln", {}, session="mine")
+    assert [job['id'] for job in store.recent("mine", kinds=("url", "file"))] == [mine]
+    assert len(store.recent("mine")) == 2
+    assert store.get(mine, session="theirs") is None
+    assert store.get(mine, session="mine")['name'] == "https://example.com/a"
+
+
+FAKE_STAGES = {
+    "extract": lambda url: f"Text von {url}",
+    "clean": lambda text: text.upper(),
+    "translate": lambda text, target_lang: f"[{target_lang}] {text}",
+    "optimize": lambda cleaned, translated, target_lang: translated + " (optimiert)",
+}
+
+
+def test_batch_job_keeps_every_item_in_the_job_record():
+    job_id = get_job_store().create("batch", "Batch mit 3 Artikeln", DEFAULT_OPTIONS, session="mine")
+    items = [
+        {'name': "https://example.com/a", 'url': "https://example.com/a"},
+        {'name': "notiz.txt", 'data': "Erster Absatz".encode('utf-8')},
+        {'name': "kaputt.docx", 'data': b"kein zip"},
+    ]
+    _run_batch_job(job_id, {}, DEFAULT_OPTIONS, items, stages=FAKE_STAGES)
+
+    job = get_job(job_id, session="mine")
+    assert job['status'] == "done"
+    url_item, text_item, broken_item = job['result']['items']
+    assert url_item['status'] == text_item['status'] == "fertig"
+    assert load_result(url_item['processed_text'])['final'] == "[DE] TEXT VON HTTPS://EXAMPLE.COM/A (optimiert)"
+    assert load_result(text_item['processed_text'])['final'] == "[DE] Erster Absatz (optimiert)"
+    assert broken_item['status'] == "fehler" and broken_item['error'].startswith("read:")
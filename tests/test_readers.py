@@ -0,0 +1,54 @@
+import io
+import zipfile
+
+from pipeline.readers import read_docx_file, read_rtf_file, read_text_file
+
+W_NAMESPACE = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def paragraphs(*texts: str) -> str:
+    return ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in texts)
+
+
+def make_docx(body: list, header: list = (), footnotes: list = ()) -> io.BytesIO:
+    """Builds a minimal DOCX archive with the parts the reader looks at"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document {W_NAMESPACE}><w:body>{paragraphs(*body)}</w:body></w:document>')
+        archive.writestr('word/header1.xml', f'<w:hdr {W_NAMESPACE}>{paragraphs(*header)}</w:hdr>')
+        notes = ''.join(f'<w:footnote w:id="{index}">{paragraphs(text)}</w:footnote>' for index, text in enumerate(footnotes, 1))
+        archive.writestr('word/footnotes.xml', f'<w:footnotes {W_NAMESPACE}>{notes}</w:footnotes>')
+        archive.writestr('word/_rels/document.xml.rels', (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{RELATIONSHIPS}/header" Target="header1.xml"/>'
+            f'<Relationship Id="rId2" Type="{RELATIONSHIPS}/footnotes" Target="footnotes.xml"/>'
+            '</Relationships>'
+        ))
+    buffer.seek(0)
+    return buffer
+
+
+def test_text_file_keeps_lines_and_drops_the_bom():
+    assert read_text_file(io.BytesIO("\ufeffEins\r\nZwei\n".encode('utf-8'))) == "Eins\nZwei\n"
+
+
+def test_docx_starts_with_the_body_and_skips_headers():
+    docx = make_docx(["Titel", "Erster Absatz"], header=["Kopfzeile"], footnotes=["Fußnote"])
+    assert read_docx_file(docx) == "Titel\nErster Absatz\nFußnote"
+
+
+def test_rtf_paragraph_breaks():
+    rtf = rb"{\rtf1\ansi{\fonttbl\f0 Helvetica;}\f0 Erster\par Zweiter\line Satz\par}"
+    assert read_rtf_file(io.BytesIO(rtf)) == "Erster\nZweiter Satz"
+
+
+def test_rtf_backslash_line_break_ends_a_paragraph():
+    for newline in (b"\n", b"\r\n", b"\r"):
+        rtf = b"{\\rtf1\\ansi First paragraph here.\\" + newline + b"Second paragraph.\\" + newline + b"Third.}"
+        assert read_rtf_file(io.BytesIO(rtf)) == "First paragraph here.\nSecond paragraph.\nThird."
+
+
+def test_rtf_escapes_and_code_pages():
+    rtf = rb"{\rtf1\ansi\ansicpg1252 Gr\'fc\'dfe \u8364?uro{\*\generator Word;}}"
+    assert read_rtf_file(io.BytesIO(rtf)) == "Grüße €uro"
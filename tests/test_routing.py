@@ -0,0 +1,41 @@
+from pipeline.routing import DEFAULT_THRESHOLDS, choose_route, decide_route, route_signals
+
+SIMPLE = "The council met on Monday. It approved the new budget. The vote was quick."
+
+
+def signals(**overrides) -> dict:
+    base = {"words": 100, "sentence_words": 12.0, "quote_share": 0.0, "numbers": 2, "deepl_ratio": 1.1}
+    return {**base, **overrides}
+
+
+def test_signals_of_a_simple_text():
+    result = route_signals(SIMPLE, "Der Rat tagte am Montag. Er billigte den Haushalt. Die Abstimmung ging schnell.")
+    assert result["words"] == 14
+    assert result["sentence_words"] == round(14 / 3, 2)
+    assert result["quote_share"] == 0.0
+    assert result["numbers"] == 0
+
+
+def test_easy_article_takes_the_light_route():
+    assert choose_route(signals())[0] == "light"
+
+
+def test_each_exceeded_bound_moves_one_route_up():
+    light = DEFAULT_THRESHOLDS["light"]
+    medium = DEFAULT_THRESHOLDS["medium"]
+    route, reason = choose_route(signals(words=light["words"] + 1))
+    assert route == "medium" and reason.startswith("words")
+    assert choose_route(signals(words=medium["words"] + 1))[0] == "high"
+    assert choose_route(signals(quote_share=medium["quote_share"] + 0.1))[0] == "high"
+
+
+def test_suspicious_deepl_length_takes_the_strongest_route():
+    assert choose_route(signals(deepl_ratio=0.5))[0] == "high"
+    assert choose_route(signals(deepl_ratio=2.0))[0] == "high"
+
+
+def test_decision_carries_model_and_signals():
+    decision = decide_route(SIMPLE, "Der Rat tagte am Montag. Er billigte den Haushalt. Die Abstimmung ging schnell.")
+    assert decision["route"] == "light"
+    assert decision["model"] == "gpt-4o-mini"
+    assert decision["signals"]["words"] == 14
@@ -0,0 +1,60 @@
+import uuid
+
+from pipeline.segments import (
+    MAX_SEGMENTS_PER_REQUEST,
+    iter_segments,
+    make_batches,
+    split_segments,
+    translate_segments,
+    translate_stream
+)
+
+
+class FakeDeepL:
+    """Records the batches it is asked to translate"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, batch: list) -> list:
+        self.batches.append(list(batch))
+        return [f"[DE] {segment}" for segment in batch]
+
+
+def fresh_model() -> str:
+    """A model name no other test has cached segments for"""
+    return f"test-{uuid.uuid4().hex}"
+
+
+def test_segments_round_trip_the_text():
+    text = "Titel\n\nAbsatz eins.\n\n\nAbsatz zwei.\n"
+    assert '\n'.join(split_segments(text)) == text
+    assert list(iter_segments(["Tit", "el\n\nAbsatz ", "eins.\n\n\nAbsatz zwei.\n"])) == split_segments(text)
+
+
+def test_batches_respect_the_request_limits():
+    batches = make_batches([f"Satz {index}" for index in range(MAX_SEGMENTS_PER_REQUEST + 1)])
+    assert [len(batch) for batch in batches] == [MAX_SEGMENTS_PER_REQUEST, 1]
+    assert make_batches(["a" * 20000, "b" * 20000]) == [["a" * 20000], ["b" * 20000]]
+
+
+def test_only_changed_paragraphs_are_sent_again():
+    model = fresh_model()
+    deepl = FakeDeepL()
+    text = "Eins.\n\nZwei.\n\nEins."
+    assert translate_segments(text, deepl, model=model) == "[DE] Eins.\n\n[DE] Zwei.\n\n[DE] Eins."
+    assert deepl.batches == [["Eins.", "Zwei."]]
+
+    translate_segments("Eins.\n\nDrei.", deepl, model=model)
+    assert deepl.batches[-1] == ["Drei."]
+
+
+def test_stream_yields_in_order_and_shares_the_cache():
+    model = fresh_model()
+    deepl = FakeDeepL()
+    translate_segments("Bekannt.", deepl, model=model)
+    segments = ["Bekannt.", "", "Neu eins.", "Neu zwei.", "Neu drei."]
+    assert list(translate_stream(iter(segments), deepl, model=model, batch_size=2)) == [
+        "[DE] Bekannt.", "", "[DE] Neu eins.", "[DE] Neu zwei.", "[DE] Neu drei."
+    ]
+    assert deepl.batches[1:] == [["Neu eins.", "Neu zwei."], ["Neu drei."]]
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+import pytest
+
+from pipeline.cache import StageCache, single_flight, wait_for_lease
+from pipeline.deadline import DeadlineExceeded, start_deadline
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(path=os.path.join(tmp_path, "stages.sqlite3"))
+
+
+def start_leader(cache, key, compute):
+    """Runs single_flight in a thread and returns once its compute has started"""
+    started = threading.Event()
+    outcome = {}
+
+    def lead():
+        started.set()
+        return compute()
+
+    def run():
+        try:
+            outcome["value"] = single_flight(cache, key, "clean", lead)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait()
+    return thread, outcome
+
+
+def test_follower_shares_the_leaders_result(cache):
+    release = threading.Event()
+
+    def compute():
+        release.wait()
+        return "leader"
+
+    thread, outcome = start_leader(cache, "key", compute)
+    threading.Timer(0.2, release.set).start()
+    assert single_flight(cache, "key", "clean", lambda: "follower") == ("leader", True)
+    thread.join()
+    assert outcome["value"] == ("leader", False)
+
+
+def test_follower_computes_itself_when_the_leaders_deadline_passes(cache):
+    release = threading.Event()
+
+    def compute():
+        release.wait()
+        raise DeadlineExceeded("leader out of time")
+
+    thread, outcome = start_leader(cache, "key", compute)
+    threading.Timer(0.2, release.set).start()
+    assert single_flight(cache, "key", "clean", lambda: 6) == (6, False)
+    thread.join()
+    assert isinstance(outcome["error"], DeadlineExceeded)
+
+
+def test_follower_gets_the_leaders_error(cache):
+    release = threading.Event()
+
+    def compute():
+        release.wait()
+        raise ValueError("upstream failed")
+
+    thread, outcome = start_leader(cache, "key", compute)
+    threading.Timer(0.2, release.set).start()
+    with pytest.raises(ValueError):
+        single_flight(cache, "key", "clean", lambda: 6)
+    thread.join()
+
+
+def test_follower_stops_waiting_at_its_own_deadline(cache):
+    release = threading.Event()
+
+    def compute():
+        release.wait()
+        return "leader"
+
+    thread, _ = start_leader(cache, "key", compute)
+    started = time.monotonic()
+    try:
+        with start_deadline(0.2), pytest.raises(DeadlineExceeded):
+            single_flight(cache, "key", "clean", lambda: "follower")
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_wait_for_lease_stops_at_the_deadline(cache):
+    assert cache.acquire_lease("key", "other replica", 60)
+    started = time.monotonic()
+    with start_deadline(0.2), pytest.raises(DeadlineExceeded):
+        wait_for_lease(cache, "key", "clean")
+    assert time.monotonic() - started < 1.0
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from pipeline.translation_memory import HINT_THRESHOLD, TranslationMemory, restore_served_paragraphs
+
+SERVED = ["Erster gespeicherter Absatz.", "Zweiter gespeicherter Absatz."]
+
+
+def restore(text: str) -> str:
+    return '\n'.join(restore_served_paragraphs(text.split('\n'), SERVED))
+
+
+def test_placeholders_are_replaced_in_place():
+    assert restore("[TM-1]\n\nNeu.\n\n[TM-2]") == (
+        "Erster gespeicherter Absatz.\n\nNeu.\n\nZweiter gespeicherter Absatz."
+    )
+
+
+def test_dropped_placeholder_is_restored_before_the_next_one():
+    assert restore("Neu.\n\n[TM-2]") == (
+        "Neu.\n\nErster gespeicherter Absatz.\n\nZweiter gespeicherter Absatz."
+    )
+
+
+def test_missing_placeholders_are_appended_and_repeats_removed():
+    paragraphs = [line for line in restore("[TM-1]\n\nNeu.\n\n[TM-1]").split('\n') if line]
+    assert paragraphs == ["Erster gespeicherter Absatz.", "Neu.", "Zweiter gespeicherter Absatz."]
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = TranslationMemory(os.path.join(tmp_path, "memory.sqlite3"))
+    memory.add(STORED_SOURCE, STORED_TARGET)
+    return memory
+
+
+STORED_SOURCE = "The committee said on Tuesday that the new rules would apply to all member states from next year."
+STORED_TARGET = "Der Ausschuss erklärte am Dienstag, die neuen Regeln gälten ab dem nächsten Jahr für alle Mitgliedstaaten."
+
+
+def test_only_verbatim_sentences_are_served(memory):
+    assert memory.lookup("  the committee said on tuesday that the new rules would apply to all member states from next year. ") == STORED_TARGET
+    negated = STORED_SOURCE.replace("would apply", "would not apply")
+    assert memory.lookup(negated) is None
+    # The near match is still offered as a hint
+    (source, target, score), = memory.search(negated, HINT_THRESHOLD)
+    assert target == STORED_TARGET and HINT_THRESHOLD <= score < 1.0
+
+
+def test_lookups_do_not_write(memory):
+    conn = memory._connect()
+    changes = conn.total_changes
+    memory.lookup(STORED_SOURCE)
+    memory.search(STORED_SOURCE, HINT_THRESHOLD)
+    assert conn.total_changes == changes
+    memory.add(STORED_SOURCE, STORED_TARGET)
+    assert conn.execute("SELECT uses FROM units").fetchone()[0] == 1